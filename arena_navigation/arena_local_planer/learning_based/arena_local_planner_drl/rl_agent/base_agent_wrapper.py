@@ -6,7 +6,6 @@ import numpy as np
 import os
 import rospy
 import rospkg
-import yaml
 
 from gym import spaces
 
@@ -14,6 +13,7 @@ from geometry_msgs.msg import Twist
 
 from rl_agent.utils.observation_collector import ObservationCollector
 from rl_agent.utils.reward import RewardCalculator
+from rl_agent.utils.robot_spec import load_robot_spec
 
 
 ROOT_ROBOT_PATH = os.path.join(
@@ -131,37 +131,10 @@ class BaseDRLAgent(ABC):
             action_space_yaml (str): 
                 Yaml file containing the action space configuration. 
         """
-        self._num_laser_beams = None
-        self._laser_range = None
-
-        with open(robot_setting_yaml, "r") as fd:
-            robot_data = yaml.safe_load(fd)
-
-            # get robot radius
-            for body in robot_data["bodies"]:
-                if body["name"] == "base_footprint":
-                    for footprint in body["footprints"]:
-                        if footprint["type"] == "circle":
-                            self._robot_radius = (
-                                footprint.setdefault("radius", 0.3) * 1.05
-                            )
-                        if footprint["radius"]:
-                            self._robot_radius = footprint["radius"] * 1.05
-
-            # get laser related information
-            for plugin in robot_data["plugins"]:
-                if plugin["type"] == "Laser":
-                    laser_angle_min = plugin["angle"]["min"]
-                    laser_angle_max = plugin["angle"]["max"]
-                    laser_angle_increment = plugin["angle"]["increment"]
-                    self._num_laser_beams = int(
-                        round(
-                            (laser_angle_max - laser_angle_min)
-                            / laser_angle_increment
-                        )
-                        + 1
-                    )
-                    self._laser_range = plugin["range"]
+        spec = load_robot_spec(robot_setting_yaml, action_space_yaml)
+        self._robot_radius = spec.radius
+        self._num_laser_beams = spec.num_laser_beams
+        self._laser_range = spec.laser_range
 
         if self._num_laser_beams is None:
             self._num_laser_beams = DEFAULT_NUM_LASER_BEAMS
@@ -178,18 +151,11 @@ class BaseDRLAgent(ABC):
                 "Set to default: {DEFAULT_LASER_RANGE}"
             )
 
-        with open(action_space_yaml, "r") as fd:
-            setting_data = yaml.safe_load(fd)
-
-            self._discrete_actions = setting_data["robot"]["discrete_actions"]
-            self._cont_actions = {
-                "linear_range": setting_data["robot"]["continuous_actions"][
-                    "linear_range"
-                ],
-                "angular_range": setting_data["robot"]["continuous_actions"][
-                    "angular_range"
-                ],
-            }
+        self._discrete_actions = spec.discrete_actions
+        self._cont_actions = {
+            "linear_range": spec.linear_range,
+            "angular_range": spec.angular_range,
+        }
 
     def _get_robot_name_from_params(self):
         """Retrives the agent-specific robot name from the dictionary loaded\
@@ -264,7 +230,7 @@ class BaseDRLAgent(ABC):
         """
         merged_obs, obs_dict = self.observation_collector.get_observations()
         if self._agent_params["normalize"]:
-            self.normalize_observations(merged_obs)
+            merged_obs = self.normalize_observations(merged_obs)
         return merged_obs, obs_dict
 
     def normalize_observations(self, merged_obs: np.ndarray) -> np.ndarray:
@@ -298,6 +264,19 @@ class BaseDRLAgent(ABC):
         """
         assert self._agent, "Agent model not initialized!"
         action = self._agent.predict(obs, deterministic=True)[0]
+        return self._map_action(action)
+
+    def _map_action(self, action: np.ndarray) -> np.ndarray:
+        """Maps the raw policy output onto velocity commands.
+
+        Args:
+            action (np.ndarray):
+                Action index (discrete action space) or unclipped velocities.
+
+        Returns:
+            np.ndarray:
+                Action in [linear velocity, angular velocity]
+        """
         if self._agent_params["discrete_action_space"]:
             action = self._get_disc_action(action)
         else:
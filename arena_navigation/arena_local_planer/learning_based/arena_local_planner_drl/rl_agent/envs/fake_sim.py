@@ -0,0 +1,314 @@
+import json
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from gym import spaces
+
+from rl_agent.envs.transport import EnvTransport
+from rl_agent.utils.grid_map import GridMap
+from rl_agent.utils.raycast import Obstacles, Raycaster, static_obstacles
+from rl_agent.utils.robot_spec import RobotSpec, load_robot_spec
+
+
+# waypoint modes of the pedsim agents
+LOOP, RANDOM = 0, 1
+# min. clearance of the random robot start and goal positions besides the robot radius
+_SPAWN_MARGIN = 0.2
+_MIN_START_GOAL_DIST = 1.0
+
+
+class Pose2D(NamedTuple):
+    """Drop-in for geometry_msgs/Pose2D in the observation dictionary."""
+
+    x: float
+    y: float
+    theta: float
+
+
+class FakeSimulator:
+    def __init__(
+        self,
+        grid_map: GridMap,
+        robot_spec: RobotSpec,
+        step_time: float = 0.1,
+        num_peds: int = 0,
+        ped_radius: float = 0.3,
+        scenario: Optional[dict] = None,
+        seed: Optional[int] = None,
+        models_dir: Optional[str] = None,
+    ):
+        """Lightweight 2D simulation of the robot, its laser and pedestrians.
+
+        Description:
+            The robot follows the unicycle model and is stopped by the map, the
+            static obstacles of the scenario and the pedestrians. The laser is
+            cast against all of them by a Raycaster. Pedestrians walk with their
+            max. velocity towards their waypoints, either the ones of an
+            ArenaScenario or random ones.
+
+        Args:
+            grid_map (GridMap): Map of the world.
+            robot_spec (RobotSpec): Robot model, provides radius and laser.
+            step_time (float, optional): Simulated time per step. Defaults to 0.1.
+            num_peds (int, optional): Number of random pedestrians, ignored if a
+                scenario is given. Defaults to 0.
+            ped_radius (float, optional): Radius of the pedestrians. Defaults to 0.3.
+            scenario (dict, optional): ArenaScenario json data, provides robot
+                start, goal and the pedsim agents. Defaults to None.
+            seed (int, optional): Seed of the random episodes. Defaults to None.
+            models_dir (str, optional): Fallback directory of the model yaml files
+                of the static scenario obstacles. Defaults to None.
+        """
+        self.map = grid_map
+        self.step_time = step_time
+        self.robot_radius = robot_spec.radius
+        self.ped_radius = ped_radius
+        self.scenario = scenario
+        self.num_peds = num_peds
+        self._rng = np.random.default_rng(seed)
+        self.static_obstacles = (
+            static_obstacles(scenario, models_dir)
+            if scenario is not None
+            else Obstacles.empty()
+        )
+        self.obstacles = self.static_obstacles
+
+        self.laser_range = robot_spec.laser_range
+        self.raycaster = Raycaster(
+            grid_map,
+            np.linspace(
+                robot_spec.laser_angle_min,
+                robot_spec.laser_angle_max,
+                robot_spec.num_laser_beams,
+            ),
+            robot_spec.laser_range,
+        )
+
+        # free cells the robot can be spawned on
+        spawn_rows, spawn_cols = np.nonzero(
+            grid_map.distance_field > self.robot_radius + _SPAWN_MARGIN
+        )
+        self._spawn_points = grid_map.to_world(spawn_rows, spawn_cols)
+
+        self.pose = np.zeros(3)
+        self.goal = np.zeros(2)
+        self.global_plan = np.zeros((0, 2))
+        self.velocity = np.zeros(2)
+        self.collided = False
+        self.ped_pos = np.zeros((0, 2))
+
+    def reset(self):
+        """Starts a new episode with new robot start, goal and pedestrians."""
+        if self.scenario is not None:
+            start = np.asarray(self.scenario["robot_position"][:2], dtype=float)
+            self.goal = np.asarray(self.scenario["robot_goal"][:2], dtype=float)
+        else:
+            start, self.goal = self._random_start_goal()
+        self.pose = np.array([*start, self._rng.uniform(-np.pi, np.pi)])
+        self.velocity = np.zeros(2)
+        self.collided = False
+
+        # straight line from start to goal, sampled at map resolution
+        num_points = max(
+            int(np.linalg.norm(self.goal - start) / self.map.resolution), 1
+        ) + 1
+        self.global_plan = np.linspace(start, self.goal, num_points)
+
+        self._reset_peds()
+
+    def _random_start_goal(self) -> Tuple[np.ndarray, np.ndarray]:
+        start = self._spawn_points[self._rng.integers(len(self._spawn_points))]
+        goal_dists = np.linalg.norm(self._spawn_points - start, axis=1)
+        candidates = np.nonzero(goal_dists >= _MIN_START_GOAL_DIST)[0]
+        if len(candidates) == 0:
+            candidates = np.arange(len(self._spawn_points))
+        return start, self._spawn_points[self._rng.choice(candidates)]
+
+    def _reset_peds(self):
+        if self.scenario is not None:
+            agents = [
+                agent
+                for agent in self.scenario.get("pedsim_agents", [])
+                for _ in range(agent.get("number_of_peds", 1))
+            ]
+            pos = [agent["pos"][:2] for agent in agents]
+            waypoints = [
+                [agent["pos"][:2]] + [wp[:2] for wp in agent["waypoints"]]
+                for agent in agents
+            ]
+            vmax = [agent.get("vmax", 0.3) for agent in agents]
+            modes = [agent.get("waypoint_mode", LOOP) for agent in agents]
+        else:
+            pos, waypoints = [], []
+            for _ in range(self.num_peds):
+                points = self._spawn_points[
+                    self._rng.integers(len(self._spawn_points), size=2)
+                ]
+                pos.append(points[0])
+                waypoints.append(list(points))
+            vmax = [0.3] * self.num_peds
+            modes = [LOOP] * self.num_peds
+
+        num_peds = len(pos)
+        num_waypoints = np.array([len(wps) for wps in waypoints], dtype=int)
+        self.ped_pos = np.array(pos, dtype=float).reshape(num_peds, 2)
+        self._ped_waypoints = np.zeros((num_peds, max(num_waypoints, default=1), 2))
+        for i, wps in enumerate(waypoints):
+            self._ped_waypoints[i, : len(wps)] = wps
+        self._ped_num_waypoints = num_waypoints
+        self._ped_vmax = np.array(vmax, dtype=float)
+        self._ped_random = np.array(modes) == RANDOM
+        # the first waypoint is the start position
+        self._ped_target = np.ones(num_peds, dtype=int) % np.maximum(num_waypoints, 1)
+        self._update_obstacles()
+
+    def _update_obstacles(self):
+        peds = Obstacles(
+            np.hstack((self.ped_pos, np.full((len(self.ped_pos), 1), self.ped_radius))),
+            np.zeros((0, 2, 2)),
+        )
+        self.obstacles = self.static_obstacles + peds
+
+    def step(self, action: np.ndarray):
+        """Applies the velocity command [linear, angular] for one step time."""
+        self._step_peds()
+
+        v, w = float(action[0]), float(action[1])
+        x, y, theta = self.pose
+        dt = self.step_time
+        if abs(w) > 1e-6:
+            new_theta = theta + w * dt
+            x += v / w * (np.sin(new_theta) - np.sin(theta))
+            y -= v / w * (np.cos(new_theta) - np.cos(theta))
+        else:
+            new_theta = theta
+            x += v * np.cos(theta) * dt
+            y += v * np.sin(theta) * dt
+        new_theta = (new_theta + np.pi) % (2 * np.pi) - np.pi
+
+        # the robot may touch obstacles, but is stopped from moving into them
+        penetration = self._penetration(np.array([x, y]))
+        self.collided = penetration > 0
+        if self.collided and (
+            self.map.is_occupied(np.array([x, y]))
+            or penetration > self._penetration(self.pose[:2])
+        ):
+            x, y = self.pose[:2]
+            v = 0.0
+        self.pose = np.array([x, y, new_theta])
+        self.velocity = np.array([v, w])
+
+    def _penetration(self, xy: np.ndarray) -> float:
+        clearance = min(float(self.map.clearance(xy)), self.obstacles.distance(xy))
+        return self.robot_radius - clearance
+
+    def _step_peds(self):
+        if len(self.ped_pos) == 0:
+            return
+        idx = np.arange(len(self.ped_pos))
+        target = self._ped_waypoints[idx, self._ped_target]
+        delta = target - self.ped_pos
+        dist = np.linalg.norm(delta, axis=1)
+        max_dist = self._ped_vmax * self.step_time
+        reached = dist <= max_dist
+
+        scale = np.where(reached, 1.0, max_dist / np.maximum(dist, 1e-9))
+        self.ped_pos = self.ped_pos + delta * scale[:, None]
+
+        next_loop = (self._ped_target + 1) % self._ped_num_waypoints
+        next_random = self._rng.integers(self._ped_num_waypoints)
+        next_target = np.where(self._ped_random, next_random, next_loop)
+        self._ped_target = np.where(reached, next_target, self._ped_target)
+        self._update_obstacles()
+
+    def scan(self) -> np.ndarray:
+        """Returns the laser ranges (float32), beams without hit have max. range."""
+        return self.raycaster.cast(self.pose, self.obstacles)[0]
+
+    def goal_in_robot_frame(self) -> Tuple[float, float]:
+        x_relative, y_relative = self.goal - self.pose[:2]
+        rho = (x_relative ** 2 + y_relative ** 2) ** 0.5
+        theta = (
+            np.arctan2(y_relative, x_relative) - self.pose[2] + 4 * np.pi
+        ) % (2 * np.pi) - np.pi
+        return rho, theta
+
+
+class FakeSimTransport(EnvTransport):
+    def __init__(
+        self,
+        map_yaml_path: str,
+        robot_yaml_path: str,
+        settings_yaml_path: str,
+        step_time: float = 0.1,
+        num_peds: int = 0,
+        scenario_path: Optional[str] = None,
+        seed: Optional[int] = None,
+        models_dir: Optional[str] = None,
+    ):
+        """Runs a FlatlandEnv on an in-process FakeSimulator, no ROS master or
+        simulator is needed.
+
+        Args:
+            map_yaml_path (str): map_server yaml file of the map.
+            robot_yaml_path (str): Flatland model yaml of the robot.
+            settings_yaml_path (str): Yaml file containing the action space settings.
+            step_time (float, optional): Simulated time per action. Defaults to 0.1.
+            num_peds (int, optional): Number of random pedestrians. Defaults to 0.
+            scenario_path (str, optional): ArenaScenario json file, its robot start,
+                goal and pedsim agents are used in every episode. Defaults to None.
+            seed (int, optional): Seed of the random episodes. Defaults to None.
+            models_dir (str, optional): Fallback directory of the model yaml files
+                of the static scenario obstacles, e.g. 'simulator_setup/obstacles'.
+                Defaults to None.
+        """
+        scenario = None
+        if scenario_path is not None:
+            with open(scenario_path, "r") as file:
+                scenario = json.load(file)
+
+        spec = load_robot_spec(robot_yaml_path, settings_yaml_path)
+        self.train_mode = True
+        self.step_time = step_time
+        self.sim = FakeSimulator(
+            GridMap.from_yaml(map_yaml_path),
+            spec,
+            step_time=step_time,
+            num_peds=num_peds,
+            scenario=scenario,
+            seed=seed,
+            models_dir=models_dir,
+        )
+        self._observation_space = spaces.Box(
+            low=np.array([0.0] * spec.num_laser_beams + [0.0, -np.pi]),
+            high=np.array([spec.laser_range] * spec.num_laser_beams + [10.0, np.pi]),
+        )
+        self._action = np.zeros(2)
+
+    @property
+    def observation_space(self) -> spaces.Space:
+        return self._observation_space
+
+    def publish_action(self, action: np.ndarray):
+        self._action = np.asarray(action, dtype=float)
+
+    def step_world(self):
+        self.sim.step(self._action)
+
+    def get_observations(self):
+        scan = self.sim.scan()
+        rho, theta = self.sim.goal_in_robot_frame()
+        merged_obs = np.hstack([scan, np.array([rho, theta])])
+
+        obs_dict = {
+            "laser_scan": scan,
+            "goal_in_robot_frame": [rho, theta],
+            "global_plan": self.sim.global_plan,
+            "robot_pose": Pose2D(*self.sim.pose),
+        }
+        return merged_obs, obs_dict
+
+    def reset_task(self):
+        self._action = np.zeros(2)
+        self.sim.reset()
@@ -6,11 +6,12 @@ from gym import spaces
 from gym.spaces import space
 from typing import Union
 from stable_baselines3.common.env_checker import check_env
-import yaml
+from rl_agent.envs.transport import EnvTransport
+from rl_agent.utils.episode_metrics import EpisodeMetrics
+from rl_agent.utils.latest_message import LatestMessage
 from rl_agent.utils.observation_collector import ObservationCollector
 from rl_agent.utils.reward import RewardCalculator
-from rl_agent.utils.debug import timeit
-from rospy.exceptions import ROSException
+from rl_agent.utils.robot_spec import load_robot_spec
 from task_generator.tasks import ABSTask
 import numpy as np
 import rospy
@@ -19,9 +20,8 @@ from std_msgs.msg import String
 from flatland_msgs.srv import StepWorld, StepWorldRequest
 from std_msgs.msg import Bool
 import time
-import math
 
-from rl_agent.utils.debug import timeit
+from rl_agent.utils.debug import TRACER, trace_service_clients
 from task_generator.tasks import get_predefined_task
 
 
@@ -41,6 +41,7 @@ class FlatlandEnv(gym.Env):
         task_mode: str = "staged",
         PATHS: dict = dict(),
         extended_eval: bool = False,
+        transport: EnvTransport = None,
         *args,
         **kwargs,
     ):
@@ -57,45 +58,57 @@ class FlatlandEnv(gym.Env):
             safe_dist (float, optional): [description]. Defaults to None.
             goal_radius (float, optional): [description]. Defaults to 0.1.
             extended_eval (bool): more episode info provided, no reset when crashing
+            transport (EnvTransport, optional): connection to the simulation, e.g. a
+                FakeSimTransport. Defaults to a RosTransport to the flatland simulation of 'ns'.
         """
         super(FlatlandEnv, self).__init__()
 
         self.ns = ns
-        try:
-            # given every environment enough time to initialize, if we dont put sleep,
-            # the training script may crash.
-            ns_int = int(ns.split("_")[1])
-            time.sleep(ns_int * 2)
-        except Exception:
-            rospy.logwarn(
-                f"Can't not determinate the number of the environment, training script may crash!"
-            )
-
         # process specific namespace in ros system
         self.ns_prefix = "" if (ns == "" or ns is None) else "/" + ns + "/"
 
-        if not debug:
-            if train_mode:
-                rospy.init_node(f"train_env_{self.ns}", disable_signals=False)
-            else:
-                rospy.init_node(f"eval_env_{self.ns}", disable_signals=False)
-
         self._extended_eval = extended_eval
-        self._is_train_mode = rospy.get_param("/train_mode")
         self._is_action_space_discrete = is_action_space_discrete
-        self._action_frequency = 1 / rospy.get_param(
-            "/robot_action_rate"
-        )  # for time controlling in train mode
+
+        if transport is None:
+            try:
+                # given every environment enough time to initialize, if we dont put sleep,
+                # the training script may crash.
+                ns_int = int(ns.split("_")[1])
+                time.sleep(ns_int * 2)
+            except Exception:
+                rospy.logwarn(
+                    f"Can't not determinate the number of the environment, training script may crash!"
+                )
+
+            if not debug:
+                if train_mode:
+                    rospy.init_node(f"train_env_{self.ns}", disable_signals=False)
+                else:
+                    rospy.init_node(f"eval_env_{self.ns}", disable_signals=False)
+
+            self._is_train_mode = rospy.get_param("/train_mode")
+            self._action_frequency = 1 / rospy.get_param(
+                "/robot_action_rate"
+            )  # for time controlling in train mode
+        else:
+            self._is_train_mode = transport.train_mode
+            self._action_frequency = transport.step_time
 
         self.setup_by_configuration(PATHS["robot_setting"], PATHS["robot_as"])
 
-        # observation collector
-        self.observation_collector = ObservationCollector(
-            self.ns, self._laser_num_beams, self._laser_max_range
-        )
-        self.observation_space = (
-            self.observation_collector.get_observation_space()
-        )
+        # connection to the simulation, flatland over ROS by default
+        if transport is None:
+            transport = RosTransport(
+                ns,
+                self._laser_num_beams,
+                self._laser_max_range,
+                task_mode=task_mode,
+                curr_stage=kwargs["curr_stage"],
+                PATHS=PATHS,
+            )
+        self._transport = transport
+        self.observation_space = transport.observation_space
 
         # reward calculator
         if safe_dist is None:
@@ -109,40 +122,14 @@ class FlatlandEnv(gym.Env):
             extended_eval=self._extended_eval,
         )
 
-        # action agent publisher
-        if self._is_train_mode:
-            self.agent_action_pub = rospy.Publisher(
-                f"{self.ns_prefix}cmd_vel", Twist, queue_size=1
-            )
-        else:
-            self.agent_action_pub = rospy.Publisher(
-                f"{self.ns_prefix}cmd_vel_pub", Twist, queue_size=1
-            )
-
-        # service clients
-        if self._is_train_mode:
-            self._service_name_step = f"{self.ns_prefix}step_world"
-            self._sim_step_client = rospy.ServiceProxy(
-                self._service_name_step, StepWorld
-            )
-
-        # instantiate task manager
-        self.task = get_predefined_task(
-            ns, mode=task_mode, start_stage=kwargs["curr_stage"], PATHS=PATHS
-        )
-
         self._steps_curr_episode = 0
         self._max_steps_per_episode = max_steps_per_episode
 
         # for extended eval
-        self._last_robot_pose = None
-        self._distance_travelled = 0
-        self._safe_dist_counter = 0
-        self._collisions = 0
-        self._in_crash = False
-
-        # publisher for random map training
-        self.demand_map_pub = rospy.Publisher("/demand", String, queue_size=1)
+        if self._extended_eval:
+            self._episode_metrics = EpisodeMetrics(
+                max_steps_per_episode, self._action_frequency
+            )
 
     def setup_by_configuration(
         self, robot_yaml_path: str, settings_yaml_path: str
@@ -152,59 +139,15 @@ class FlatlandEnv(gym.Env):
         Args:
             robot_yaml_path (str): [description]
         """
-        with open(robot_yaml_path, "r") as fd:
-            robot_data = yaml.safe_load(fd)
-            # get robot radius
-            for body in robot_data["bodies"]:
-                if body["name"] == "base_footprint":
-                    for footprint in body["footprints"]:
-                        if footprint["type"] == "circle":
-                            self._robot_radius = (
-                                footprint.setdefault("radius", 0.3) * 1.05
-                            )
-                        if footprint["radius"]:
-                            self._robot_radius = footprint["radius"] * 1.05
-            # get laser related information
-            for plugin in robot_data["plugins"]:
-                if plugin["type"] == "Laser":
-                    laser_angle_min = plugin["angle"]["min"]
-                    laser_angle_max = plugin["angle"]["max"]
-                    laser_angle_increment = plugin["angle"]["increment"]
-                    self._laser_num_beams = int(
-                        round(
-                            (laser_angle_max - laser_angle_min)
-                            / laser_angle_increment
-                        )
-                        + 1
-                    )
-                    self._laser_max_range = plugin["range"]
-
-        with open(settings_yaml_path, "r") as fd:
-            setting_data = yaml.safe_load(fd)
-            if self._is_action_space_discrete:
-                # self._discrete_actions is a list, each element is a dict with the keys ["name", 'linear','angular']
-                self._discrete_acitons = setting_data["robot"][
-                    "discrete_actions"
-                ]
-                self.action_space = spaces.Discrete(len(self._discrete_acitons))
-            else:
-                linear_range = setting_data["robot"]["continuous_actions"][
-                    "linear_range"
-                ]
-                angular_range = setting_data["robot"]["continuous_actions"][
-                    "angular_range"
-                ]
-                self.action_space = spaces.Box(
-                    low=np.array([linear_range[0], angular_range[0]]),
-                    high=np.array([linear_range[1], angular_range[1]]),
-                    dtype=np.float,
-                )
+        spec = load_robot_spec(robot_yaml_path, settings_yaml_path)
+        self._robot_radius = spec.radius
+        self._laser_num_beams = spec.num_laser_beams
+        self._laser_max_range = spec.laser_range
 
-    def _pub_action(self, action: np.ndarray):
-        action_msg = Twist()
-        action_msg.linear.x = action[0]
-        action_msg.angular.z = action[1]
-        self.agent_action_pub.publish(action_msg)
+        if self._is_action_space_discrete:
+            # self._discrete_actions is a list, each element is a dict with the keys ["name", 'linear','angular']
+            self._discrete_acitons = spec.discrete_actions
+        self.action_space = spec.action_space(self._is_action_space_discrete)
 
     def _translate_disc_action(self, action: np.ndarray):
         new_action = np.array([])
@@ -225,35 +168,43 @@ class FlatlandEnv(gym.Env):
         """
         self._steps_curr_episode += 1
 
-        (
-            self._pub_action(action)
+        self._transport.publish_action(
+            action
             if not self._is_action_space_discrete
-            else self._pub_action(self._translate_disc_action(action))
+            else self._translate_disc_action(action)
         )
 
         # apply action time horizon
-        if self._is_train_mode:
-            self.call_service_takeSimStep(self._action_frequency)
-        else:
-            self._wait_for_next_action_cycle()
+        with TRACER.span("sim_step"):
+            self._transport.step_world()
 
         # wait for new observations
-        merged_obs, obs_dict = self.observation_collector.get_observations()
+        with TRACER.span("observation_wait"):
+            merged_obs, obs_dict = self._transport.get_observations()
+        # kept for wrappers, e.g. the RolloutRecorder
+        self.last_obs_dict = obs_dict
 
         # calculate reward
-        reward, reward_info = self.reward_calculator.get_reward(
-            obs_dict["laser_scan"],
-            obs_dict["goal_in_robot_frame"],
-            action=action,
-            global_plan=obs_dict["global_plan"],
-            robot_pose=obs_dict["robot_pose"],
-        )
+        with TRACER.span("reward"):
+            reward, reward_info = self.reward_calculator.get_reward(
+                obs_dict["laser_scan"],
+                obs_dict["goal_in_robot_frame"],
+                action=action,
+                global_plan=obs_dict["global_plan"],
+                robot_pose=obs_dict["robot_pose"],
+            )
         # print(f"cum_reward: {reward}")
         done = reward_info["is_done"]
 
         # extended eval info
         if self._extended_eval:
-            self._update_eval_statistics(obs_dict, reward_info)
+            self._episode_metrics.add(
+                obs_dict["robot_pose"],
+                obs_dict["laser_scan"].min(),
+                crash=reward_info.get("crash", False),
+                safe_dist=reward_info.get("safe_dist", False),
+                global_plan=obs_dict["global_plan"],
+            )
 
         # info
         info = {}
@@ -269,89 +220,149 @@ class FlatlandEnv(gym.Env):
 
         # for logging
         if self._extended_eval and done:
-            info["collisions"] = self._collisions
-            info["distance_travelled"] = round(self._distance_travelled, 2)
-            info["time_safe_dist"] = (
-                self._safe_dist_counter * self._action_frequency
-            )
-            info["time"] = self._steps_curr_episode * self._action_frequency
+            info.update(self._episode_metrics.compute())
+            info["distance_travelled"] = round(info["distance_travelled"], 2)
         return merged_obs, reward, done, info
 
     def reset(self):
-        self.demand_map_pub.publish("")  # publisher to demand a map update
-        # set task
         # regenerate start position end goal position of the robot and change the obstacles accordingly
-        self.agent_action_pub.publish(Twist())
-        if self._is_train_mode:
-            self._sim_step_client()
-        time.sleep(0.1)  # map_pub needs some time to update map
-        self.task.reset()
+        self._transport.reset_task()
         self.reward_calculator.reset()
         self._steps_curr_episode = 0
 
         # extended eval info
         if self._extended_eval:
-            self._last_robot_pose = None
-            self._distance_travelled = 0
-            self._safe_dist_counter = 0
-            self._collisions = 0
+            self._episode_metrics.reset()
 
-        obs, _ = self.observation_collector.get_observations()
+        obs, self.last_obs_dict = self._transport.get_observations()
         return obs  # reward, done, info can't be included
 
     def close(self):
-        pass
+        self._transport.close()
 
-    def call_service_takeSimStep(self, t: float = None):
-        request = StepWorldRequest() if t is None else StepWorldRequest(t)
+    def get_trace(self, reset: bool = False) -> dict:
+        """Exported span histograms of this env's process, see Tracer.export."""
+        return TRACER.export(reset)
 
-        try:
-            response = self._sim_step_client(request)
-            rospy.logdebug("step service=", response)
-        except rospy.ServiceException as e:
-            rospy.logdebug("step Service call failed: %s" % e)
+    def dump_trace(self, path: str):
+        """Writes the spans of this env's process as Chrome trace to 'path'."""
+        TRACER.dump_chrome_trace(path)
 
-    def _wait_for_next_action_cycle(self):
-        try:
-            rospy.wait_for_message(f"{self.ns_prefix}next_cycle", Bool)
-        except ROSException:
-            pass
+    @property
+    def episode_metrics(self) -> dict:
+        """Metrics of the last finished episode in extended eval mode, see
+        EpisodeMetrics.compute for the keys."""
+        if not self._extended_eval:
+            return {}
+        return self._episode_metrics.summary()
 
-    def _update_eval_statistics(self, obs_dict: dict, reward_info: dict):
-        """
-        Updates the metrics for extended eval mode
 
-        param obs_dict (dict): observation dictionary from ObservationCollector.get_observations(),
-            necessary entries: 'robot_pose'
-        param reward_info (dict): dictionary containing information returned from RewardCalculator.get_reward(),
-            necessary entries: 'crash', 'safe_dist'
+class RosTransport(EnvTransport):
+    def __init__(
+        self,
+        ns: str,
+        num_lidar_beams: int,
+        lidar_range: float,
+        task_mode: str = "staged",
+        curr_stage: int = 1,
+        PATHS: dict = dict(),
+    ):
+        """Connects a FlatlandEnv to the flatland simulation of namespace 'ns'.
+
+        Args:
+            ns (str): Namespace of the simulation.
+            num_lidar_beams (int): Number of laser beams of the robot.
+            lidar_range (float): Max. laser range of the robot.
+            task_mode (str, optional): Mode of the task generator. Defaults to "staged".
+            curr_stage (int, optional): Start stage of staged tasks. Defaults to 1.
+            PATHS (dict, optional): Script relevant paths passed to the task generator.
         """
-        # distance travelled
-        if self._last_robot_pose is not None:
-            self._distance_travelled += FlatlandEnv.get_distance(
-                self._last_robot_pose, obs_dict["robot_pose"]
+        self.ns_prefix = "" if (ns == "" or ns is None) else "/" + ns + "/"
+        self.train_mode = rospy.get_param("/train_mode")
+        self.step_time = 1 / rospy.get_param("/robot_action_rate")
+
+        # observation collector
+        self.observation_collector = ObservationCollector(
+            ns, num_lidar_beams, lidar_range
+        )
+
+        # action agent publisher
+        if self.train_mode:
+            self.agent_action_pub = rospy.Publisher(
+                f"{self.ns_prefix}cmd_vel", Twist, queue_size=1
+            )
+        else:
+            self.agent_action_pub = rospy.Publisher(
+                f"{self.ns_prefix}cmd_vel_pub", Twist, queue_size=1
+            )
+
+        # service clients
+        if self.train_mode:
+            self._service_name_step = f"{self.ns_prefix}step_world"
+            self._sim_step_client = rospy.ServiceProxy(
+                self._service_name_step, StepWorld
+            )
+        else:
+            # shares the subscription with the observation collector
+            self._cycle_trigger = LatestMessage.get(
+                f"{self.ns_prefix}next_cycle", Bool
             )
+            self._last_cycle_seq = None
+
+        # instantiate task manager
+        self.task = get_predefined_task(
+            ns, mode=task_mode, start_stage=curr_stage, PATHS=PATHS
+        )
+        trace_service_clients(getattr(self.task, "pedsim_manager", None), "pedsim")
+        trace_service_clients(
+            getattr(getattr(self.task, "obstacle_manager", None), "pedsim_manager", None),
+            "pedsim",
+        )
+
+        # publisher for random map training
+        self.demand_map_pub = rospy.Publisher("/demand", String, queue_size=1)
+
+    @property
+    def observation_space(self) -> spaces.Space:
+        return self.observation_collector.get_observation_space()
+
+    def publish_action(self, action: np.ndarray):
+        action_msg = Twist()
+        action_msg.linear.x = action[0]
+        action_msg.angular.z = action[1]
+        self.agent_action_pub.publish(action_msg)
 
-        # collision detector
-        if "crash" in reward_info:
-            if reward_info["crash"] and not self._in_crash:
-                self._collisions += 1
-                # when crash occures, robot strikes obst for a few consecutive timesteps
-                # we want to count it as only one collision
-                self._in_crash = True
+    def step_world(self):
+        if self.train_mode:
+            self.call_service_takeSimStep(self.step_time)
         else:
-            self._in_crash = False
+            self._wait_for_next_action_cycle()
 
-        # safe dist detector
-        if "safe_dist" in reward_info and reward_info["safe_dist"]:
-            self._safe_dist_counter += 1
+    def get_observations(self):
+        return self.observation_collector.get_observations()
 
-        self._last_robot_pose = obs_dict["robot_pose"]
+    def reset_task(self):
+        self.demand_map_pub.publish("")  # publisher to demand a map update
+        self.agent_action_pub.publish(Twist())
+        if self.train_mode:
+            self._sim_step_client()
+        time.sleep(0.1)  # map_pub needs some time to update map
+        with TRACER.span("task_reset"):
+            self.task.reset()
 
-    @staticmethod
-    def get_distance(pose_1: Pose2D, pose_2: Pose2D):
-        return math.hypot(pose_2.x - pose_1.x, pose_2.y - pose_1.y)
+    def call_service_takeSimStep(self, t: float = None):
+        request = StepWorldRequest() if t is None else StepWorldRequest(t)
 
+        try:
+            response = self._sim_step_client(request)
+            rospy.logdebug("step service=", response)
+        except rospy.ServiceException as e:
+            rospy.logdebug("step Service call failed: %s" % e)
+
+    def _wait_for_next_action_cycle(self):
+        _, self._last_cycle_seq = self._cycle_trigger.wait_for_newer(
+            self._last_cycle_seq
+        )
 
 if __name__ == "__main__":
 
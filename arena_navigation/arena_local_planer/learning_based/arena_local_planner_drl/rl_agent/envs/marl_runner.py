@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from rl_agent.envs.pettingzoo_env import FlatlandPettingZooEnv
+from rl_agent.model.inference import InferenceEngine
+
+
+class MARLRunner:
+    def __init__(
+        self,
+        envs: List[FlatlandPettingZooEnv],
+        inference_engine: InferenceEngine,
+    ) -> None:
+        """Steps several multi-agent envs with one shared policy.
+
+        Description:
+            The observations of all agents of all envs (e.g. 'sim_1'..'sim_N')
+            are stacked into one batch, normalized once and passed through the
+            policy in a single forward pass. The actions are then scattered back
+            to the action dicts of the envs, which are stepped concurrently.
+
+        Args:
+            envs (List[FlatlandPettingZooEnv]): Envs of the different simulations.
+            inference_engine (InferenceEngine):
+                Engine of the shared policy, applies the observation normalization.
+        """
+        self.envs = envs
+        self._engine = inference_engine
+        # (env index, agent name) per row of the batch
+        self._rows: List[Tuple[int, str]] = [
+            (i, agent) for i, env in enumerate(envs) for agent in env.possible_agents
+        ]
+        obs_dim = envs[0].observation_spaces[self._rows[0][1]].shape[0]
+        self._batch = np.zeros((len(self._rows), obs_dim), dtype=np.float32)
+
+        self._executor = ThreadPoolExecutor(max_workers=len(envs))
+        self._observations: List[Dict[str, np.ndarray]] = [{} for _ in envs]
+
+    @property
+    def num_agents(self) -> int:
+        return len(self._rows)
+
+    def reset(self) -> List[Dict[str, np.ndarray]]:
+        """Resets all envs.
+
+        Returns:
+            List[Dict[str, np.ndarray]]: Observation dict per env.
+        """
+        self._observations = list(self._executor.map(lambda env: env.reset(), self.envs))
+        return self._observations
+
+    def get_actions(
+        self, observations: List[Dict[str, np.ndarray]]
+    ) -> List[Dict[str, np.ndarray]]:
+        """Infers the actions of all agents with one forward pass.
+
+        Args:
+            observations (List[Dict[str, np.ndarray]]): Observation dict per env.
+
+        Returns:
+            List[Dict[str, np.ndarray]]: Action dict per env. Continuous actions are
+                velocity commands, discrete actions are returned as action indices.
+                'FlatlandPettingZooEnv.step' passes them on unchanged to the agents,
+                whose 'publish_action' maps indices to velocities.
+        """
+        for row, (i, agent) in enumerate(self._rows):
+            self._batch[row] = observations[i][agent]
+        actions = self._engine.predict_batch(self._batch)
+
+        action_dicts = [{} for _ in self.envs]
+        for row, (i, agent) in enumerate(self._rows):
+            action_dicts[i][agent] = actions[row]
+        return action_dicts
+
+    def step(
+        self,
+    ) -> List[
+        Tuple[
+            Dict[str, np.ndarray],
+            Dict[str, float],
+            Dict[str, bool],
+            Dict[str, Dict[str, Any]],
+        ]
+    ]:
+        """Infers the actions for the latest observations and steps all envs.
+
+        Note:
+            Envs in which all agents are done are reset.
+
+        Returns:
+            List[Tuple[...]]: (observations, rewards, dones, infos) per env.
+        """
+        action_dicts = self.get_actions(self._observations)
+        results = list(
+            self._executor.map(
+                lambda env_actions: env_actions[0].step(env_actions[1]),
+                zip(self.envs, action_dicts),
+            )
+        )
+
+        for i, (obs, _, dones, _) in enumerate(results):
+            self._observations[i] = obs
+            if dones and all(dones.values()):
+                self._observations[i] = self.envs[i].reset()
+        return results
+
+    def run(self, num_steps: int) -> None:
+        """Resets the envs and runs them for the given number of steps."""
+        self.reset()
+        for _ in range(num_steps):
+            self.step()
+
+    def close(self) -> None:
+        self._executor.shutdown()
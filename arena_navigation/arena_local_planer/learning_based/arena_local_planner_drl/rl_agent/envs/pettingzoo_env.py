@@ -7,6 +7,8 @@ from pettingzoo import *
 from pettingzoo.utils import wrappers
 
 from rl_agent.training_agent_wrapper import TrainingDRLAgent
+from rl_agent.utils.observation_hub import MultiAgentObservationHub
+from rl_agent.utils.reward import BatchRewardCalculator
 from task_generator.marl_tasks import get_MARL_task
 
 from flatland_msgs.srv import StepWorld, StepWorldRequest
@@ -83,6 +85,15 @@ class FlatlandPettingZooEnv(ParallelEnv):
             for i, agent in enumerate(self.possible_agents)
         }
 
+        # observations and rewards of all agents are evaluated at once
+        self._observation_hub = MultiAgentObservationHub(
+            robot_namespaces=[a._ns_robot for a in agent_list],
+            num_lidar_beams=agent_list[0]._num_laser_beams if agent_list else 0,
+        )
+        self._reward_calculator = BatchRewardCalculator.from_calculators(
+            [a.reward_calculator for a in agent_list]
+        )
+
         # task manager
         self.task_manager = get_MARL_task(
             ns=ns,
@@ -104,6 +115,11 @@ class FlatlandPettingZooEnv(ParallelEnv):
         assert len(self.possible_agents) == len(
             set(self.possible_agents)
         ), "Robot names and thus there namespaces, have to be unique!"
+        # observations are stacked into one array
+        assert (
+            len(set(a._num_laser_beams for a in self.agent_object_mapping.values()))
+            <= 1
+        ), "All robots need the same number of laser beams!"
 
     def reset(self) -> Dict[str, np.ndarray]:
         """Resets the environment and returns a dictionary of observations (keyed by the agent name)
@@ -114,22 +130,18 @@ class FlatlandPettingZooEnv(ParallelEnv):
         self.agents = self.possible_agents[:]
         self.num_moves = 0
 
-        (
-            self.agent_object_mapping[agent].reward_calculator.reset()
-            for agent in self.agents
-        )
+        self._reward_calculator.reset()
 
         self.task_manager.reset()
         if self._is_train_mode:
             self._sim_step_client()
 
-        observations = {
-            agent: self.agent_object_mapping[agent].get_observations()[0]
+        merged_obs, _ = self._observation_hub.collect()
+        return {
+            agent: merged_obs[self.agent_name_mapping[agent]]
             for agent in self.agents
         }
 
-        return observations
-
     def step(
         self, actions: Dict[str, np.ndarray]
     ) -> Tuple[
@@ -157,26 +169,32 @@ class FlatlandPettingZooEnv(ParallelEnv):
             self.agents = []
             return {}, {}, {}, {}
 
-        # actions
+        # actions, velocity commands of agents without action are zero
+        velocities = np.zeros((len(self.possible_agents), 2))
         for agent, action in actions.items():
-            self.agent_object_mapping[agent].publish_action(action)
+            agent_object = self.agent_object_mapping[agent]
+            # the agent maps discrete action indices to velocities itself
+            agent_object.publish_action(action)
+            # velocities are only needed for the batched reward
+            velocities[self.agent_name_mapping[agent]] = (
+                agent_object._get_disc_action(action)
+                if agent_object._agent_params["discrete_action_space"]
+                else action
+            )
 
         # fast-forward simulation
         self.call_service_takeSimStep()
         self.num_moves += 1
 
-        merged_obs, rewards, reward_infos = {}, {}, {}
-
-        for agent in self.agents:
-            # observations
-            merged, _dict = self.agent_object_mapping[agent].get_observations()
-            merged_obs[agent] = merged
+        merged, obs_dict = self._observation_hub.collect()
+        rewards, reward_infos = self._reward_calculator.get_rewards(
+            action=velocities, **obs_dict
+        )
 
-            # rewards and infos
-            reward, reward_info = self.agent_object_mapping[agent].get_reward(
-                action=actions[agent], obs_dict=_dict
-            )
-            rewards[agent], reward_infos[agent] = reward, reward_info
+        # per agent dicts hold views on the stacked arrays
+        idx = [self.agent_name_mapping[agent] for agent in self.agents]
+        merged_obs = {agent: merged[i] for agent, i in zip(self.agents, idx)}
+        rewards = dict(zip(self.agents, rewards[idx].tolist()))
 
         # dones & infos
         dones, infos = self._get_dones(reward_infos), self._get_infos(
@@ -205,40 +223,44 @@ class FlatlandPettingZooEnv(ParallelEnv):
         except rospy.ServiceException as e:
             rospy.logdebug("step Service call failed: %s" % e)
 
-    def _get_dones(
-        self, reward_infos: Dict[str, Dict[str, Any]]
-    ) -> Dict[str, bool]:
+    def _get_dones(self, reward_infos: Dict[str, np.ndarray]) -> Dict[str, bool]:
         """[summary]
 
         Args:
-            reward_infos (Dict[str, Dict[str, Any]]): [description]
+            reward_infos (Dict[str, np.ndarray]):
+                Stacked 'is_done', 'done_reason' and 'is_success' of all agents.
 
         Returns:
             Dict[str, bool]: [description]
         """
         return (
-            {agent: reward_infos[agent]["is_done"] for agent in self.agents}
+            {
+                agent: bool(reward_infos["is_done"][self.agent_name_mapping[agent]])
+                for agent in self.agents
+            }
             if self.num_moves < self._max_num_moves
             else {agent: True for agent in self.agents}
         )
 
     def _get_infos(
-        self, reward_infos: Dict[str, Dict[str, Any]]
+        self, reward_infos: Dict[str, np.ndarray]
     ) -> Dict[str, Dict[str, Any]]:
         """[summary]
 
         Args:
-            reward_infos (Dict[str, Dict[str, Any]]): [description]
+            reward_infos (Dict[str, np.ndarray]):
+                Stacked 'is_done', 'done_reason' and 'is_success' of all agents.
 
         Returns:
             Dict[str, Dict[str, Any]]: [description]
         """
         infos = {agent: {} for agent in self.agents}
         for agent in self.agents:
-            if reward_infos[agent]["is_done"]:
+            i = self.agent_name_mapping[agent]
+            if reward_infos["is_done"][i]:
                 infos[agent] = {
-                    "done_reason": reward_infos[agent]["done_reason"],
-                    "is_success": reward_infos[agent]["is_success"],
+                    "done_reason": int(reward_infos["done_reason"][i]),
+                    "is_success": int(reward_infos["is_success"][i]),
                 }
             elif self.num_moves >= self._max_num_moves:
                 infos[agent] = {
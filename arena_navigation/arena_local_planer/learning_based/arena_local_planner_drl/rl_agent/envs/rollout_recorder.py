@@ -0,0 +1,288 @@
+"""Recording of FlatlandEnv rollouts for offline analysis.
+
+The recorder writes the transitions column-wise in chunks of 'chunk_size'
+steps to '<directory>/chunk_<index>.npz' (compressed) or, when compression is
+disabled, to '<directory>/chunk_<index>/<column>.npy', which can be memory
+mapped. Recorded columns:
+
+    obs          observation returned by the step (float32)
+    action       action passed to the step (float32)
+    reward       (float32)
+    done         (bool)
+    done_reason  -1 while the episode is running (int8)
+    is_success   (int8)
+    episode      episode index (int32)
+    step         step within the episode, starting at 1 (int32)
+    robot_pose   (x, y, theta) after the step (float32)
+    plan_hash    hash of the global plan the step was taken on (uint64)
+    initial_obs / initial_episode
+                 observation returned by 'reset' and its episode index
+"""
+import glob
+import hashlib
+import os
+import queue
+import threading
+from typing import Dict, List, Optional
+
+import gym
+import numpy as np
+import rospy
+
+
+class RolloutRecorder(gym.Wrapper):
+    def __init__(
+        self,
+        env: gym.Env,
+        directory: str,
+        chunk_size: int = 1000,
+        compress: bool = True,
+        max_queued_chunks: int = 8,
+    ):
+        """Records the transitions of a FlatlandEnv without blocking the steps.
+
+        Args:
+            env (gym.Env): FlatlandEnv, possibly wrapped.
+            directory (str): Output directory of the chunk files.
+            chunk_size (int, optional): Steps per chunk. Defaults to 1000.
+            compress (bool, optional):
+                Write compressed npz chunks instead of memory-mappable npy
+                files. Defaults to True.
+            max_queued_chunks (int, optional):
+                Chunks waiting for the writer thread. When exceeded, chunks are
+                dropped (and counted in 'dropped_chunks') instead of stalling
+                the env. Defaults to 8.
+        """
+        super().__init__(env)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.dropped_chunks = 0
+
+        obs_dim = int(np.prod(env.observation_space.shape))
+        action_shape = (
+            () if isinstance(env.action_space, gym.spaces.Discrete) else env.action_space.shape
+        )
+        self._columns = {
+            "obs": ((obs_dim,), np.float32),
+            "action": (action_shape, np.float32),
+            "reward": ((), np.float32),
+            "done": ((), np.bool_),
+            "done_reason": ((), np.int8),
+            "is_success": ((), np.int8),
+            "episode": ((), np.int32),
+            "step": ((), np.int32),
+            "robot_pose": ((3,), np.float32),
+            "plan_hash": ((), np.uint64),
+        }
+        self._chunk = self._new_chunk()
+        self._initial_obs: List[np.ndarray] = []
+        self._initial_episode: List[int] = []
+        self._num_rows = 0
+        # a rerun into the same directory continues chunk and episode numbering
+        chunk_paths = _chunk_paths(directory)
+        self._chunk_idx = len(chunk_paths)
+
+        self._episode = _last_episode(chunk_paths)
+        self._step = 0
+        self._last_plan = None
+        self._last_plan_hash = 0
+
+        self._queue = queue.Queue(maxsize=max_queued_chunks)
+        self._writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self._writer.start()
+
+    def _new_chunk(self) -> Dict[str, np.ndarray]:
+        return {
+            name: np.zeros((self.chunk_size,) + shape, dtype=dtype)
+            for name, (shape, dtype) in self._columns.items()
+        }
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        self._episode += 1
+        self._step = 0
+        self._initial_obs.append(np.asarray(obs, dtype=np.float32).ravel())
+        self._initial_episode.append(self._episode)
+        return obs
+
+    def step(self, action):
+        obs, reward, done, info = self.env.step(action)
+        self._step += 1
+
+        row, chunk = self._num_rows, self._chunk
+        chunk["obs"][row] = np.ravel(obs)
+        chunk["action"][row] = action
+        chunk["reward"][row] = reward
+        chunk["done"][row] = done
+        chunk["done_reason"][row] = info.get("done_reason", -1) if done else -1
+        chunk["is_success"][row] = info.get("is_success", 0)
+        chunk["episode"][row] = self._episode
+        chunk["step"][row] = self._step
+
+        obs_dict = getattr(self.env.unwrapped, "last_obs_dict", None)
+        if obs_dict is not None:
+            pose = obs_dict["robot_pose"]
+            chunk["robot_pose"][row] = (pose.x, pose.y, pose.theta)
+            chunk["plan_hash"][row] = self._hash_plan(obs_dict["global_plan"])
+
+        self._num_rows += 1
+        if self._num_rows == self.chunk_size:
+            self._flush()
+        return obs, reward, done, info
+
+    def _hash_plan(self, plan: np.ndarray) -> int:
+        # the plan array is only replaced when a new global plan arrives
+        if plan is not self._last_plan:
+            self._last_plan = plan
+            self._last_plan_hash = int.from_bytes(
+                hashlib.blake2b(
+                    np.ascontiguousarray(plan).tobytes(), digest_size=8
+                ).digest(),
+                "little",
+            )
+        return self._last_plan_hash
+
+    def _flush(self):
+        if self._num_rows == 0 and not self._initial_obs:
+            return
+        chunk = {name: column[: self._num_rows] for name, column in self._chunk.items()}
+        chunk["initial_obs"] = np.array(self._initial_obs, dtype=np.float32).reshape(
+            len(self._initial_obs), self._columns["obs"][0][0]
+        )
+        chunk["initial_episode"] = np.array(self._initial_episode, dtype=np.int32)
+
+        try:
+            self._queue.put_nowait((self._chunk_idx, chunk))
+        except queue.Full:
+            self.dropped_chunks += 1
+            rospy.logwarn(
+                f"RolloutRecorder: writer can't keep up, dropped chunk {self._chunk_idx}"
+            )
+        self._chunk_idx += 1
+
+        # the queued chunk keeps its arrays, continue in new ones
+        self._chunk = self._new_chunk()
+        self._initial_obs, self._initial_episode = [], []
+        self._num_rows = 0
+
+    def _write_chunks(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            idx, chunk = item
+            path = os.path.join(self.directory, f"chunk_{idx:06d}")
+            if self.compress:
+                # written under a temporary name, readers only pick up complete chunks
+                with open(path + ".tmp", "wb") as file:
+                    np.savez_compressed(file, **chunk)
+                os.replace(path + ".tmp", path + ".npz")
+            else:
+                os.makedirs(path + ".tmp", exist_ok=True)
+                for name, column in chunk.items():
+                    np.save(os.path.join(path + ".tmp", name + ".npy"), column)
+                os.replace(path + ".tmp", path)
+
+    def close(self):
+        self._flush()
+        self._queue.put(None)
+        self._writer.join()
+        return self.env.close()
+
+
+def _chunk_paths(directory: str) -> List[str]:
+    return sorted(
+        path
+        for path in glob.glob(os.path.join(directory, "chunk_*"))
+        if not path.endswith(".tmp")
+    )
+
+
+def _last_episode(chunk_paths: List[str]) -> int:
+    """Returns the largest episode index stored in the chunks, -1 without any."""
+    last = -1
+    for path in chunk_paths:
+        for name in ("episode", "initial_episode"):
+            if path.endswith(".npz"):
+                with np.load(path) as chunk:
+                    episodes = chunk[name]
+            else:
+                episodes = np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+            if len(episodes):
+                last = max(last, int(episodes.max()))
+    return last
+
+
+class RolloutReader:
+    def __init__(self, directory: str):
+        """Reads the chunks written by a RolloutRecorder.
+
+        Note:
+            Uncompressed chunks are memory mapped, compressed ones are
+            decompressed column by column on access.
+
+        Args:
+            directory (str): Directory of the chunk files.
+        """
+        self.directory = directory
+        self._chunks = [self._open(path) for path in _chunk_paths(directory)]
+        self._episode_index: Optional[Dict[int, List[tuple]]] = None
+
+    @staticmethod
+    def _open(path: str):
+        if path.endswith(".npz"):
+            return np.load(path)
+        return {
+            os.path.splitext(name)[0]: np.load(os.path.join(path, name), mmap_mode="r")
+            for name in os.listdir(path)
+        }
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the given column of all chunks."""
+        return np.concatenate([chunk[name] for chunk in self._chunks])
+
+    @property
+    def episodes(self) -> List[int]:
+        return sorted(self._get_episode_index())
+
+    def _get_episode_index(self) -> Dict[int, List[tuple]]:
+        # episode -> [(chunk, start, stop), ...]
+        if self._episode_index is None:
+            self._episode_index = {}
+            for c, chunk in enumerate(self._chunks):
+                episodes = np.asarray(chunk["episode"])
+                if len(episodes) == 0:
+                    continue
+                bounds = np.flatnonzero(np.diff(episodes)) + 1
+                starts = np.concatenate(([0], bounds))
+                stops = np.concatenate((bounds, [len(episodes)]))
+                for start, stop in zip(starts, stops):
+                    self._episode_index.setdefault(int(episodes[start]), []).append(
+                        (c, start, stop)
+                    )
+        return self._episode_index
+
+    def episode(self, episode: int) -> Dict[str, np.ndarray]:
+        """Returns the recorded columns of one episode.
+
+        Besides the step columns, 'initial_obs' holds the observation returned by
+        'reset' - together with 'obs' it yields the observation each action was
+        taken on, e.g. for behavior cloning.
+        """
+        slices = self._get_episode_index()[episode]
+        data = {}
+        for name in self._chunks[slices[0][0]].keys():
+            if name.startswith("initial_"):
+                continue
+            parts = [self._chunks[c][name][start:stop] for c, start, stop in slices]
+            data[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+        for chunk in self._chunks:
+            initial_episode = np.asarray(chunk["initial_episode"])
+            match = np.flatnonzero(initial_episode == episode)
+            if len(match) > 0:
+                data["initial_obs"] = np.asarray(chunk["initial_obs"][match[0]])
+                break
+        return data
@@ -0,0 +1,50 @@
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import numpy as np
+
+from gym import spaces
+
+
+class EnvTransport(ABC):
+    """Connection of a FlatlandEnv to the simulation it controls.
+
+    The env only publishes velocity commands, advances the simulation by one
+    action cycle, collects the observations and resets the task through this
+    interface. The default transport talks to flatland over ROS (see
+    'RosTransport' in flatland_gym_env), 'FakeSimTransport' runs an in-process
+    simulator instead.
+
+    Attributes:
+        train_mode: Whether the simulation is stepped by the env
+            (otherwise the env waits for the action cycles).
+        step_time: Duration of one action cycle in seconds.
+    """
+
+    train_mode: bool = True
+    step_time: float = 0.1
+
+    @property
+    @abstractmethod
+    def observation_space(self) -> spaces.Space:
+        """Space of the merged observations."""
+
+    @abstractmethod
+    def publish_action(self, action: np.ndarray) -> None:
+        """Sends the velocity command [linear, angular] to the robot."""
+
+    @abstractmethod
+    def step_world(self) -> None:
+        """Advances the simulation by one action cycle (or waits for it)."""
+
+    @abstractmethod
+    def get_observations(self) -> Tuple[np.ndarray, dict]:
+        """Returns the merged observation and the observation dictionary with
+        'laser_scan', 'goal_in_robot_frame', 'global_plan' and 'robot_pose'."""
+
+    @abstractmethod
+    def reset_task(self) -> None:
+        """Stops the robot and starts a new episode of the task."""
+
+    def close(self) -> None:
+        pass
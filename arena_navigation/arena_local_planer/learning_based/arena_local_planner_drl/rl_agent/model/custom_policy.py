@@ -1,40 +1,25 @@
-import os
 from typing import Callable, Dict, List, Optional, Tuple, Type, Union
 
 import gym
-import rospkg
 import torch as th
-import yaml
 
 from torch import nn
 from stable_baselines3.common.policies import ActorCriticPolicy
 
 from rl_agent.model.agent_factory import AgentFactory
+from rl_agent.utils.robot_spec import (
+    default_settings_path,
+    load_robot_spec,
+    robot_model_path,
+)
 
 
 """ 
 _RS: Robot state size - placeholder for robot related inputs to the NN
-_L: Number of laser beams - placeholder for the laser beam data 
+The number of laser beams is taken from the observation space of each model.
 """
 _RS = 2  # robot state size
 
-ROBOT_SETTING_PATH = rospkg.RosPack().get_path("simulator_setup")
-yaml_ROBOT_SETTING_PATH = os.path.join(
-    ROBOT_SETTING_PATH, "robot", "myrobot.model.yaml"
-)
-
-with open(yaml_ROBOT_SETTING_PATH, "r") as fd:
-    robot_data = yaml.safe_load(fd)
-    for plugin in robot_data["plugins"]:
-        if plugin["type"] == "Laser":
-            laser_angle_min = plugin["angle"]["min"]
-            laser_angle_max = plugin["angle"]["max"]
-            laser_angle_increment = plugin["angle"]["increment"]
-            _L = int(
-                round((laser_angle_max - laser_angle_min) / laser_angle_increment) + 1
-            )  # num of laser beams
-            break
-
 
 class MLP_ARENA2D(nn.Module):
     """
@@ -44,6 +29,8 @@ class MLP_ARENA2D(nn.Module):
     :param feature_dim: dimension of the features extracted with the features_extractor (e.g. features from a CNN)
     :param last_layer_dim_pi: (int) number of units for the last layer of the policy network
     :param last_layer_dim_vf: (int) number of units for the last layer of the value network
+    :param input_dim: (int) size of the flattened observation,
+        defaults to the laser beams of the default robot model plus the robot state
     """
 
     def __init__(
@@ -51,6 +38,7 @@ class MLP_ARENA2D(nn.Module):
         feature_dim: int,
         last_layer_dim_pi: int = 32,
         last_layer_dim_vf: int = 32,
+        input_dim: int = None,
     ):
         super(MLP_ARENA2D, self).__init__()
 
@@ -58,9 +46,17 @@ class MLP_ARENA2D(nn.Module):
         self.latent_dim_pi = last_layer_dim_pi
         self.latent_dim_vf = last_layer_dim_vf
 
+        if input_dim is None:
+            input_dim = (
+                load_robot_spec(
+                    robot_model_path(), default_settings_path()
+                ).num_laser_beams
+                + _RS
+            )
+
         # Body network
         self.body_net = nn.Sequential(
-            nn.Linear(_L + _RS, 64), nn.ReLU(), nn.Linear(64, feature_dim), nn.ReLU()
+            nn.Linear(input_dim, 64), nn.ReLU(), nn.Linear(64, feature_dim), nn.ReLU()
         )
 
         # Policy network
@@ -111,4 +107,4 @@ class MLP_ARENA2D_POLICY(ActorCriticPolicy):
         self.ortho_init = True
 
     def _build_mlp_extractor(self) -> None:
-        self.mlp_extractor = MLP_ARENA2D(64)
+        self.mlp_extractor = MLP_ARENA2D(64, input_dim=self.features_dim)
@@ -1,37 +1,23 @@
 from typing import Tuple
 
 import gym
-import os
-import rospkg
 import torch as th
-import yaml
 
 from torch import nn
 from stable_baselines3.common.torch_layers import BaseFeaturesExtractor
 
+from rl_agent.utils.robot_spec import (
+    default_settings_path,
+    load_robot_spec,
+    robot_model_path,
+)
+
 """ 
 _RS: Robot state size - placeholder for robot related inputs to the NN
-_L: Number of laser beams - placeholder for the laser beam data 
+The number of laser beams is taken from the observation space of each model.
 """
 _RS = 2  # robot state size
 
-ROBOT_SETTING_PATH = rospkg.RosPack().get_path("simulator_setup")
-yaml_ROBOT_SETTING_PATH = os.path.join(
-    ROBOT_SETTING_PATH, "robot", "myrobot.model.yaml"
-)
-
-with open(yaml_ROBOT_SETTING_PATH, "r") as fd:
-    robot_data = yaml.safe_load(fd)
-    for plugin in robot_data["plugins"]:
-        if plugin["type"] == "Laser":
-            laser_angle_min = plugin["angle"]["min"]
-            laser_angle_max = plugin["angle"]["max"]
-            laser_angle_increment = plugin["angle"]["increment"]
-            _L = int(
-                round((laser_angle_max - laser_angle_min) / laser_angle_increment) + 1
-            )  # num of laser beams
-            break
-
 
 class MLP_ARENA2D(nn.Module):
     """
@@ -41,6 +27,8 @@ class MLP_ARENA2D(nn.Module):
     :param feature_dim: dimension of the features extracted with the features_extractor (e.g. features from a CNN)
     :param last_layer_dim_pi: (int) number of units for the last layer of the policy network
     :param last_layer_dim_vf: (int) number of units for the last layer of the value network
+    :param input_dim: (int) size of the flattened observation,
+        defaults to the laser beams of the default robot model plus the robot state
     """
 
     def __init__(
@@ -48,6 +36,7 @@ class MLP_ARENA2D(nn.Module):
         feature_dim: int,
         last_layer_dim_pi: int = 32,
         last_layer_dim_vf: int = 32,
+        input_dim: int = None,
     ):
         super(MLP_ARENA2D, self).__init__()
 
@@ -55,9 +44,17 @@ class MLP_ARENA2D(nn.Module):
         self.latent_dim_pi = last_layer_dim_pi
         self.latent_dim_vf = last_layer_dim_vf
 
+        if input_dim is None:
+            input_dim = (
+                load_robot_spec(
+                    robot_model_path(), default_settings_path()
+                ).num_laser_beams
+                + _RS
+            )
+
         # Body network
         self.body_net = nn.Sequential(
-            nn.Linear(_L + _RS, 64), nn.ReLU(), nn.Linear(64, feature_dim), nn.ReLU()
+            nn.Linear(input_dim, 64), nn.ReLU(), nn.Linear(64, feature_dim), nn.ReLU()
         )
 
         # Policy network
@@ -101,7 +98,7 @@ class EXTRACTOR_1(BaseFeaturesExtractor):
         # Compute shape by doing one forward pass
         with th.no_grad():
             # tensor_forward = th.as_tensor(observation_space.sample()[None]).float()
-            tensor_forward = th.randn(1, 1, _L)
+            tensor_forward = th.randn(1, 1, observation_space.shape[0] - _RS)
             n_flatten = self.cnn(tensor_forward).shape[1]
 
         self.fc_1 = nn.Sequential(
@@ -146,7 +143,7 @@ class EXTRACTOR_2(BaseFeaturesExtractor):
         # Compute shape by doing one forward pass
         with th.no_grad():
             # tensor_forward = th.as_tensor(observation_space.sample()[None]).float()
-            tensor_forward = th.randn(1, 1, _L)
+            tensor_forward = th.randn(1, 1, observation_space.shape[0] - _RS)
             n_flatten = self.cnn(tensor_forward).shape[1]
 
         self.fc_1 = nn.Sequential(
@@ -189,7 +186,7 @@ class EXTRACTOR_3(BaseFeaturesExtractor):
         # Compute shape by doing one forward pass
         with th.no_grad():
             # tensor_forward = th.as_tensor(observation_space.sample()[None]).float()
-            tensor_forward = th.randn(1, 1, _L)
+            tensor_forward = th.randn(1, 1, observation_space.shape[0] - _RS)
             n_flatten = self.cnn(tensor_forward).shape[1]
 
         self.fc_1 = nn.Sequential(
@@ -240,7 +237,7 @@ class EXTRACTOR_4(BaseFeaturesExtractor):
 
         # Compute shape by doing one forward pass
         with th.no_grad():
-            tensor_forward = th.randn(1, 1, _L)
+            tensor_forward = th.randn(1, 1, observation_space.shape[0] - _RS)
             n_flatten = self.cnn(tensor_forward).shape[1]
 
         self.fc = nn.Sequential(
@@ -285,7 +282,7 @@ class EXTRACTOR_5(BaseFeaturesExtractor):
 
         # Compute shape by doing one forward pass
         with th.no_grad():
-            tensor_forward = th.randn(1, 1, _L)
+            tensor_forward = th.randn(1, 1, observation_space.shape[0] - _RS)
             n_flatten = self.cnn(tensor_forward).shape[1]
 
         self.fc = nn.Sequential(
@@ -0,0 +1,257 @@
+"""Low-latency inference for deployed agents.
+
+The Stable-Baselines3 'policy.predict' path preprocesses the observation,
+checks the device and converts back and forth between numpy and torch on
+every call. For deployment only the deterministic actor is needed, so it is
+extracted once together with the VecNormalize statistics and run in a
+single forward pass on a preallocated input tensor.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import time
+import torch as th
+
+from gym import spaces
+from torch import nn
+from stable_baselines3.common.policies import ActorCriticPolicy
+
+from rl_agent.utils.debug import TRACER
+
+
+class ObservationNormalizer(nn.Module):
+    """Observation normalization of a VecNormalize object as torch module.
+
+    Note:
+        VecNormalize clips the normalized observation, hence the affine part
+        cannot be folded into the first layer without changing the outputs.
+        Instead it is applied in place on the input buffer.
+    """
+
+    def __init__(self, mean: np.ndarray, var: np.ndarray, epsilon: float, clip_obs: float):
+        super().__init__()
+        self.register_buffer("mean", th.as_tensor(mean, dtype=th.float32))
+        self.register_buffer(
+            "inv_std", 1.0 / th.sqrt(th.as_tensor(var, dtype=th.float32) + epsilon)
+        )
+        self.clip_obs = float(clip_obs)
+
+    @classmethod
+    def from_vec_normalize(cls, vec_normalize) -> "ObservationNormalizer":
+        return cls(
+            vec_normalize.obs_rms.mean,
+            vec_normalize.obs_rms.var,
+            vec_normalize.epsilon,
+            vec_normalize.clip_obs,
+        )
+
+    def forward(self, obs: th.Tensor) -> th.Tensor:
+        return th.clamp((obs - self.mean) * self.inv_std, -self.clip_obs, self.clip_obs)
+
+    def normalize_(self, obs: th.Tensor) -> th.Tensor:
+        """In-place version of 'forward'."""
+        return obs.sub_(self.mean).mul_(self.inv_std).clamp_(-self.clip_obs, self.clip_obs)
+
+
+class DeterministicActor(nn.Module):
+    """Actor path of an SB3 ActorCriticPolicy returning the deterministic action.
+
+    Continuous action spaces yield the mean of the action distribution,
+    discrete ones the index of the most likely action.
+    """
+
+    def __init__(self, policy: ActorCriticPolicy):
+        super().__init__()
+        self.features_extractor = policy.features_extractor
+        self.mlp_extractor = policy.mlp_extractor
+        self.action_net = policy.action_net
+        self.discrete = isinstance(policy.action_space, spaces.Discrete)
+        self.squash_output = policy.squash_output
+        # custom mlp extractors only implement the joint forward pass
+        self._has_forward_actor = hasattr(self.mlp_extractor, "forward_actor")
+
+    def forward(self, obs: th.Tensor) -> th.Tensor:
+        features = self.features_extractor(obs)
+        if self._has_forward_actor:
+            latent_pi = self.mlp_extractor.forward_actor(features)
+        else:
+            latent_pi = self.mlp_extractor(features)[0]
+        action = self.action_net(latent_pi)
+        if self.discrete:
+            return th.argmax(action, dim=1)
+        if self.squash_output:
+            return th.tanh(action)
+        return action
+
+
+class InferenceEngine:
+    def __init__(
+        self,
+        policy: ActorCriticPolicy,
+        vec_normalize=None,
+        device: str = "cpu",
+    ) -> None:
+        """Runs the deterministic actor of a trained policy with minimal overhead.
+
+        Args:
+            policy (ActorCriticPolicy):
+                Trained SB3 policy, e.g. 'PPO.load(model_file).policy'.
+            vec_normalize (VecNormalize, optional):
+                When given, its observation statistics are applied before the
+                forward pass. Defaults to None.
+            device (str, optional):
+                Torch device to run the inference on. Defaults to "cpu".
+        """
+        self._device = th.device(device)
+        self._action_space = policy.action_space
+        self._actor = DeterministicActor(policy).to(self._device).eval()
+        self._normalizer = (
+            ObservationNormalizer.from_vec_normalize(vec_normalize).to(self._device)
+            if vec_normalize is not None and vec_normalize.norm_obs
+            else None
+        )
+
+        obs_dim = int(np.prod(policy.observation_space.shape))
+        self._obs = th.zeros((1, obs_dim), dtype=th.float32, device=self._device)
+        # reallocated when the batch size changes
+        self._batch_obs = self._obs
+
+    @property
+    def device(self) -> th.device:
+        return self._device
+
+    def predict(self, obs: np.ndarray) -> np.ndarray:
+        """Infers the deterministic action for one unnormalized observation.
+
+        Args:
+            obs (np.ndarray): Merged observation array.
+
+        Returns:
+            np.ndarray: Action (index for discrete action spaces)
+        """
+        with TRACER.span("policy_forward"), th.inference_mode():
+            self._obs[0].copy_(th.from_numpy(np.asarray(obs, dtype=np.float32)))
+            if self._normalizer is not None:
+                self._normalizer.normalize_(self._obs)
+            action = self._actor(self._obs)[0].cpu().numpy()
+        return self._postprocess(action)
+
+    def predict_batch(self, obs: np.ndarray) -> np.ndarray:
+        """Infers the deterministic actions for a batch of unnormalized observations.
+
+        Normalization and the forward pass run once for the whole batch.
+
+        Args:
+            obs (np.ndarray): Merged observation arrays of shape (batch, obs_dim).
+
+        Returns:
+            np.ndarray: Actions of shape (batch, action_dim), (batch,) for discrete action spaces
+        """
+        obs = np.asarray(obs, dtype=np.float32)
+        if self._batch_obs.shape[0] != obs.shape[0]:
+            self._batch_obs = th.zeros(
+                (obs.shape[0], self._obs.shape[1]), dtype=th.float32, device=self._device
+            )
+
+        with TRACER.span("policy_forward"), th.inference_mode():
+            self._batch_obs.copy_(th.from_numpy(obs))
+            if self._normalizer is not None:
+                self._normalizer.normalize_(self._batch_obs)
+            actions = self._actor(self._batch_obs).cpu().numpy()
+        return self._postprocess(actions)
+
+    def _postprocess(self, action: np.ndarray) -> np.ndarray:
+        if isinstance(self._action_space, spaces.Box):
+            if self._actor.squash_output:
+                low, high = self._action_space.low, self._action_space.high
+                action = low + 0.5 * (action + 1.0) * (high - low)
+            else:
+                action = np.clip(action, self._action_space.low, self._action_space.high)
+        return action
+
+    def _export_module(self) -> nn.Module:
+        if self._normalizer is None:
+            return self._actor
+        return nn.Sequential(self._normalizer, self._actor)
+
+    def export_torchscript(self, path: str) -> None:
+        """Saves normalization and actor as one traced TorchScript module.
+
+        Args:
+            path (str): Target file, e.g. '.../best_model.pt'.
+        """
+        with th.no_grad():
+            traced = th.jit.trace(self._export_module(), th.zeros_like(self._obs))
+        traced.save(path)
+
+    def export_onnx(self, path: str) -> None:
+        """Saves normalization and actor as ONNX graph with a dynamic batch axis.
+
+        Args:
+            path (str): Target file, e.g. '.../best_model.onnx'.
+        """
+        th.onnx.export(
+            self._export_module(),
+            th.zeros_like(self._obs),
+            path,
+            input_names=["obs"],
+            output_names=["action"],
+            dynamic_axes={"obs": {0: "batch"}, "action": {0: "batch"}},
+        )
+
+
+class LatencyReport:
+    def __init__(self, budget: float, report_interval: int = 100) -> None:
+        """Collects the duration of the stages of each action cycle.
+
+        Args:
+            budget (float): Time in seconds available per cycle.
+            report_interval (int, optional):
+                Number of cycles summarized in one report. Defaults to 100.
+        """
+        self.budget = budget
+        self.report_interval = report_interval
+        self._stage_sums: Dict[str, float] = {}
+        self._cycles = 0
+        self._max_total = 0.0
+        self._over_budget = 0
+        self._last = None
+        self._cycle_start = None
+
+    def start_cycle(self) -> None:
+        self._cycle_start = self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        """Closes the given stage of the running cycle."""
+        now = time.perf_counter()
+        self._stage_sums[stage] = self._stage_sums.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def end_cycle(self) -> Optional[str]:
+        """Closes the running cycle.
+
+        Returns:
+            Optional[str]: Summary after every 'report_interval' cycles, otherwise None.
+        """
+        total = time.perf_counter() - self._cycle_start
+        self._cycles += 1
+        self._max_total = max(self._max_total, total)
+        if total > self.budget:
+            self._over_budget += 1
+
+        if self._cycles < self.report_interval:
+            return None
+
+        stages = ", ".join(
+            f"{stage}: {1e3 * duration / self._cycles:.2f}ms"
+            for stage, duration in self._stage_sums.items()
+        )
+        report = (
+            f"mean per cycle [{stages}] | max total: {1e3 * self._max_total:.2f}ms | "
+            f"over budget ({1e3 * self.budget:.0f}ms): {self._over_budget}/{self._cycles}"
+        )
+        self._stage_sums = {}
+        self._cycles = 0
+        self._max_total = 0.0
+        self._over_budget = 0
+        return report
@@ -1,5 +1,11 @@
+import json
+import os
+import threading
 import time
+from collections import deque
+from contextlib import nullcontext
 from functools import wraps
+from typing import Any, Dict, List, Optional
 
 
 def timeit(f):
@@ -14,3 +20,248 @@ def timeit(f):
         return result
 
     return timed
+
+
+# durations are binned by their bit length in ns, i.e. bucket b holds [2^(b-1), 2^b)
+_NUM_BUCKETS = 64
+_NULL_SPAN = nullcontext()
+
+
+class SpanHistogram:
+    """Log2 histogram of span durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def add(self, duration: int) -> None:
+        self.counts[min(duration.bit_length(), _NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+    def merge(self, other: "SpanHistogram") -> None:
+        for b, count in enumerate(other.counts):
+            self.counts[b] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """Approximates the q-th percentile (0..100) by the geometric bucket center."""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for b, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                if b == 0:
+                    return 0.0
+                value = 2 ** (b - 0.5)
+                return float(min(max(value, self.min), self.max))
+        return float(self.max)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns count, mean, p50, p95, p99 and max, durations in ms."""
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(50) / 1e6,
+            "p95_ms": self.percentile(95) / 1e6,
+            "p99_ms": self.percentile(99) / 1e6,
+            "max_ms": self.max / 1e6,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpanHistogram":
+        hist = cls()
+        for slot in cls.__slots__:
+            setattr(hist, slot, data[slot])
+        return hist
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_start")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self._tracer = tracer
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._tracer.record(self._name, self._start, time.perf_counter_ns())
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False, max_events: int = 100000):
+        """Named spans with in-process histograms and an optional event trace.
+
+        Description:
+            Spans are timed with the monotonic 'time.perf_counter_ns'. Every span
+            name keeps a log2 histogram of its durations, the last 'max_events'
+            spans are additionally kept for a Chrome trace (chrome://tracing,
+            Perfetto). While disabled, 'span' returns a shared no-op context, so
+            instrumented code only pays for one attribute lookup.
+
+        Args:
+            enabled (bool, optional): Record spans. Defaults to False.
+            max_events (int, optional):
+                Spans kept for the Chrome trace, 0 disables the event
+                recording. Defaults to 100000.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, SpanHistogram] = {}
+        self._events = deque(maxlen=max_events) if max_events > 0 else None
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    @staticmethod
+    def now() -> int:
+        """Monotonic timestamp in ns, the clock of the spans."""
+        return time.perf_counter_ns()
+
+    def span(self, name: str):
+        """Context manager timing the enclosed block as span 'name'."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator timing every call of the function as span 'name'
+        (defaults to the qualified function name)."""
+
+        def decorator(f):
+            span_name = name or f.__qualname__
+
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.record(span_name, start, time.perf_counter_ns())
+
+            return wrapper
+
+        return decorator
+
+    def record(self, name: str, start: int, end: int) -> None:
+        """Adds a finished span, 'start' and 'end' from 'time.perf_counter_ns'."""
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = SpanHistogram()
+            hist.add(end - start)
+            if self._events is not None:
+                self._events.append((name, start, end - start, threading.get_ident()))
+
+    def export(self, reset: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Returns the histograms as plain dicts, e.g. to send them across processes.
+
+        Args:
+            reset (bool, optional): Start new histograms afterwards. Defaults to False.
+        """
+        with self._lock:
+            data = {name: hist.to_dict() for name, hist in self._histograms.items()}
+            if reset:
+                self._histograms = {}
+        return data
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the statistics per span name, see 'SpanHistogram.stats'."""
+        return merge_span_stats([self.export()])
+
+    def dump_chrome_trace(self, path: str) -> None:
+        """Writes the recorded spans as Chrome trace event JSON file."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events) if self._events is not None else []
+        trace = {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": start / 1e3,
+                    "dur": duration / 1e3,
+                    "pid": pid,
+                    "tid": tid,
+                }
+                for name, start, duration, tid in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(trace, file)
+
+
+def merge_span_stats(exports: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, float]]:
+    """Merges the exported histograms of several tracers (e.g. one per env process)
+    and returns the statistics per span name."""
+    merged: Dict[str, SpanHistogram] = {}
+    for export in exports:
+        for name, data in export.items():
+            merged.setdefault(name, SpanHistogram()).merge(SpanHistogram.from_dict(data))
+    return {name: hist.stats() for name, hist in merged.items()}
+
+
+class _TracedServiceProxy:
+    """Forwards to a rospy.ServiceProxy and times every call."""
+
+    def __init__(self, proxy, name: str, tracer: Tracer):
+        self._proxy = proxy
+        self._name = name
+        self._tracer = tracer
+
+    def __call__(self, *args, **kwargs):
+        with self._tracer.span(self._name):
+            return self._proxy(*args, **kwargs)
+
+    def call(self, *args, **kwargs):
+        with self._tracer.span(self._name):
+            return self._proxy.call(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._proxy, attr)
+
+
+def trace_service_clients(obj, prefix: str, tracer: Optional["Tracer"] = None) -> None:
+    """Replaces every rospy.ServiceProxy attribute of 'obj' by a timed one, the spans
+    are named '<prefix>/<attribute>'. Does nothing while the tracer is disabled."""
+    import rospy
+
+    tracer = tracer or TRACER
+    if obj is None or not tracer.enabled:
+        return
+    for attr, value in list(vars(obj).items()):
+        if isinstance(value, rospy.ServiceProxy):
+            setattr(obj, attr, _TracedServiceProxy(value, f"{prefix}/{attr}", tracer))
+
+
+# process wide tracer, enabled by the environment variable ARENA_TRACE=1
+TRACER = Tracer(enabled=os.environ.get("ARENA_TRACE", "0") == "1")
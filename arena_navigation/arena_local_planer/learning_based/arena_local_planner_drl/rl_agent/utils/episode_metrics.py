@@ -0,0 +1,141 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class EpisodeMetrics:
+    # columns of the per step record
+    X, Y, THETA, MIN_SCAN, CRASH, SAFE_DIST = range(6)
+
+    def __init__(self, max_steps: int, step_time: float):
+        """Accumulates the per step data of an episode and evaluates it at once.
+
+        Description:
+            'add' only writes one row into a preallocated array, all metrics are
+            computed vectorized by 'compute' when the episode is over. The result
+            is cached, 'summary' returns it without any further work.
+
+        Args:
+            max_steps (int): Expected max. number of steps per episode, the
+                record grows beyond it if needed.
+            step_time (float): Duration of one step in seconds.
+        """
+        self.step_time = step_time
+        self._record = np.zeros((max_steps + 1, 6))
+        self._num_steps = 0
+        self._global_plan: Optional[np.ndarray] = None
+        self._summary: Dict[str, float] = {}
+        self._summary_steps = -1
+
+    def __len__(self) -> int:
+        return self._num_steps
+
+    def reset(self) -> None:
+        # the summary of the finished episode is kept until the next compute
+        self._num_steps = 0
+        self._global_plan = None
+        self._summary_steps = -1
+
+    def add(
+        self,
+        robot_pose,
+        min_scan: float,
+        crash: bool = False,
+        safe_dist: bool = False,
+        global_plan: Optional[np.ndarray] = None,
+    ) -> None:
+        """Records one step.
+
+        Args:
+            robot_pose (Pose2D): Robot pose after the step.
+            min_scan (float): Smallest laser range of the step.
+            crash (bool, optional): Robot collided. Defaults to False.
+            safe_dist (bool, optional): Safe distance undercut. Defaults to False.
+            global_plan (np.ndarray, optional): Current global plan (N, 2),
+                progress is measured along the first non-empty one of the episode.
+        """
+        if self._num_steps == len(self._record):
+            self._record = np.concatenate((self._record, np.zeros_like(self._record)))
+        self._record[self._num_steps] = (
+            robot_pose.x,
+            robot_pose.y,
+            robot_pose.theta,
+            min_scan,
+            crash,
+            safe_dist,
+        )
+        self._num_steps += 1
+
+        if self._global_plan is None and global_plan is not None and len(global_plan) > 1:
+            self._global_plan = global_plan
+
+    def compute(self) -> Dict[str, float]:
+        """Evaluates the recorded steps of the episode.
+
+        Returns:
+            Dict[str, float]:
+                'distance_travelled' (m), 'jerk' (mean absolute jerk of the speed,
+                m/s^3), 'time_safe_dist' (s), 'collisions' (number of distinct
+                contacts), 'plan_progress' (share of the global plan covered,
+                nan without plan), 'min_clearance' (m) and 'time' (s).
+        """
+        if self._summary_steps == self._num_steps:
+            return self._summary
+
+        record = self._record[: self._num_steps]
+        positions = record[:, : self.THETA]
+        step_lengths = np.hypot(*np.diff(positions, axis=0).T)
+
+        jerk = 0.0
+        if len(step_lengths) >= 3:
+            speed = step_lengths / self.step_time
+            jerk = float(np.abs(np.diff(speed, 2)).mean() / self.step_time ** 2)
+
+        crash = record[:, self.CRASH] > 0
+        # a contact lasts several steps but counts as one collision
+        collisions = int(np.count_nonzero(crash[1:] & ~crash[:-1])) + int(
+            crash[:1].any()
+        )
+
+        self._summary = {
+            "distance_travelled": float(step_lengths.sum()),
+            "jerk": jerk,
+            "time_safe_dist": float(
+                np.count_nonzero(record[:, self.SAFE_DIST]) * self.step_time
+            ),
+            "collisions": collisions,
+            "plan_progress": self._plan_progress(positions),
+            "min_clearance": float(record[:, self.MIN_SCAN].min())
+            if len(record)
+            else np.nan,
+            "time": self._num_steps * self.step_time,
+        }
+        self._summary_steps = self._num_steps
+        return self._summary
+
+    def summary(self) -> Dict[str, float]:
+        """Returns the metrics of the last computed episode (empty before the first)."""
+        return self._summary
+
+    def _plan_progress(self, positions: np.ndarray) -> float:
+        plan = self._global_plan
+        if plan is None or len(positions) == 0:
+            return np.nan
+        segments = np.diff(plan, axis=0)
+        segment_lengths = np.hypot(*segments.T)
+        total_length = segment_lengths.sum()
+        if total_length == 0:
+            return np.nan
+
+        # projection of the final position onto every segment of the plan
+        squared_lengths = np.maximum(segment_lengths ** 2, 1e-12)
+        t = np.clip(
+            np.einsum("ij,ij->i", positions[-1] - plan[:-1], segments) / squared_lengths,
+            0.0,
+            1.0,
+        )
+        projections = plan[:-1] + t[:, None] * segments
+        nearest = np.argmin(np.hypot(*(projections - positions[-1]).T))
+
+        covered = segment_lengths[:nearest].sum() + t[nearest] * segment_lengths[nearest]
+        return float(covered / total_length)
@@ -0,0 +1,112 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+import yaml
+
+
+class GridMap:
+    FREE, OCCUPIED, UNKNOWN = 0, 100, -1
+
+    def __init__(self, grid: np.ndarray, resolution: float, origin: Tuple[float, float]):
+        """Occupancy grid of a map, laid out as in nav_msgs/OccupancyGrid.
+
+        Args:
+            grid (np.ndarray): (height, width) int8 cells with the values FREE,
+                OCCUPIED or UNKNOWN, row 0 is the bottom of the map.
+            resolution (float): Cell size in meters.
+            origin (Tuple[float, float]): Position of the lower left corner of
+                cell (0, 0) in meters.
+        """
+        self.grid = grid
+        self.resolution = float(resolution)
+        self.origin = np.asarray(origin[:2], dtype=np.float64)
+        # unknown cells are treated as obstacles
+        self.occupied = grid != GridMap.FREE
+        # occupied border ring, points outside of the map are clipped onto it
+        self._occupied_padded = np.pad(self.occupied, 1, constant_values=True)
+        self._distance_field: Optional[np.ndarray] = None
+
+    @property
+    def height(self) -> int:
+        return self.grid.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.grid.shape[1]
+
+    @classmethod
+    def from_yaml(cls, map_yaml_path: str) -> "GridMap":
+        """Loads a map_server map (yaml and image) in trinary mode."""
+        with open(map_yaml_path, "r") as file:
+            map_yaml = yaml.safe_load(file)
+        image = read_pgm(os.path.join(os.path.dirname(map_yaml_path), map_yaml["image"]))
+
+        occupancy = image.astype(np.float64) / 255.0
+        if not map_yaml.get("negate", 0):
+            occupancy = 1.0 - occupancy
+        grid = np.full(image.shape, GridMap.UNKNOWN, dtype=np.int8)
+        grid[occupancy > map_yaml["occupied_thresh"]] = GridMap.OCCUPIED
+        grid[occupancy < map_yaml["free_thresh"]] = GridMap.FREE
+        # image rows start at the top, grid rows at the bottom
+        return cls(grid[::-1].copy(), map_yaml["resolution"], map_yaml["origin"])
+
+    def to_cells(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the (row, col) indices of the points (..., 2), which may lie
+        outside of the map."""
+        cells = np.floor((np.asarray(xy) - self.origin) / self.resolution).astype(np.intp)
+        return cells[..., 1], cells[..., 0]
+
+    def to_world(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Returns the center points (..., 2) of the given cells."""
+        return self.origin + (np.stack((cols, rows), axis=-1) + 0.5) * self.resolution
+
+    def is_occupied(self, xy: np.ndarray) -> np.ndarray:
+        """Occupancy of the points (..., 2), points outside of the map are occupied."""
+        rows, cols = self.to_cells(xy)
+        rows = np.clip(rows, -1, self.height) + 1
+        cols = np.clip(cols, -1, self.width) + 1
+        return self._occupied_padded[rows, cols]
+
+    @property
+    def distance_field(self) -> np.ndarray:
+        """Distance in meters from every cell center to the closest occupied cell,
+        including the occupied border ring around the map."""
+        if self._distance_field is None:
+            from scipy.ndimage import distance_transform_edt
+
+            self._distance_field = (
+                distance_transform_edt(~self._occupied_padded)[1:-1, 1:-1] * self.resolution
+            ).astype(np.float32)
+        return self._distance_field
+
+    def clearance(self, xy: np.ndarray) -> np.ndarray:
+        """Distance to the closest occupied cell of the points (..., 2), 0 outside."""
+        rows, cols = self.to_cells(xy)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        clearance = np.zeros(rows.shape, dtype=np.float32)
+        clearance[inside] = self.distance_field[rows[inside], cols[inside]]
+        return clearance
+
+
+def read_pgm(path: str) -> np.ndarray:
+    """Reads a binary (P5) 8 bit pgm image."""
+    with open(path, "rb") as file:
+        data = file.read()
+    fields, pos = [], 0
+    while len(fields) < 4:
+        while data[pos : pos + 1].isspace():
+            pos += 1
+        if data[pos : pos + 1] == b"#":
+            pos = data.index(b"\n", pos) + 1
+            continue
+        end = pos
+        while not data[end : end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    magic, width, height, max_value = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    assert magic == b"P5" and max_value < 256, f"Unsupported pgm format of {path}"
+    return np.frombuffer(data, dtype=np.uint8, count=width * height, offset=pos + 1).reshape(
+        height, width
+    )
@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, Optional, Tuple, Type
+
+import rospy
+
+from genpy import Message
+
+
+class LatestMessage:
+    """Latest message of a topic received through one persistent subscription.
+
+    Replaces 'rospy.wait_for_message', which registers and tears down a
+    subscriber (master lookup and TCP connect) on every call. Use 'get' to
+    share one instance, and thus one subscription, per topic and process.
+    """
+
+    _instances: Dict[Tuple[str, Type[Message]], "LatestMessage"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, topic: str, data_class: Type[Message], **subscriber_kwargs):
+        """
+        Args:
+            topic (str): Topic to subscribe to.
+            data_class (Type[Message]): Message type of the topic.
+            **subscriber_kwargs: Passed on to 'rospy.Subscriber'.
+        """
+        self.topic = topic
+        self._condition = threading.Condition()
+        self._msg = None
+        self._stamp = None
+        # number of messages received, orders messages whose stamps are equal
+        self._seq = 0
+        self._sub = rospy.Subscriber(
+            topic, data_class, self._callback, **subscriber_kwargs
+        )
+
+    @classmethod
+    def get(cls, topic: str, data_class: Type[Message], **subscriber_kwargs) -> "LatestMessage":
+        """Returns the process wide instance for the topic, creates it on first use."""
+        key = (topic, data_class)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(topic, data_class, **subscriber_kwargs)
+            return cls._instances[key]
+
+    def _callback(self, msg: Message) -> None:
+        # messages without header are stamped with their time of arrival
+        stamp = msg.header.stamp if hasattr(msg, "header") else rospy.get_rostime()
+        with self._condition:
+            self._msg = msg
+            self._stamp = stamp
+            self._seq += 1
+            self._condition.notify_all()
+
+    @property
+    def msg(self) -> Optional[Message]:
+        return self._msg
+
+    @property
+    def stamp(self) -> Optional[rospy.Time]:
+        return self._stamp
+
+    @property
+    def seq(self) -> int:
+        """Number of messages received so far."""
+        return self._seq
+
+    def wait_for_newer(
+        self, seq: Optional[int] = None, timeout: Optional[float] = None
+    ) -> Tuple[Optional[Message], Optional[int]]:
+        """Blocks until a message received after the one numbered 'seq' is available.
+
+        Note:
+            Messages are ordered by arrival, not by stamp. Header-less messages
+            arriving within the same clock tick share a stamp, e.g. two
+            'next_cycle' triggers in one simulation step.
+
+        Args:
+            seq (int, optional):
+                Sequence number of the last message the caller consumed, as
+                returned by a previous call. When None, any message is
+                accepted. Defaults to None.
+            timeout (float, optional):
+                Timeout in seconds (wall time). When None, waits until ROS
+                is shut down. Defaults to None.
+
+        Returns:
+            Tuple[Optional[Message], Optional[int]]:
+                Latest message and its sequence number, (None, seq) on timeout
+                or shutdown.
+        """
+
+        def is_newer():
+            return self._seq > (0 if seq is None else seq)
+
+        with self._condition:
+            if timeout is not None:
+                received = self._condition.wait_for(is_newer, timeout=timeout)
+            else:
+                received = False
+                while not received and not rospy.is_shutdown():
+                    received = self._condition.wait_for(is_newer, timeout=1.0)
+            if not received:
+                return None, seq
+            return self._msg, self._seq
+
+    def wait_for_next(self, timeout: Optional[float] = None) -> Optional[Message]:
+        """Blocks until a message arrives after this call.
+
+        Args:
+            timeout (float, optional):
+                Timeout in seconds (wall time). When None, waits until ROS
+                is shut down. Defaults to None.
+
+        Returns:
+            Optional[Message]: The new message, None on timeout or shutdown.
+        """
+        return self.wait_for_newer(self._seq, timeout)[0]
@@ -6,7 +6,6 @@ from numpy.core.numeric import normalize_axis_tuple
 import rospy
 import random
 import numpy as np
-from collections import deque
 
 import time  # for debuging
 import threading
@@ -33,6 +32,10 @@ import numpy as np
 
 from std_msgs.msg import Bool
 
+from rl_agent.utils.debug import TRACER
+from rl_agent.utils.latest_message import LatestMessage
+from rl_agent.utils.stamp_sync import ScanOdomSynchronizer
+
 
 class ObservationCollector:
     def __init__(
@@ -87,13 +90,19 @@ class ObservationCollector:
         # synchronization parameters
         self._ext_time_sync = external_time_sync
         self._first_sync_obs = (
-            True  # whether to return first sync'd obs or most recent
+            False  # whether to return first sync'd obs or most recent
         )
         self.max_deque_size = 10
         self._sync_slop = 0.05
-
-        self._laser_deque = deque()
-        self._rs_deque = deque()
+        # interpolate the odometry pose to the scan stamp
+        self._sync_interpolate_odom = False
+        # log the sync statistics every n observations
+        self._sync_report_interval = 1000
+        self._num_obs = 0
+
+        self._synchronizer = ScanOdomSynchronizer(
+            self.max_deque_size, self._sync_slop, self._sync_interpolate_odom
+        )
 
         # subscriptions
         # ApproximateTimeSynchronizer appears to be slow for training, but with real robot, own sync method doesn't accept almost any messages as synced
@@ -145,6 +154,12 @@ class ObservationCollector:
             self._sim_step_client = rospy.ServiceProxy(
                 self._service_name_step, StepWorld
             )
+        else:
+            # action cycle trigger of the ActionPublisher
+            self._cycle_trigger = LatestMessage.get(
+                f"{self.ns_prefix}next_cycle", Bool
+            )
+            self._last_cycle_seq = None
 
     def get_observation_space(self):
         return self.observation_space
@@ -154,20 +169,19 @@ class ObservationCollector:
         if self._is_train_mode:
             self.call_service_takeSimStep(self._action_frequency)
         else:
-            try:
-                rospy.wait_for_message(f"{self.ns_prefix}next_cycle", Bool)
-            except Exception:
-                pass
+            # returns right away if the caller already waited for this cycle
+            _, self._last_cycle_seq = self._cycle_trigger.wait_for_newer(
+                self._last_cycle_seq
+            )
 
         if not self._ext_time_sync:
             # try to retrieve sync'ed obs
-            laser_scan, robot_pose = self.get_sync_obs()
+            with TRACER.span("sync"):
+                laser_scan, robot_pose = self.get_sync_obs()
             if laser_scan is not None and robot_pose is not None:
-                # print("Synced successfully")
                 self._scan = laser_scan
                 self._robot_pose = robot_pose
-            # else:
-            #     print("Not synced")
+            self._report_sync_stats()
 
         if len(self._scan.ranges) > 0:
             scan = self._scan.ranges.astype(np.float32)
@@ -186,8 +200,6 @@ class ObservationCollector:
             "robot_pose": self._robot_pose,
         }
 
-        self._laser_deque.clear()
-        self._rs_deque.clear()
         return merged_obs, obs_dict
 
     @staticmethod
@@ -201,38 +213,28 @@ class ObservationCollector:
         return rho, theta
 
     def get_sync_obs(self):
-        laser_scan = None
-        robot_pose = None
-
-        # print(f"laser deque: {len(self._laser_deque)}, robot state deque: {len(self._rs_deque)}")
-        while len(self._rs_deque) > 0 and len(self._laser_deque) > 0:
-            laser_scan_msg = self._laser_deque.popleft()
-            robot_pose_msg = self._rs_deque.popleft()
-
-            laser_stamp = laser_scan_msg.header.stamp.to_sec()
-            robot_stamp = robot_pose_msg.header.stamp.to_sec()
-
-            while abs(laser_stamp - robot_stamp) > self._sync_slop:
-                if laser_stamp > robot_stamp:
-                    if len(self._rs_deque) == 0:
-                        return laser_scan, robot_pose
-                    robot_pose_msg = self._rs_deque.popleft()
-                    robot_stamp = robot_pose_msg.header.stamp.to_sec()
-                else:
-                    if len(self._laser_deque) == 0:
-                        return laser_scan, robot_pose
-                    laser_scan_msg = self._laser_deque.popleft()
-                    laser_stamp = laser_scan_msg.header.stamp.to_sec()
-
-            laser_scan = self.process_scan_msg(laser_scan_msg)
-            robot_pose, _ = self.process_robot_state_msg(robot_pose_msg)
-
-            if self._first_sync_obs:
-                break
-
-        # print(f"Laser_stamp: {laser_stamp}, Robot_stamp: {robot_stamp}")
+        laser_scan_msg, robot_state_msg = self._synchronizer.get(
+            first=self._first_sync_obs
+        )
+        if laser_scan_msg is None:
+            return None, None
+
+        laser_scan = self.process_scan_msg(laser_scan_msg)
+        robot_pose, _ = self.process_robot_state_msg(robot_state_msg)
         return laser_scan, robot_pose
 
+    def _report_sync_stats(self):
+        self._num_obs += 1
+        if self._num_obs % self._sync_report_interval != 0:
+            return
+        rospy.logdebug(
+            f"{self.ns_prefix}scan/odom sync: hit rate "
+            f"{self._synchronizer.hit_rate:.2f}, mean skew "
+            f"{1e3 * self._synchronizer.mean_skew:.1f}ms "
+            f"(slop: {1e3 * self._sync_slop:.0f}ms)"
+        )
+        self._synchronizer.reset_stats()
+
     def call_service_takeSimStep(self, t=None):
         request = StepWorldRequest() if t is None else StepWorldRequest(t)
         timeout = 12
@@ -271,14 +273,10 @@ class ObservationCollector:
         return
 
     def callback_scan(self, msg_laserscan):
-        if len(self._laser_deque) == self.max_deque_size:
-            self._laser_deque.popleft()
-        self._laser_deque.append(msg_laserscan)
+        self._synchronizer.add_scan(msg_laserscan)
 
     def callback_robot_state(self, msg_robotstate):
-        if len(self._rs_deque) == self.max_deque_size:
-            self._rs_deque.popleft()
-        self._rs_deque.append(msg_robotstate)
+        self._synchronizer.add_odom(msg_robotstate)
 
     def callback_observation_received(
         self, msg_LaserScan, msg_RobotStateStamped
@@ -0,0 +1,145 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import rospy
+
+from sensor_msgs.msg import LaserScan
+from geometry_msgs.msg import PoseStamped
+from nav_msgs.msg import Odometry, Path
+
+from rl_agent.utils.stamp_sync import ScanOdomSynchronizer
+
+
+class MultiAgentObservationHub:
+    def __init__(
+        self,
+        robot_namespaces: List[str],
+        num_lidar_beams: int,
+        sync_slop: float = 0.05,
+        max_queue_size: int = 10,
+    ):
+        """Collects the synced observations of all robots of one simulation.
+
+        Description:
+            Every robot's scan and odometry are paired by a ScanOdomSynchronizer
+            in the subscriber callbacks, hence 'collect' only fetches the newest
+            pair per robot and computes the goals in robot frame for all robots
+            at once. The merged observations are written into two alternating
+            preallocated buffers, rows of the returned array therefore stay
+            valid until the next but one call.
+
+        Args:
+            robot_namespaces (List[str]):
+                Namespace per robot, e.g. 'sim_1/robot1/'.
+            num_lidar_beams (int): Number of laser beams (same for all robots).
+            sync_slop (float, optional):
+                Max. time difference of a scan/odom pair in seconds. Defaults to 0.05.
+            max_queue_size (int, optional):
+                Odometry messages kept per robot for the sync. Defaults to 10.
+        """
+        self.num_robots = len(robot_namespaces)
+        self._num_beams = num_lidar_beams
+
+        # merged observation: [laser scan, rho, theta]
+        self._buffers = np.zeros(
+            (2, self.num_robots, num_lidar_beams + 2), dtype=np.float32
+        )
+        self._buffer_idx = 0
+        # latest synced scans, kept when no new pair arrived since the last step
+        self._scans = np.zeros((self.num_robots, num_lidar_beams), dtype=np.float32)
+        # (x, y, theta)
+        self._robot_poses = np.zeros((self.num_robots, 3))
+        self._subgoals = np.zeros((self.num_robots, 3))
+        self._global_plans = [np.array([]) for _ in range(self.num_robots)]
+
+        self._synchronizers = [
+            ScanOdomSynchronizer(max_queue_size, sync_slop)
+            for _ in range(self.num_robots)
+        ]
+        self._subs = []
+        for i, ns in enumerate(robot_namespaces):
+            ns_prefix = "" if ns is None or ns == "" else "/" + ns.strip("/") + "/"
+            self._subs += [
+                rospy.Subscriber(
+                    f"{ns_prefix}scan_mapped",
+                    LaserScan,
+                    self._synchronizers[i].add_scan,
+                    tcp_nodelay=True,
+                ),
+                rospy.Subscriber(
+                    f"{ns_prefix}odom",
+                    Odometry,
+                    self._synchronizers[i].add_odom,
+                    tcp_nodelay=True,
+                ),
+                rospy.Subscriber(
+                    f"{ns_prefix}subgoal",
+                    PoseStamped,
+                    self._callback_subgoal,
+                    callback_args=i,
+                ),
+                rospy.Subscriber(
+                    f"{ns_prefix}globalPlan",
+                    Path,
+                    self._callback_global_plan,
+                    callback_args=i,
+                ),
+            ]
+
+    def collect(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Retrieves the latest synced observations of all robots.
+
+        Returns:
+            Tuple[np.ndarray, Dict[str, np.ndarray]]:
+                Merged observations (num_robots, num_beams + 2) and the observation
+                dictionary with the stacked 'laser_scan', 'goal_in_robot_frame'
+                and 'robot_pose' arrays as well as the 'global_plan' list.
+        """
+        for i, synchronizer in enumerate(self._synchronizers):
+            scan_msg, odom_msg = synchronizer.get()
+            if scan_msg is None:
+                continue
+            scan = self._scans[i]
+            scan[:] = scan_msg.ranges
+            scan[np.isnan(scan)] = scan_msg.range_max
+            self._robot_poses[i] = MultiAgentObservationHub._odom_to_pose2d(odom_msg)
+
+        merged = self._buffers[self._buffer_idx]
+        self._buffer_idx ^= 1
+        laser_scans = merged[:, : self._num_beams]
+        goals = merged[:, self._num_beams :]
+        laser_scans[:] = self._scans
+
+        x_relative = self._subgoals[:, 0] - self._robot_poses[:, 0]
+        y_relative = self._subgoals[:, 1] - self._robot_poses[:, 1]
+        goals[:, 0] = np.hypot(x_relative, y_relative)
+        goals[:, 1] = (
+            np.arctan2(y_relative, x_relative) - self._robot_poses[:, 2] + 4 * np.pi
+        ) % (2 * np.pi) - np.pi
+
+        obs_dict = {
+            "laser_scan": laser_scans,
+            "goal_in_robot_frame": goals,
+            "global_plan": self._global_plans,
+            "robot_pose": self._robot_poses.copy(),
+        }
+        return merged, obs_dict
+
+    def _callback_subgoal(self, msg_subgoal: PoseStamped, idx: int):
+        self._subgoals[idx] = MultiAgentObservationHub._pose_to_pose2d(msg_subgoal.pose)
+
+    def _callback_global_plan(self, msg_global_plan: Path, idx: int):
+        self._global_plans[idx] = np.array(
+            [[p.pose.position.x, p.pose.position.y] for p in msg_global_plan.poses]
+        )
+
+    @staticmethod
+    def _odom_to_pose2d(msg_odometry: Odometry) -> Tuple[float, float, float]:
+        return MultiAgentObservationHub._pose_to_pose2d(msg_odometry.pose.pose)
+
+    @staticmethod
+    def _pose_to_pose2d(pose) -> Tuple[float, float, float]:
+        q = pose.orientation
+        # yaw of the quaternion, same as 'euler_from_quaternion(...)[2]'
+        yaw = np.arctan2(2.0 * (q.w * q.z + q.x * q.y), 1.0 - 2.0 * (q.y ** 2 + q.z ** 2))
+        return pose.position.x, pose.position.y, yaw
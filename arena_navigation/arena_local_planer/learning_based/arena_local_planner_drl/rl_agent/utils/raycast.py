@@ -0,0 +1,232 @@
+import os
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from rl_agent.utils.grid_map import GridMap
+from rl_agent.utils.robot_spec import load_yaml
+
+
+class Obstacles(NamedTuple):
+    """Obstacles on top of the map, shared by all poses of a batch.
+
+    Attributes:
+        circles: (N, 3) circles as [x, y, radius].
+        segments: (M, 2, 2) line segments, e.g. the edges of polygons.
+    """
+
+    circles: np.ndarray
+    segments: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "Obstacles":
+        return cls(np.zeros((0, 3)), np.zeros((0, 2, 2)))
+
+    @classmethod
+    def from_shapes(
+        cls,
+        circles: Sequence[Sequence[float]] = (),
+        polygons: Sequence[np.ndarray] = (),
+    ) -> "Obstacles":
+        """Creates the obstacles from circles [x, y, radius] and closed polygons (K, 2)."""
+        return cls(
+            np.asarray(circles, dtype=np.float64).reshape(-1, 3),
+            polygon_segments(polygons),
+        )
+
+    def distance(self, xy: np.ndarray) -> float:
+        """Distance of the point (2,) to the closest obstacle boundary, inf without
+        obstacles (not signed, points inside of polygons measure the distance to
+        the closest edge)."""
+        xy = np.asarray(xy, dtype=np.float64)
+        dist = np.inf
+        if len(self.circles):
+            center_dist = np.linalg.norm(self.circles[:, :2] - xy, axis=1)
+            dist = min(dist, np.maximum(center_dist - self.circles[:, 2], 0.0).min())
+        if len(self.segments):
+            starts = self.segments[:, 0]
+            edges = self.segments[:, 1] - starts
+            lengths = np.maximum(np.sum(edges ** 2, axis=1), 1e-12)
+            u = np.clip(np.sum((xy - starts) * edges, axis=1) / lengths, 0.0, 1.0)
+            closest = starts + edges * u[:, None]
+            dist = min(dist, np.linalg.norm(closest - xy, axis=1).min())
+        return float(dist)
+
+    def __add__(self, other: "Obstacles") -> "Obstacles":
+        return Obstacles(
+            np.concatenate((self.circles, other.circles)),
+            np.concatenate((self.segments, other.segments)),
+        )
+
+
+def polygon_segments(polygons: Sequence[np.ndarray]) -> np.ndarray:
+    """Returns the edges (M, 2, 2) of the closed polygons, each given by its vertices (K, 2)."""
+    segments = [
+        np.stack((polygon, np.roll(polygon, -1, axis=0)), axis=1)
+        for polygon in map(np.asarray, polygons)
+        if len(polygon) > 1
+    ]
+    if not segments:
+        return np.zeros((0, 2, 2))
+    return np.concatenate(segments).astype(np.float64)
+
+
+def model_obstacles(model_yaml_path: str, pos: Sequence[float], angle: float) -> Obstacles:
+    """Footprints of a flatland model yaml placed at 'pos' with rotation 'angle'."""
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    offset = np.asarray(pos[:2], dtype=np.float64)
+
+    circles, polygons = [], []
+    for body in load_yaml(model_yaml_path)["bodies"]:
+        for footprint in body.get("footprints", []):
+            if footprint["type"] == "circle":
+                center = rotation @ np.asarray(footprint.get("center", [0.0, 0.0])) + offset
+                circles.append([*center, footprint.get("radius", 0.5)])
+            elif footprint["type"] == "polygon":
+                polygons.append(np.asarray(footprint["points"]) @ rotation.T + offset)
+    return Obstacles.from_shapes(circles, polygons)
+
+
+def static_obstacles(scenario: dict, models_dir: Optional[str] = None) -> Obstacles:
+    """Static obstacles of an ArenaScenario json file.
+
+    Args:
+        scenario (dict): Parsed ArenaScenario json data.
+        models_dir (str, optional): Directory to look up the model yaml files in,
+            if their 'model_path' does not exist on this machine. Defaults to None.
+    """
+    obstacles = Obstacles.empty()
+    for obstacle in scenario.get("static_obstacles", []):
+        model_path = obstacle["model_path"]
+        if not os.path.exists(model_path) and models_dir is not None:
+            model_path = os.path.join(models_dir, os.path.basename(model_path))
+        obstacles += model_obstacles(model_path, obstacle["pos"], obstacle.get("angle", 0.0))
+    return obstacles
+
+
+def pedsim_obstacles(scenario: dict, ped_radius: float = 0.3) -> Obstacles:
+    """Pedsim agents of an ArenaScenario json file as circles at their start position."""
+    peds: List[List[float]] = [
+        [*agent["pos"][:2], ped_radius]
+        for agent in scenario.get("pedsim_agents", [])
+        for _ in range(agent.get("number_of_peds", 1))
+    ]
+    return Obstacles.from_shapes(peds)
+
+
+def obstacles_from_scenario(
+    scenario: dict, ped_radius: float = 0.3, models_dir: Optional[str] = None
+) -> Obstacles:
+    """Static obstacles and pedsim agents of an ArenaScenario json file, see
+    'static_obstacles' and 'pedsim_obstacles'."""
+    return static_obstacles(scenario, models_dir) + pedsim_obstacles(scenario, ped_radius)
+
+
+class Raycaster:
+    def __init__(self, grid_map: GridMap, angles: np.ndarray, max_range: float):
+        """Synthetic laser scans of a map and additional obstacles.
+
+        Description:
+            The occupancy grid is sphere traced on its distance field: every ray
+            advances by the clearance of its current cell minus one cell
+            diagonal, so rays in open space need only a few steps. Close to
+            obstacles the rays walk from cell to cell (DDA), hence the ranges
+            are exact up to the cell geometry. All rays of the batch are traced
+            together and dropped once they hit. Circles and segments are
+            intersected analytically.
+
+        Args:
+            grid_map (GridMap): Map of the static environment.
+            angles (np.ndarray): (beams,) beam angles relative to the sensor heading.
+            max_range (float): Max. range, returned for beams without hit.
+        """
+        self.map = grid_map
+        self.angles = np.asarray(angles, dtype=np.float64)
+        self.max_range = float(max_range)
+        # in cells, the border ring of the padded grid counts as occupied
+        self._distance = np.pad(
+            grid_map.distance_field / grid_map.resolution, 1, constant_values=0.0
+        ).ravel()
+        self._width = grid_map.width + 2
+        self._upper = np.array([grid_map.width + 1, grid_map.height + 1], dtype=np.float64)
+
+    @property
+    def num_beams(self) -> int:
+        return len(self.angles)
+
+    def cast(self, poses: np.ndarray, obstacles: Optional[Obstacles] = None) -> np.ndarray:
+        """Returns the (batch, beams) float32 ranges for the sensor poses (batch, 3)."""
+        poses = np.asarray(poses, dtype=np.float64).reshape(-1, 3)
+        angles = poses[:, 2:3] + self.angles
+        dirs = np.stack((np.cos(angles), np.sin(angles)), axis=-1)
+
+        ranges = self._cast_grid(poses[:, :2], dirs)
+        if obstacles is not None:
+            if len(obstacles.circles):
+                ranges = np.minimum(ranges, _cast_circles(poses[:, :2], dirs, obstacles.circles))
+            if len(obstacles.segments):
+                ranges = np.minimum(ranges, _cast_segments(poses[:, :2], dirs, obstacles.segments))
+        return np.minimum(ranges, self.max_range).astype(np.float32)
+
+    def _cast_grid(self, origins: np.ndarray, dirs: np.ndarray) -> np.ndarray:
+        batch, beams = dirs.shape[:2]
+        max_dist = self.max_range / self.map.resolution
+        starts = np.repeat((origins - self.map.origin) / self.map.resolution + 1, beams, axis=0)
+        dirs = dirs.reshape(-1, 2)
+        # per axis, the cell boundary ahead of the ray and the distance per crossed cell
+        ahead = (dirs > 0).astype(np.float64)
+        with np.errstate(divide="ignore"):
+            inv_dirs = 1.0 / dirs
+
+        ranges = np.full(batch * beams, max_dist)
+        rays = np.arange(batch * beams)
+        dist = np.zeros(batch * beams)
+        while len(rays):
+            points = starts + dirs * dist[:, None]
+            np.maximum(points, 0.0, out=points)
+            np.minimum(points, self._upper, out=points)
+            cells = points.astype(np.intp)
+            clearance = self._distance[cells[:, 1] * self._width + cells[:, 0]]
+            hit = clearance == 0.0
+            ranges[rays[hit]] = dist[hit]
+
+            # close to obstacles, walk to the next cell like a DDA grid traversal,
+            # so rays can't slip through the corners of diagonal walls. Axes the
+            # ray is parallel to are never crossed, every step is positive.
+            with np.errstate(invalid="ignore"):
+                cell_exit = np.where(dirs != 0, (cells + ahead - points) * inv_dirs, np.inf)
+            cell_exit = np.maximum(cell_exit.min(axis=1), 0.0) + 1e-6
+            dist += np.maximum(clearance - np.sqrt(2), cell_exit)
+            active = ~hit & (dist < max_dist)
+            rays, starts, dirs, dist = rays[active], starts[active], dirs[active], dist[active]
+            ahead, inv_dirs = ahead[active], inv_dirs[active]
+        return np.minimum(ranges, max_dist).reshape(batch, beams) * self.map.resolution
+
+
+def _cast_circles(origins: np.ndarray, dirs: np.ndarray, circles: np.ndarray) -> np.ndarray:
+    # (batch, circles, 2) circle centers relative to the sensors
+    rel = circles[None, :, :2] - origins[:, None, :]
+    proj = np.einsum("bkd,bnd->bkn", dirs, rel)
+    outside = np.sum(rel ** 2, axis=-1) - circles[:, 2] ** 2
+    disc = proj ** 2 - outside[:, None, :]
+    with np.errstate(invalid="ignore"):
+        dist = proj - np.sqrt(disc)
+    valid = (disc >= 0) & (dist >= 0)
+    dist = np.where(valid, dist, np.inf)
+    # sensors inside of a circle measure 0
+    dist = np.where(outside[:, None, :] < 0, 0.0, dist)
+    return dist.min(axis=-1, initial=np.inf)
+
+
+def _cast_segments(origins: np.ndarray, dirs: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    starts = segments[:, 0]
+    edges = segments[:, 1] - starts
+    # (batch, segments, 2) segment starts relative to the sensors
+    rel = starts[None] - origins[:, None, :]
+    denom = dirs[:, :, None, 0] * edges[None, None, :, 1] - dirs[:, :, None, 1] * edges[None, None, :, 0]
+    rel_x_edge = rel[..., 0] * edges[:, 1] - rel[..., 1] * edges[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dist = rel_x_edge[:, None, :] / denom
+        u = (rel[:, None, :, 0] * dirs[:, :, None, 1] - rel[:, None, :, 1] * dirs[:, :, None, 0]) / denom
+    valid = (denom != 0) & (dist >= 0) & (u >= 0) & (u <= 1)
+    return np.where(valid, dist, np.inf).min(axis=-1, initial=np.inf)
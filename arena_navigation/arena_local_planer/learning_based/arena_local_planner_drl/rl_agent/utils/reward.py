@@ -3,7 +3,7 @@ import scipy.spatial
 
 from numpy.lib.utils import safe_eval
 from geometry_msgs.msg import Pose2D
-from typing import Tuple
+from typing import Dict, List, Sequence, Tuple
 
 
 class RewardCalculator:
@@ -36,6 +36,7 @@ class RewardCalculator:
 
         self.kdtree = None
 
+        self.rule = rule
         self._cal_funcs = {
             "rule_00": RewardCalculator._cal_reward_rule_00,
             "rule_01": RewardCalculator._cal_reward_rule_01,
@@ -382,3 +383,171 @@ class RewardCalculator:
             vel_diff = abs(curr_ang_vel - last_ang_vel)
             self.curr_reward -= (vel_diff ** 4) / 2500
         self.last_action = action
+
+
+class BatchRewardCalculator:
+    # per rule: (consumption factor, follow global plan, approach global plan, direction change penalty)
+    _RULE_TERMS = {
+        "rule_00": (0.0, False, False, False),
+        "rule_01": (0.0075, False, False, False),
+        # rule_02 calls '_reward_following_global_plan' without action, which is a no-op
+        "rule_02": (0.0075, False, False, False),
+        "rule_03": (0.0, True, True, False),
+        "rule_04": (0.0, True, True, True),
+    }
+
+    def __init__(
+        self,
+        robot_radius: Sequence[float],
+        safe_dist: Sequence[float],
+        goal_radius: Sequence[float],
+        rules: Sequence[str],
+    ):
+        """
+        Calculates the rewards of several agents in one vectorized call.
+        Yields the same rewards as one RewardCalculator (w/o extended eval) per agent.
+
+        :param robot_radius (Sequence[float]): robot radius per agent. Unit[ m ]
+        :param safe_dist (Sequence[float]): safe distance per agent. Unit[ m ]
+        :param goal_radius (Sequence[float]): goal radius per agent. Unit[ m ]
+        :param rules (Sequence[str]): reward rule per agent
+        """
+        self.robot_radius = np.asarray(robot_radius, dtype=np.float64)
+        self.safe_dist = np.asarray(safe_dist, dtype=np.float64)
+        self.goal_radius = np.asarray(goal_radius, dtype=np.float64)
+        self.num_agents = len(rules)
+
+        terms = np.array([self._RULE_TERMS[rule] for rule in rules], dtype=object)
+        self._consumption_factor = terms[:, 0].astype(np.float64)
+        self._follow_plan = terms[:, 1].astype(bool)
+        self._approach_plan = terms[:, 2].astype(bool)
+        self._direction_change = terms[:, 3].astype(bool)
+        # kd tree searches are per agent, only loop over the agents that need them
+        self._plan_agents = np.flatnonzero(self._follow_plan | self._approach_plan)
+
+        self._kdtrees: List[scipy.spatial.cKDTree] = [None] * self.num_agents
+        self.last_goal_dist = np.full(self.num_agents, np.nan)
+        self.last_dist_to_path = np.full(self.num_agents, np.nan)
+        self.last_ang_vel = np.full(self.num_agents, np.nan)
+
+    @classmethod
+    def from_calculators(
+        cls, calculators: Sequence[RewardCalculator]
+    ) -> "BatchRewardCalculator":
+        """
+        Creates the batch version of the given per agent calculators.
+        """
+        assert not any(
+            c._extended_eval for c in calculators
+        ), "Extended evaluation is not supported in batch mode."
+        return cls(
+            robot_radius=[c.robot_radius for c in calculators],
+            safe_dist=[c.safe_dist for c in calculators],
+            goal_radius=[c.goal_radius for c in calculators],
+            rules=[c.rule for c in calculators],
+        )
+
+    def reset(self, agents: Sequence[int] = None):
+        """
+        reset variables related to the episode
+
+        :param agents (Sequence[int], optional): indices of the agents to reset. defaults to all
+        """
+        agents = list(range(self.num_agents) if agents is None else agents)
+        self.last_goal_dist[agents] = np.nan
+        self.last_dist_to_path[agents] = np.nan
+        self.last_ang_vel[agents] = np.nan
+        for i in agents:
+            self._kdtrees[i] = None
+
+    def get_rewards(
+        self,
+        laser_scan: np.ndarray,
+        goal_in_robot_frame: np.ndarray,
+        action: np.ndarray,
+        robot_pose: np.ndarray = None,
+        global_plan: Sequence[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Returns the rewards and the episode infos of all agents.
+        The arguments are stacked along the first axis, the names match the keys of the observation dict.
+
+        :param laser_scan (np.ndarray (N, num_beams)): laser scan data
+        :param goal_in_robot_frame (np.ndarray (N, 2)): (rho, theta) of the goals in robot frame
+        :param action (np.ndarray (N, 2)): [:, 0] - linear velocity, [:, 1] - angular velocity
+        :param robot_pose (np.ndarray (N, 3), optional): (x, y, theta) robot poses, needed by the global plan rules
+        :param global_plan (Sequence[np.ndarray], optional): global plan per agent, needed by the global plan rules
+        :return: rewards (N,) and dict of 'is_done', 'done_reason' and 'is_success' arrays (N,)
+        """
+        min_scan = laser_scan.min(axis=1)
+        goal_dist = np.asarray(goal_in_robot_frame)[:, 0]
+        lin_vel, ang_vel = action[:, 0], action[:, 1]
+
+        rewards = -(lin_vel + ang_vel * 0.001) * self._consumption_factor
+
+        # abrupt direction change
+        changed = self._direction_change & ~np.isnan(self.last_ang_vel)
+        rewards[changed] -= (
+            np.abs(ang_vel[changed] - self.last_ang_vel[changed]) ** 4 / 2500
+        )
+        self.last_ang_vel[self._direction_change] = ang_vel[self._direction_change]
+
+        if len(self._plan_agents) > 0:
+            self._reward_global_plan(
+                rewards, min_scan, lin_vel, robot_pose, global_plan
+            )
+
+        # goal reached, overwrites the rewards of the terms above
+        reached = goal_dist < self.goal_radius
+        rewards[reached] = 15
+
+        # safe distance and collision
+        rewards -= 0.25 * (min_scan < self.safe_dist)
+        collided = min_scan <= self.robot_radius
+        rewards -= 10 * collided
+
+        # goal approached
+        approached = self.last_goal_dist - goal_dist
+        has_last = ~np.isnan(approached)
+        w = np.where(approached > 0, 0.3, 0.4)
+        rewards[has_last] += w[has_last] * approached[has_last]
+        self.last_goal_dist[:] = goal_dist
+
+        infos = {
+            "is_done": reached | collided,
+            "done_reason": np.where(collided, 1, np.where(reached, 2, 0)),
+            "is_success": (reached & ~collided).astype(int),
+        }
+        return rewards, infos
+
+    def _reward_global_plan(
+        self,
+        rewards: np.ndarray,
+        min_scan: np.ndarray,
+        lin_vel: np.ndarray,
+        robot_poses: np.ndarray,
+        global_plans: Sequence[np.ndarray],
+    ):
+        for i in self._plan_agents:
+            if self._approach_plan[i] and min_scan[i] <= self.safe_dist[i]:
+                self.last_dist_to_path[i] = np.nan
+                approach = False
+            else:
+                approach = self._approach_plan[i]
+
+            plan = global_plans[i]
+            if plan is None or len(plan) == 0:
+                continue
+            if self._kdtrees[i] is None:
+                self._kdtrees[i] = scipy.spatial.cKDTree(plan)
+            dist, _ = self._kdtrees[i].query(robot_poses[i, :2])
+
+            if self._follow_plan[i] and dist <= 0.5:
+                rewards[i] += 0.1 * lin_vel[i]
+
+            if approach:
+                last = self.last_dist_to_path[i]
+                if not np.isnan(last):
+                    w = 0.2 if dist < last else 0.3
+                    rewards[i] += w * (last - dist)
+                self.last_dist_to_path[i] = dist
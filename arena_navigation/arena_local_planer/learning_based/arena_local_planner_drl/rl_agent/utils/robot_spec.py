@@ -0,0 +1,147 @@
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+import rospkg
+import yaml
+
+from gym import spaces
+
+
+# footprint radius is inflated by this factor for the collision checks
+ROBOT_RADIUS_MARGIN = 1.05
+
+_yaml_cache: Dict[str, Tuple[int, Any]] = {}
+_spec_cache: Dict[Tuple[str, str], Tuple[Tuple[int, int], "RobotSpec"]] = {}
+_cache_lock = threading.Lock()
+
+
+class RobotSpec(NamedTuple):
+    """Robot model and action space settings read from the configuration files.
+
+    Attributes:
+        radius: Footprint radius in meters, inflated by ROBOT_RADIUS_MARGIN.
+        num_laser_beams: Number of laser beams (None if the model has no laser).
+        laser_range: Max. laser range in meters (None if the model has no laser).
+        laser_angle_min / laser_angle_max / laser_angle_increment: Laser angles in rad.
+        discrete_actions: Discrete actions, each with 'name', 'linear' and 'angular'.
+        linear_range / angular_range: Bounds of the continuous actions.
+    """
+
+    radius: Optional[float]
+    num_laser_beams: Optional[int]
+    laser_range: Optional[float]
+    laser_angle_min: Optional[float]
+    laser_angle_max: Optional[float]
+    laser_angle_increment: Optional[float]
+    discrete_actions: Tuple[Mapping[str, Any], ...]
+    linear_range: Tuple[float, float]
+    angular_range: Tuple[float, float]
+
+    def action_space(self, discrete: bool) -> spaces.Space:
+        """Returns the discrete or continuous action space of the robot."""
+        if discrete:
+            return spaces.Discrete(len(self.discrete_actions))
+        return spaces.Box(
+            low=np.array([self.linear_range[0], self.angular_range[0]]),
+            high=np.array([self.linear_range[1], self.angular_range[1]]),
+            dtype=np.float,
+        )
+
+
+def robot_model_path(robot_name: str = "myrobot") -> str:
+    """Returns the path of '<robot_name>.model.yaml' in 'simulator_setup/robot'."""
+    return os.path.join(
+        rospkg.RosPack().get_path("simulator_setup"),
+        "robot",
+        robot_name + ".model.yaml",
+    )
+
+
+def default_settings_path() -> str:
+    """Returns the path of the default action space settings."""
+    return os.path.join(
+        rospkg.RosPack().get_path("arena_local_planner_drl"),
+        "configs",
+        "default_settings.yaml",
+    )
+
+
+def load_yaml(path: str) -> Any:
+    """Parses a yaml file once per modification time.
+
+    Note:
+        The parsed data is shared between all callers, treat it as read-only.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        cached = _yaml_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, "r") as fd:
+        data = yaml.safe_load(fd)
+    with _cache_lock:
+        _yaml_cache[path] = (mtime, data)
+    return data
+
+
+def load_robot_spec(robot_yaml_path: str, settings_yaml_path: str) -> RobotSpec:
+    """Returns the RobotSpec of the given files, parsed again only when they change.
+
+    Args:
+        robot_yaml_path (str): Flatland model yaml of the robot.
+        settings_yaml_path (str): Yaml file containing the action space settings.
+
+    Returns:
+        RobotSpec: Immutable robot specification.
+    """
+    key = (os.path.abspath(robot_yaml_path), os.path.abspath(settings_yaml_path))
+    mtimes = (os.stat(key[0]).st_mtime_ns, os.stat(key[1]).st_mtime_ns)
+    with _cache_lock:
+        cached = _spec_cache.get(key)
+        if cached is not None and cached[0] == mtimes:
+            return cached[1]
+
+    spec = _parse_robot_spec(load_yaml(key[0]), load_yaml(key[1]))
+    with _cache_lock:
+        _spec_cache[key] = (mtimes, spec)
+    return spec
+
+
+def _parse_robot_spec(robot_data: dict, setting_data: dict) -> RobotSpec:
+    radius = None
+    for body in robot_data["bodies"]:
+        if body["name"] == "base_footprint":
+            for footprint in body["footprints"]:
+                if footprint["type"] == "circle":
+                    radius = footprint.get("radius", 0.3) * ROBOT_RADIUS_MARGIN
+                elif footprint.get("radius"):
+                    radius = footprint["radius"] * ROBOT_RADIUS_MARGIN
+
+    num_beams = laser_range = angle_min = angle_max = angle_increment = None
+    for plugin in robot_data["plugins"]:
+        if plugin["type"] == "Laser":
+            angle_min = plugin["angle"]["min"]
+            angle_max = plugin["angle"]["max"]
+            angle_increment = plugin["angle"]["increment"]
+            num_beams = int(round((angle_max - angle_min) / angle_increment) + 1)
+            laser_range = plugin["range"]
+            break
+
+    robot_settings = setting_data["robot"]
+    return RobotSpec(
+        radius=radius,
+        num_laser_beams=num_beams,
+        laser_range=laser_range,
+        laser_angle_min=angle_min,
+        laser_angle_max=angle_max,
+        laser_angle_increment=angle_increment,
+        discrete_actions=tuple(
+            MappingProxyType(dict(action))
+            for action in robot_settings["discrete_actions"]
+        ),
+        linear_range=tuple(robot_settings["continuous_actions"]["linear_range"]),
+        angular_range=tuple(robot_settings["continuous_actions"]["angular_range"]),
+    )
@@ -0,0 +1,202 @@
+import threading
+from typing import Any, List, Optional, Tuple
+
+from geometry_msgs.msg import Quaternion
+from nav_msgs.msg import Odometry
+from sensor_msgs.msg import LaserScan
+from tf.transformations import quaternion_slerp
+
+
+class StampedRingBuffer:
+    def __init__(self, size: int):
+        """Fixed size buffer of messages ordered by their header stamp.
+
+        Args:
+            size (int): Number of messages kept, older ones are overwritten.
+        """
+        self.size = size
+        self._stamps: List[float] = [0.0] * size
+        self._msgs: List[Any] = [None] * size
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def clear(self) -> None:
+        self._start = 0
+        self._len = 0
+
+    def _index(self, i: int) -> int:
+        return (self._start + i) % self.size
+
+    def stamp(self, i: int) -> float:
+        return self._stamps[self._index(i)]
+
+    def msg(self, i: int) -> Any:
+        return self._msgs[self._index(i)]
+
+    def append(self, stamp: float, msg: Any) -> None:
+        # stamps jumping back (e.g. simulation reset) invalidate the history
+        if self._len > 0 and stamp < self.stamp(self._len - 1):
+            self.clear()
+        if self._len < self.size:
+            idx = self._index(self._len)
+            self._len += 1
+        else:
+            idx = self._start
+            self._start = (self._start + 1) % self.size
+        self._stamps[idx] = stamp
+        self._msgs[idx] = msg
+
+    def bisect(self, stamp: float) -> int:
+        """Returns the index of the first message stamped later than 'stamp'."""
+        lo, hi = 0, self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.stamp(mid) <= stamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class ScanOdomSynchronizer:
+    def __init__(self, max_size: int = 10, slop: float = 0.05, interpolate: bool = False):
+        """Pairs laser scans with the odometry message closest in time.
+
+        Each incoming message (re-)matches the newest scan against the odometry
+        buffer in O(log n), hence fetching the newest synced pair is constant
+        work and no message is processed unless it is part of a returned pair.
+
+        Args:
+            max_size (int, optional): Messages kept per topic. Defaults to 10.
+            slop (float, optional):
+                Max. allowed time difference of a pair in seconds. Defaults to 0.05.
+            interpolate (bool, optional):
+                Interpolate the odometry pose to the scan stamp when the scan
+                lies between two odometry messages. Defaults to False.
+        """
+        self.slop = slop
+        self.interpolate = interpolate
+
+        self._lock = threading.Lock()
+        self._odoms = StampedRingBuffer(max_size)
+
+        self._scan: Optional[LaserScan] = None
+        self._scan_stamp = None
+        self._scan_skew = None
+
+        # pairs not yet fetched
+        self._first_pair: Optional[Tuple[LaserScan, Odometry]] = None
+        self._latest_pair: Optional[Tuple[LaserScan, Odometry]] = None
+
+        self.reset_stats()
+
+    def add_scan(self, msg: LaserScan) -> None:
+        with self._lock:
+            self._finish_scan_stats()
+            self._scan = msg
+            self._scan_stamp = msg.header.stamp.to_sec()
+            self._scan_skew = None
+            self._match()
+
+    def add_odom(self, msg: Odometry) -> None:
+        with self._lock:
+            self._odoms.append(msg.header.stamp.to_sec(), msg)
+            if self._scan is not None:
+                self._match()
+
+    def get(self, first: bool = False) -> Tuple[Optional[LaserScan], Optional[Odometry]]:
+        """Returns the synced pair found since the last call.
+
+        Args:
+            first (bool, optional):
+                Return the oldest instead of the newest of these pairs.
+                Defaults to False.
+
+        Returns:
+            Tuple[Optional[LaserScan], Optional[Odometry]]:
+                Scan and odometry message, (None, None) if no new pair was found.
+        """
+        with self._lock:
+            pair = self._first_pair if first else self._latest_pair
+            self._first_pair = self._latest_pair = None
+            # a fetched scan is not paired again, an unmatched one still can be
+            if self._scan_skew is not None:
+                self._scan = None
+        return pair if pair is not None else (None, None)
+
+    def _match(self) -> None:
+        stamp = self._scan_stamp
+        idx = self._odoms.bisect(stamp)
+        # candidates are the odometry messages right before and after the scan
+        candidates = [i for i in (idx - 1, idx) if 0 <= i < len(self._odoms)]
+        if not candidates:
+            return
+        best = min(candidates, key=lambda i: abs(self._odoms.stamp(i) - stamp))
+        skew = abs(self._odoms.stamp(best) - stamp)
+        if skew > self.slop or (self._scan_skew is not None and skew >= self._scan_skew):
+            return
+
+        odom = self._odoms.msg(best)
+        if self.interpolate and len(candidates) == 2:
+            interpolated = self._interpolate(idx - 1, idx, stamp, nearest=odom)
+            if interpolated is not None:
+                odom, skew = interpolated, 0.0
+
+        self._scan_skew = skew
+        pair = (self._scan, odom)
+        # a better match of the same scan replaces the previous one
+        if self._first_pair is None or self._first_pair[0] is self._scan:
+            self._first_pair = pair
+        self._latest_pair = pair
+
+    def _interpolate(
+        self, before: int, after: int, stamp: float, nearest: Odometry
+    ) -> Optional[Odometry]:
+        t0, t1 = self._odoms.stamp(before), self._odoms.stamp(after)
+        if t1 <= t0 or t1 - t0 > 2 * self.slop:
+            return None
+        fraction = (stamp - t0) / (t1 - t0)
+        pose0 = self._odoms.msg(before).pose.pose
+        pose1 = self._odoms.msg(after).pose.pose
+
+        odom = Odometry()
+        odom.header = nearest.header
+        odom.child_frame_id = nearest.child_frame_id
+        odom.twist = nearest.twist
+        position = odom.pose.pose.position
+        position.x = pose0.position.x + fraction * (pose1.position.x - pose0.position.x)
+        position.y = pose0.position.y + fraction * (pose1.position.y - pose0.position.y)
+        position.z = pose0.position.z + fraction * (pose1.position.z - pose0.position.z)
+        q0, q1 = pose0.orientation, pose1.orientation
+        odom.pose.pose.orientation = Quaternion(
+            *quaternion_slerp(
+                (q0.x, q0.y, q0.z, q0.w), (q1.x, q1.y, q1.z, q1.w), fraction
+            )
+        )
+        return odom
+
+    def _finish_scan_stats(self) -> None:
+        if self._scan_stamp is None:
+            return
+        self._num_scans += 1
+        if self._scan_skew is not None:
+            self._num_synced += 1
+            self._skew_sum += self._scan_skew
+
+    def reset_stats(self) -> None:
+        self._num_scans = 0
+        self._num_synced = 0
+        self._skew_sum = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of the received scans that were paired within the slop."""
+        return self._num_synced / self._num_scans if self._num_scans else 0.0
+
+    @property
+    def mean_skew(self) -> float:
+        """Mean time difference (in seconds) of the synced pairs."""
+        return self._skew_sum / self._num_synced if self._num_synced else 0.0
@@ -0,0 +1,485 @@
+#!/usr/bin/env python
+"""Micro-benchmarks of the observation, reward, task generation and raycasting hot paths.
+
+Runs without a ROS master or simulator: the messages are synthesized (or read
+from a bag file) and the occupancy grids are loaded from
+'simulator_setup/maps/<map>/map.yaml'. The ROS messages are only built for the
+benchmarks that process them, the others (e.g. raycasting) also run without a
+ROS installation and the rest is skipped. Every benchmark reports its throughput
+(ops/s) and the peak memory traced while running one operation. Results can be
+stored as baseline and later runs compared against it, e.g.
+
+    python benchmark_pipeline.py --save-baseline baseline.json
+    python benchmark_pipeline.py --baseline baseline.json --tolerance 0.15
+
+The script exits with 1 if an operation got slower or allocates more than the
+tolerance allows.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rl_agent.utils.grid_map import GridMap
+
+# arena_local_planner_drl, learning_based, arena_local_planer and repository root
+DRL_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LEARNING_BASED_DIR = os.path.dirname(DRL_DIR)
+LOCAL_PLANNER_DIR = os.path.dirname(LEARNING_BASED_DIR)
+ROOT_DIR = os.path.dirname(os.path.dirname(LOCAL_PLANNER_DIR))
+
+MAPS_DIR = os.path.join(ROOT_DIR, "simulator_setup", "maps")
+CADRL_DIR = os.path.join(LOCAL_PLANNER_DIR, "model_based", "cadrl_ros", "scripts")
+RLCA_DIR = os.path.join(LEARNING_BASED_DIR, "rl_collision_avoidance")
+
+NUM_BEAMS = 360
+LASER_RANGE = 3.5
+
+# name -> setup function returning the operation to be timed
+BENCHMARKS: Dict[str, Callable[["BenchmarkData"], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def to_occupancy_grid(grid_map: GridMap) -> "OccupancyGrid":
+    """Returns the map as the map_server publishes it."""
+    from nav_msgs.msg import OccupancyGrid
+
+    map_ = OccupancyGrid()
+    map_.info.resolution = grid_map.resolution
+    map_.info.height, map_.info.width = grid_map.grid.shape
+    map_.info.origin.position.x = grid_map.origin[0]
+    map_.info.origin.position.y = grid_map.origin[1]
+    map_.data = tuple(grid_map.grid.ravel().tolist())
+    return map_
+
+
+class BenchmarkData:
+    def __init__(self, map_name: str, bag_path: Optional[str] = None, seed: int = 0):
+        """Synthetic (or recorded) inputs shared by the benchmarks."""
+        random.seed(seed)
+        rng = np.random.default_rng(seed)
+        self.grid_map = GridMap.from_yaml(os.path.join(MAPS_DIR, map_name, "map.yaml"))
+        self.bag_path = bag_path
+
+        self.scan_ranges = rng.uniform(0.2, LASER_RANGE, NUM_BEAMS)
+        self.scan_ranges[rng.random(NUM_BEAMS) < 0.05] = np.nan
+        x = np.linspace(0.0, 20.0, 200)
+        self.global_plan = np.stack((x, np.sin(x)), axis=1)
+
+        self.laser_scan = np.nan_to_num(self.scan_ranges, nan=LASER_RANGE).astype(np.float32)
+
+    # the messages are built on first use, an ImportError skips the benchmark
+
+    @cached_property
+    def robot_pose(self) -> "Pose2D":
+        from rl_agent.envs.fake_sim import Pose2D
+
+        return Pose2D(1.0, 0.5, 0.3)
+
+    @cached_property
+    def subgoal(self) -> "Pose2D":
+        from rl_agent.envs.fake_sim import Pose2D
+
+        return Pose2D(4.0, 2.0, 0.0)
+
+    @cached_property
+    def map(self) -> "OccupancyGrid":
+        return to_occupancy_grid(self.grid_map)
+
+    @property
+    def scans(self) -> List["LaserScan"]:
+        return self._sensor_msgs[0]
+
+    @property
+    def odoms(self) -> List["Odometry"]:
+        return self._sensor_msgs[1]
+
+    @cached_property
+    def _sensor_msgs(self) -> Tuple[List["LaserScan"], List["Odometry"]]:
+        if self.bag_path is not None:
+            scans, odoms = self._load_bag(self.bag_path)
+            if scans and odoms:
+                return scans, odoms
+
+        import rospy
+        from nav_msgs.msg import Odometry
+        from sensor_msgs.msg import LaserScan
+
+        scans, odoms = [], []
+        for i in range(4096):
+            scan = LaserScan()
+            scan.header.stamp = rospy.Time.from_sec(0.1 * i)
+            scan.range_max = LASER_RANGE
+            scan.ranges = tuple(self.scan_ranges)
+            scans.append(scan)
+            odom = Odometry()
+            odom.header.stamp = rospy.Time.from_sec(0.1 * i + 0.01)
+            odom.pose.pose.position.x = 0.01 * i
+            odom.pose.pose.orientation.w = 1.0
+            odoms.append(odom)
+        return scans, odoms
+
+    @cached_property
+    def global_plan_msg(self) -> "Path":
+        from geometry_msgs.msg import PoseStamped
+        from nav_msgs.msg import Path
+
+        global_plan_msg = Path()
+        for x, y in self.global_plan:
+            pose = PoseStamped()
+            pose.pose.position.x = x
+            pose.pose.position.y = y
+            pose.pose.orientation.w = 1.0
+            global_plan_msg.poses.append(pose)
+        return global_plan_msg
+
+    @staticmethod
+    def _load_bag(bag_path: str) -> Tuple[list, list]:
+        import rosbag
+
+        scans, odoms = [], []
+        with rosbag.Bag(bag_path) as bag:
+            for topic, msg, _ in bag.read_messages():
+                if topic.endswith("scan") or topic.endswith("scan_mapped"):
+                    scans.append(msg)
+                elif topic.endswith("odom"):
+                    odoms.append(msg)
+        return scans, odoms
+
+
+# ---------------------------------------------------------------- observation
+
+
+def _observation_collector():
+    from rl_agent.utils.observation_collector import ObservationCollector
+
+    # only the message processing is benchmarked, no subscribers are needed
+    return ObservationCollector, object.__new__(ObservationCollector)
+
+
+@benchmark("observation/process_scan")
+def _process_scan(data: BenchmarkData):
+    _, collector = _observation_collector()
+    msg = data.scans[0]
+    ranges = msg.ranges
+
+    def op():
+        msg.ranges = ranges
+        return collector.process_scan_msg(msg)
+
+    return op
+
+
+@benchmark("observation/process_odom")
+def _process_odom(data: BenchmarkData):
+    _, collector = _observation_collector()
+    msg = data.odoms[0]
+    return lambda: collector.process_robot_state_msg(msg)
+
+
+@benchmark("observation/global_plan")
+def _global_plan(data: BenchmarkData):
+    ObservationCollector, _ = _observation_collector()
+    msg = data.global_plan_msg
+    return lambda: ObservationCollector.process_global_plan_msg(msg)
+
+
+@benchmark("observation/goal_in_robot_frame")
+def _goal_in_robot_frame(data: BenchmarkData):
+    ObservationCollector, _ = _observation_collector()
+    subgoal, robot_pose = data.subgoal, data.robot_pose
+    return lambda: ObservationCollector._get_goal_pose_in_robot_frame(subgoal, robot_pose)
+
+
+@benchmark("observation/scan_odom_sync")
+def _scan_odom_sync(data: BenchmarkData):
+    from rl_agent.utils.stamp_sync import ScanOdomSynchronizer
+
+    synchronizer = ScanOdomSynchronizer()
+    scans, odoms = data.scans, data.odoms
+    num_msgs = min(len(scans), len(odoms))
+    counter = iter(range(sys.maxsize))
+
+    def op():
+        i = next(counter) % num_msgs
+        synchronizer.add_odom(odoms[i])
+        synchronizer.add_scan(scans[i])
+        return synchronizer.get()
+
+    return op
+
+
+# --------------------------------------------------------------------- reward
+
+
+def _reward_benchmark(rule: str):
+    def setup(data: BenchmarkData):
+        from rl_agent.utils.reward import RewardCalculator
+
+        calculator = RewardCalculator(
+            robot_radius=0.2, safe_dist=0.35, goal_radius=0.25, rule=rule
+        )
+        global_plan = data.global_plan
+        robot_pose = data.robot_pose
+        goals = [(2.0, 0.1), (1.95, 0.12)]
+        counter = iter(range(sys.maxsize))
+
+        def op():
+            return calculator.get_reward(
+                data.laser_scan,
+                goals[next(counter) % 2],
+                action=np.array([0.2, 0.1]),
+                global_plan=global_plan,
+                robot_pose=robot_pose,
+            )
+
+        return op
+
+    return setup
+
+
+for _rule in ("rule_00", "rule_01", "rule_02", "rule_03", "rule_04"):
+    benchmark(f"reward/{_rule}")(_reward_benchmark(_rule))
+
+
+# ----------------------------------------------------------------------- task
+
+
+@benchmark("task/freespace_indices")
+def _freespace_indices(data: BenchmarkData):
+    from task_generator.utils import generate_freespace_indices
+
+    return lambda: generate_freespace_indices(data.map)
+
+
+@benchmark("task/random_pos_on_map")
+def _random_pos_on_map(data: BenchmarkData):
+    from task_generator.utils import generate_freespace_indices, get_random_pos_on_map
+
+    indices = generate_freespace_indices(data.map)
+    return lambda: get_random_pos_on_map(indices, data.map, 0.3)
+
+
+@benchmark("task/obstacle_placement")
+def _obstacle_placement(data: BenchmarkData):
+    from task_generator.utils import generate_freespace_indices, get_random_pos_on_map
+
+    indices = generate_freespace_indices(data.map)
+
+    def op():
+        # as ObstaclesManager.register_random_static_obstacles, every obstacle
+        # becomes a forbidden zone for the following ones
+        forbidden_zones = []
+        for _ in range(10):
+            pos = get_random_pos_on_map(indices, data.map, 0.3, forbidden_zones)
+            forbidden_zones.append((pos.position.x, pos.position.y, 0.3))
+        return forbidden_zones
+
+    return op
+
+
+# ------------------------------------------------------------------- raycast
+
+
+def _raycast_benchmark(batch: int):
+    def setup(data: BenchmarkData):
+        from rl_agent.utils.raycast import Obstacles, Raycaster
+
+        raycaster = Raycaster(
+            data.grid_map,
+            np.linspace(-np.pi, np.pi, NUM_BEAMS, endpoint=False),
+            LASER_RANGE,
+        )
+        rng = np.random.default_rng(0)
+        free = np.argwhere(data.grid_map.distance_field > 0.5)
+        cells = free[rng.integers(len(free), size=batch)]
+        poses = np.hstack(
+            (
+                data.grid_map.to_world(cells[:, 0], cells[:, 1]),
+                rng.uniform(-np.pi, np.pi, (batch, 1)),
+            )
+        )
+        # pedestrians and box shaped static obstacles around the first pose
+        box = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]])
+        obstacles = Obstacles.from_shapes(
+            np.hstack((poses[0, :2] + rng.uniform(-2.0, 2.0, (10, 2)), np.full((10, 1), 0.3))),
+            [poses[0, :2] + rng.uniform(-3.0, 3.0, 2) + box for _ in range(4)],
+        )
+        return lambda: raycaster.cast(poses, obstacles)
+
+    return setup
+
+
+benchmark("raycast/scan")(_raycast_benchmark(1))
+benchmark("raycast/batch_32")(_raycast_benchmark(32))
+
+
+@benchmark("raycast/axis_aligned")
+def _raycast_axis_aligned(data: BenchmarkData):
+    """Rays parallel to the grid axes (zero direction components), their ranges
+    are tested in test/test_raycast.py."""
+    from rl_agent.utils.raycast import Raycaster
+
+    grid_map = data.grid_map
+    # beams at exactly -pi, -pi/2, 0 and pi/2
+    raycaster = Raycaster(grid_map, np.linspace(-np.pi, np.pi, 4, endpoint=False), LASER_RANGE)
+    rng = np.random.default_rng(0)
+    free = np.argwhere(grid_map.distance_field > 0.5)
+    cells = free[rng.integers(len(free), size=8)]
+    headings = np.array([0.0, np.pi / 2, -np.pi / 2, np.pi] * 2)[:, None]
+    poses = np.hstack((grid_map.to_world(cells[:, 0], cells[:, 1]), headings))
+    return lambda: raycaster.cast(poses)
+
+
+# ---------------------------------------------------------- baseline planners
+
+
+@benchmark("cadrl/agent_observe")
+def _cadrl_observe(data: BenchmarkData):
+    if CADRL_DIR not in sys.path:
+        sys.path.append(CADRL_DIR)
+    import agent as cadrl_agent
+
+    rng = np.random.default_rng(0)
+    # the agent prints its state on construction
+    with contextlib.redirect_stdout(io.StringIO()):
+        agents = [
+            cadrl_agent.Agent(*rng.uniform(-4.0, 4.0, 4), radius=0.3, id=i)
+            for i in range(10)
+        ]
+    return lambda: agents[0].observe(agents)
+
+
+@benchmark("rlca/sparsify_laser_scan")
+def _rlca_sparsify(data: BenchmarkData):
+    if RLCA_DIR not in sys.path:
+        sys.path.append(RLCA_DIR)
+    from model.utils import sparsify_laser_scan
+
+    scan = np.repeat(data.scan_ranges, 2)
+    out = np.empty(512)
+    return lambda: sparsify_laser_scan(scan, 512, max_range=6.0, out=out)
+
+
+# --------------------------------------------------------------------- runner
+
+
+def measure(op: Callable[[], object], repeat: int = 3) -> Dict[str, float]:
+    """Returns the best throughput of 'repeat' runs and the peak traced memory
+    of a single operation."""
+    op()
+    timer = timeit.Timer(op)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+
+    tracemalloc.start()
+    try:
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"ops_per_sec": number / best, "peak_bytes": peak}
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float
+) -> List[str]:
+    """Returns the names of the benchmarks that regressed against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        slower = result["ops_per_sec"] < reference["ops_per_sec"] * (1 - tolerance)
+        # a few hundred bytes of noise come from the interpreter itself
+        larger = result["peak_bytes"] > reference["peak_bytes"] * (1 + tolerance) + 512
+        if slower or larger:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--map",
+        type=str,
+        default="small_warehouse",
+        choices=sorted(os.listdir(MAPS_DIR)) if os.path.isdir(MAPS_DIR) else None,
+        help="map of simulator_setup/maps used for the task benchmarks",
+    )
+    parser.add_argument(
+        "--bag", type=str, help="bag file with recorded scan and odom messages"
+    )
+    parser.add_argument(
+        "-k", "--filter", type=str, default="", help="only run benchmarks containing this string"
+    )
+    parser.add_argument("--baseline", type=str, help="json file of a previous run to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative slowdown or memory growth tolerated against the baseline",
+    )
+    parser.add_argument("--save-baseline", type=str, help="store the results as json file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    data = BenchmarkData(args.map, args.bag)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+    results = {}
+    print(f"{'benchmark':<36}{'ops/s':>14}{'peak KiB':>11}{'vs. baseline':>15}")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        try:
+            op = setup(data)
+        except ImportError as e:
+            print(f"{name:<36}  skipped ({e})")
+            continue
+        result = results[name] = measure(op)
+
+        change = ""
+        if name in baseline:
+            change = f"{100 * (result['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1):+.1f}%"
+        print(
+            f"{name:<36}{result['ops_per_sec']:>14,.0f}"
+            f"{result['peak_bytes'] / 1024:>11.1f}{change:>15}"
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"Regressions (tolerance {args.tolerance:.0%}): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,127 @@
 #!/usr/bin/env python
 import rospy
-import time
 
 from geometry_msgs.msg import Twist
-from rosgraph_msgs.msg import Clock
-from std_msgs.msg import Bool
+from std_msgs.msg import Bool, Float32MultiArray, MultiArrayDimension
+
+# number of cycles summarized in one 'action_cycle_stats' message
+STATS_INTERVAL = 100
 
 
 class ActionPublisher:
     def __init__(self):
+        """Publishes the latest action and the cycle trigger at 'robot_action_rate'.
+
+        Note:
+            The cycles are driven by a rospy.Timer, which follows the sim time
+            of '/clock' if 'use_sim_time' is set and the wall time otherwise.
+            Hence the rate holds regardless of the real time factor of the
+            simulation. Every STATS_INTERVAL cycles the mean and max jitter
+            (in seconds of the used clock) and the number of missed deadlines
+            are published on '../action_cycle_stats'.
+        """
         if rospy.get_param("train_mode"):
             raise Exception("This node should be used solely in eval mode!")
 
         rospy.init_node("action_publisher", anonymous=True)
 
-        self._step_size = rospy.get_param("step_size")
-        self._update_rate = rospy.get_param("update_rate")
-        # real time second in sim time
-        self._real_second_in_sim = self._step_size * self._update_rate
         self._action_publish_rate = rospy.get_param("/robot_action_rate")
+        self._cycle_period = rospy.Duration.from_sec(1 / self._action_publish_rate)
 
-        # apply rate in sim time
-        rate = (1 / self._action_publish_rate) / self._real_second_in_sim
-
-        ns_prefix = (
+        self._ns_prefix = (
             "" if "/single_env" in rospy.get_param_names() else "/eval_sim/"
         )
         self._pub_cmd_vel = rospy.Publisher(
-            f"{ns_prefix}cmd_vel", Twist, queue_size=1
+            f"{self._ns_prefix}cmd_vel", Twist, queue_size=1
         )
         self._pub_cycle_trigger = rospy.Publisher(
-            f"{ns_prefix}next_cycle", Bool, queue_size=1
+            f"{self._ns_prefix}next_cycle", Bool, queue_size=1
+        )
+        self._pub_cycle_stats = rospy.Publisher(
+            f"{self._ns_prefix}action_cycle_stats",
+            Float32MultiArray,
+            queue_size=1,
         )
         self._sub = rospy.Subscriber(
-            f"{ns_prefix}cmd_vel_pub",
+            f"{self._ns_prefix}cmd_vel_pub",
             Twist,
             self.callback_receive_cmd_vel,
             queue_size=1,
         )
 
-        # to measure sim time
-        # self._clock_sub = rospy.Subscriber(
-        #     f"{ns_prefix}clock", Clock, self.callback_clock)
-        # last = 0
-
         self._action = Twist()
-        self._signal = Bool()
-        self._clock = Clock().clock.to_sec()
-
-        last_action = self._action
-
-        while not rospy.is_shutdown():
-            if self._sub.get_num_connections() < 1:
-                print(
-                    f"ActionPublisher: No publisher to {ns_prefix}cmd_vel_pub yet.. "
-                )
-                time.sleep(1)
-                continue
-
-            self._pub_cmd_vel.publish(self._action)
-            self._pub_cycle_trigger.publish(self._signal)
-
-            print(f"Published same action: {last_action==self._action}")
-            last_action = self._action
-
-            time.sleep(rate)
+        self._signal = Bool(data=True)
+        self._next_deadline = None
+        self._reset_stats()
+
+        self._stats_msg = Float32MultiArray()
+        self._stats_msg.layout.dim.append(
+            MultiArrayDimension(
+                label="jitter_mean,jitter_max,missed_deadlines", size=3, stride=3
+            )
+        )
 
-            # print(f"sim time between cmd_vel: {self._clock - last}")
-            # last = self._clock
+        # reset: a timer in sim time keeps running if the simulation restarts
+        self._cycle_timer = rospy.Timer(
+            self._cycle_period, self.callback_cycle, reset=True
+        )
 
     def callback_receive_cmd_vel(self, msg_cmd_vel: Twist):
         self._action = msg_cmd_vel
 
-    def callback_clock(self, msg_clock: Clock):
-        self._clock = msg_clock.clock.to_sec()
+    def callback_cycle(self, event: rospy.timer.TimerEvent):
+        now = event.current_real
+        if self._next_deadline is None or now + self._cycle_period < self._next_deadline:
+            # first cycle or the time moved backwards
+            self._next_deadline = now
+
+        if self._sub.get_num_connections() < 1:
+            rospy.loginfo_throttle(
+                1,
+                f"ActionPublisher: No publisher to {self._ns_prefix}cmd_vel_pub yet..",
+            )
+            self._next_deadline = now + self._cycle_period
+            return
+
+        self._pub_cmd_vel.publish(self._action)
+        self._pub_cycle_trigger.publish(self._signal)
+
+        # skip the deadlines that already passed instead of catching up on them
+        lateness = (now - self._next_deadline).to_sec()
+        missed = max(0, int(lateness // self._cycle_period.to_sec()))
+        self._next_deadline += self._cycle_period * (missed + 1)
+        self._update_stats(lateness, missed)
+
+    def _update_stats(self, jitter: float, missed: int):
+        self._cycles += 1
+        self._jitter_sum += jitter
+        self._jitter_max = max(self._jitter_max, jitter)
+        self._missed += missed
+
+        if self._cycles >= STATS_INTERVAL:
+            self._stats_msg.data = [
+                self._jitter_sum / self._cycles,
+                self._jitter_max,
+                self._missed,
+            ]
+            self._pub_cycle_stats.publish(self._stats_msg)
+            if self._missed > 0:
+                rospy.logwarn(
+                    f"ActionPublisher: missed {self._missed} deadlines "
+                    f"in the last {self._cycles} cycles"
+                )
+            self._reset_stats()
+
+    def _reset_stats(self):
+        self._cycles = 0
+        self._jitter_sum = 0.0
+        self._jitter_max = 0.0
+        self._missed = 0
 
 
 if __name__ == "__main__":
     try:
         ActionPublisher()
+        rospy.spin()
     except rospy.ROSInterruptException:
         pass
@@ -1,4 +1,7 @@
 #!/usr/bin/env python
+from typing import Tuple
+
+import numpy as np
 import os
 import pickle
 import rospy
@@ -8,10 +11,11 @@ import sys
 from stable_baselines3 import PPO
 
 from flatland_msgs.srv import StepWorld, StepWorldRequest
-from rospy.exceptions import ROSException
 from std_msgs.msg import Bool
 
 from rl_agent.base_agent_wrapper import BaseDRLAgent
+from rl_agent.utils.latest_message import LatestMessage
+from rl_agent.model.inference import InferenceEngine, LatencyReport
 
 
 """ TEMPORARY GLOBAL CONSTANTS """
@@ -66,12 +70,27 @@ class DeploymentDRLAgent(BaseDRLAgent):
             action_space_path,
         )
 
+        # normalization is applied by the inference engine, hence the
+        # observations are passed on unnormalized (see 'get_observations')
+        self._inference_engine = InferenceEngine(
+            self._agent,
+            self._vec_normalize if self._agent_params["normalize"] else None,
+            device=rospy.get_param("~inference_device", "cpu"),
+        )
+        self._latency_report = LatencyReport(budget=self._action_frequency)
+
         if self._is_train_mode:
             # step world to fast forward simulation time
             self._service_name_step = f"{self._ns}step_world"
             self._sim_step_client = rospy.ServiceProxy(
                 self._service_name_step, StepWorld
             )
+        else:
+            # cycle trigger of the ActionPublisher, subscribed once for the node's lifetime
+            self._cycle_trigger = LatestMessage.get(
+                f"{self._ns_robot}next_cycle", Bool
+            )
+            self._last_cycle_seq = None
 
     def setup_agent(self) -> None:
         """Loads the trained policy and when required the VecNormalize object."""
@@ -93,8 +112,39 @@ class DeploymentDRLAgent(BaseDRLAgent):
             vec_normalize = pickle.load(file_handler)
 
         self._agent = PPO.load(model_file).policy
+        self._vec_normalize = vec_normalize
         self._obs_norm_func = vec_normalize.normalize_obs
 
+    @property
+    def inference_engine(self) -> InferenceEngine:
+        """Returns the inference engine, e.g. to infer actions for several robots at once."""
+        return self._inference_engine
+
+    def get_observations(self) -> Tuple[np.ndarray, dict]:
+        """Retrieves the latest synchronized observation.
+
+        Note:
+            The observation is not normalized here, 'get_action' takes care of it.
+
+        Returns:
+            Tuple[np.ndarray, dict]:
+                Tuple, where first entry depicts the observation data concatenated \
+                into one array. Second entry represents the observation dictionary.
+        """
+        return self.observation_collector.get_observations()
+
+    def get_action(self, obs: np.ndarray) -> np.ndarray:
+        """Infers an action with the inference engine.
+
+        Args:
+            obs (np.ndarray): Unnormalized merged observation array.
+
+        Returns:
+            np.ndarray:
+                Action in [linear velocity, angular velocity]
+        """
+        return self._map_action(self._inference_engine.predict(obs))
+
     def run(self) -> None:
         """Loop for running the agent until ROS is shutdown.
         
@@ -110,9 +160,18 @@ class DeploymentDRLAgent(BaseDRLAgent):
                 self.call_service_takeSimStep(self._action_frequency)
             else:
                 self._wait_for_next_action_cycle()
+
+            self._latency_report.start_cycle()
             obs = self.get_observations()[0]
+            self._latency_report.mark("observation")
             action = self.get_action(obs)
+            self._latency_report.mark("inference")
             self.publish_action(action)
+            self._latency_report.mark("publish")
+
+            report = self._latency_report.end_cycle()
+            if report is not None:
+                rospy.loginfo(f"[{self.name}] cycle latency: {report}")
 
     def _wait_for_next_action_cycle(self) -> None:
         """Stops the loop until a trigger message is sent by the ActionPublisher
@@ -121,10 +180,9 @@ class DeploymentDRLAgent(BaseDRLAgent):
             Only use this method in combination with the ActionPublisher node!
             That node is only booted when training mode is off.
         """
-        try:
-            rospy.wait_for_message(f"{self._ns_robot}next_cycle", Bool)
-        except ROSException:
-            pass
+        _, self._last_cycle_seq = self._cycle_trigger.wait_for_newer(
+            self._last_cycle_seq
+        )
 
     def call_service_takeSimStep(self, t: float = None) -> None:
         """Fast-forwards the simulation time.
@@ -1,3 +1,5 @@
+import csv
+import multiprocessing
 import os
 import sys
 import rospy
@@ -7,6 +9,8 @@ import numpy as np
 import time
 import warnings
 
+from typing import Any, List, Set, Tuple
+
 from stable_baselines3 import PPO
 from stable_baselines3.common.vec_env import (
     SubprocVecEnv,
@@ -14,9 +18,9 @@ from stable_baselines3.common.vec_env import (
     VecNormalize,
 )
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.evaluation import evaluate_policy
 
 from rl_agent.envs.flatland_gym_env import FlatlandEnv
+from rl_agent.envs.rollout_recorder import RolloutRecorder
 from task_generator.task_generator.tasks import StopReset
 from tools.argsparser import parse_run_agent_args
 from tools.train_agent_utils import (
@@ -48,7 +52,26 @@ AGENTS = [
 ]
 
 
-def get_paths(args: dict, AGENT: str):
+# columns of the aggregated results table
+RESULT_FIELDS = [
+    "agent",
+    "scenario",
+    "sim",
+    "episode",
+    "reward",
+    "length",
+    "done_reason",
+    "is_success",
+    "collisions",
+    "distance_travelled",
+    "time_safe_dist",
+    "time",
+    "jerk",
+    "plan_progress",
+]
+
+
+def get_paths(args: dict, AGENT: str, scenario: str):
     dir = rospkg.RosPack().get_path("arena_local_planner_drl")
     PATHS = {
         "model": os.path.join(dir, "agents", AGENT),
@@ -62,38 +85,42 @@ def get_paths(args: dict, AGENT: str):
         "scenario": os.path.join(
             rospkg.RosPack().get_path("simulator_setup"),
             "scenarios",
-            args.scenario + ".json",
+            scenario + ".json",
         ),
         "curriculum": os.path.join(
             dir, "configs", "training_curriculum_map1small.yaml"
         ),
         "log": os.path.join(dir, "evaluation_logs", AGENT),
+        "rollouts": os.path.join(
+            dir, "evaluation_logs", AGENT, "rollouts", scenario
+        ),
     }
-    if args.log and not os.path.exists(PATHS["log"]):
-        os.makedirs(PATHS["log"])
+    if (args.log or args.record) and not os.path.exists(PATHS["log"]):
+        os.makedirs(PATHS["log"], exist_ok=True)
     return PATHS
 
 
 def make_env(
-    with_ns: bool,
+    ns: str,
     PATHS: dict,
     PARAMS: dict,
     log: bool = False,
     max_steps: int = 1000,
+    record: bool = False,
 ):
     """
     Utility function for the evaluation environment.
 
+    :param ns: (str) namespace of the simulation
     :param params: (dict) hyperparameters of agent to be trained
     :param PATHS: (dict) script relevant paths
     :param log: (bool) to differentiate between train and eval env
     :param max_steps: (int) number of steps before the episode is stopped
+    :param record: (bool) record the rollouts to PATHS["rollouts"]
     :return: (Callable)
     """
 
     def _init():
-        ns = f"eval_sim" if with_ns else ""
-
         env = FlatlandEnv(
             ns,
             PARAMS["reward_fnc"],
@@ -106,17 +133,22 @@ def make_env(
             curr_stage=4,
             extended_eval=True,
         )
+        if record:
+            env = RolloutRecorder(env, PATHS["rollouts"])
         if log:
-            # eval env
+            # eval env, one monitor file per scenario
+            scenario = os.path.splitext(os.path.basename(PATHS["scenario"]))[0]
             env = Monitor(
                 env,
-                PATHS["log"],
+                os.path.join(PATHS["log"], scenario),
                 False,
                 info_keywords=(
                     "collisions",
                     "distance_travelled",
                     "time_safe_dist",
                     "time",
+                    "jerk",
+                    "plan_progress",
                     "done_reason",
                     "is_success",
                 ),
@@ -126,61 +158,216 @@ def make_env(
     return _init
 
 
-if __name__ == "__main__":
-    args, _ = parse_run_agent_args()
+def run_episodes(agent: PPO, env, num_eps: int) -> List[dict]:
+    """
+    Runs the agent deterministically and returns one result row per episode.
+    Stops early when the scenario can't be reset anymore.
+    """
+    rows = []
+    cum_reward, length = 0.0, 0
+    try:
+        obs = env.reset()
+        while len(rows) < num_eps:
+            action, _ = agent.predict(obs, deterministic=True)
+            obs, rewards, dones, infos = env.step(action)
+            cum_reward += float(rewards[0])
+            length += 1
+            if dones[0]:
+                row = {"reward": cum_reward, "length": length}
+                row.update(
+                    {key: infos[0].get(key) for key in RESULT_FIELDS[6:]}
+                )
+                rows.append(row)
+                cum_reward, length = 0.0, 0
+    except StopReset:
+        pass
+    return rows
 
-    if args.load:
-        AGENTS = [args.load]
-    assert len(AGENTS) > 0, "No agent name was given for evaluation"
 
-    ros_params = rospy.get_param_names()
-    ns_for_nodes = "/single_env" not in ros_params
+def evaluate_agent(args, AGENT: str, scenario: str, ns: str) -> List[dict]:
+    """
+    Evaluates one agent on one scenario in the simulation of the given namespace.
 
-    start = time.time()
-    while len(AGENTS) != 0:
-        AGENT = AGENTS.pop(0)
-        print(f"START RUNNING AGENT:    {AGENT}")
-        PATHS = get_paths(args, AGENT)
+    :return: (List[dict]) result rows, empty when the agent had to be skipped
+    """
+    print(f"START RUNNING AGENT:    {AGENT} ({scenario}, sim: '{ns}')")
+    PATHS = get_paths(args, AGENT, scenario)
+
+    assert os.path.isfile(os.path.join(PATHS["model"], "best_model.zip")), (
+        "No model file found in %s" % PATHS["model"]
+    )
+    assert os.path.isfile(PATHS["scenario"]), (
+        "No scenario file named %s" % PATHS["scenario"]
+    )
+
+    PARAMS = load_hyperparameters_json(PATHS)
+    print_hyperparameters(PARAMS)
+
+    env = DummyVecEnv(
+        [make_env(ns, PATHS, PARAMS, args.log, args.max_steps, args.record)]
+    )
+    if PARAMS["normalize"]:
+        if not os.path.isfile(PATHS["vecnorm"]):
+            # without it agent performance will be strongly altered
+            warnings.warn(
+                f"Couldn't find VecNormalize pickle for {PATHS['model'].split('/')[-1]}, going to skip this model"
+            )
+            env.close()
+            return []
+
+        env = VecNormalize.load(PATHS["vecnorm"], env)
+        # evaluation must neither update the statistics nor scale the rewards
+        env.training = False
+        env.norm_reward = False
+
+    # load agent
+    agent = PPO.load(os.path.join(PATHS["model"], "best_model.zip"), env)
+
+    rows = run_episodes(agent, env, args.num_eps)
+    # flushes the recorded rollouts
+    env.close()
+
+    for i, row in enumerate(rows):
+        row.update(agent=AGENT, scenario=scenario, sim=ns, episode=i)
+    return rows
 
-        assert os.path.isfile(os.path.join(PATHS["model"], "best_model.zip")), (
-            "No model file found in %s" % PATHS["model"]
-        )
-        assert os.path.isfile(PATHS["scenario"]), (
-            "No scenario file named %s" % PATHS["scenario"]
-        )
 
-        PARAMS = load_hyperparameters_json(PATHS)
-        print_hyperparameters(PARAMS)
+def load_finished_tasks(results_file: str) -> Set[Tuple[str, str]]:
+    """Returns the (agent, scenario) pairs already present in the results table."""
+    if not os.path.isfile(results_file):
+        return set()
+    with open(results_file, "r", newline="") as file:
+        return {(row["agent"], row["scenario"]) for row in csv.DictReader(file)}
 
-        env = DummyVecEnv(
-            [make_env(ns_for_nodes, PATHS, PARAMS, args.log, args.max_steps)]
+
+def append_results(results_file: str, rows: List[dict]) -> None:
+    """Appends the rows of one finished task to the results table.
+
+    A table written with fewer columns (e.g. before 'jerk' and 'plan_progress'
+    were added) is rewritten with the current header first, its rows keep
+    empty values in the new columns.
+    """
+    new_file = not os.path.isfile(results_file)
+    if not new_file:
+        _upgrade_results_header(results_file)
+    with open(results_file, "a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def _upgrade_results_header(results_file: str) -> None:
+    with open(results_file, "r", newline="") as file:
+        header = next(csv.reader(file), None)
+    if header is None or header == RESULT_FIELDS:
+        return
+
+    unknown = [field for field in header if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Can't append to '{results_file}', it has the unknown columns {unknown}. "
+            f"Expected the columns {RESULT_FIELDS}, use another results file."
         )
-        if PARAMS["normalize"]:
-            if not os.path.isfile(PATHS["vecnorm"]):
-                # without it agent performance will be strongly altered
-                warnings.warn(
-                    f"Couldn't find VecNormalize pickle for {PATHS['model'].split('/')[-1]}, going to skip this model"
-                )
-                continue
 
-            env = VecNormalize.load(PATHS["vecnorm"], env)
+    with open(results_file, "r", newline="") as file:
+        rows = list(csv.DictReader(file))
+    # replaced atomically, an interrupted upgrade keeps the old table
+    with open(results_file + ".tmp", "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(results_file + ".tmp", results_file)
+    added = [field for field in RESULT_FIELDS if field not in header]
+    warnings.warn(f"Added the columns {added} to '{results_file}'")
+
+
+# simulation namespace of the worker process
+_worker_ns = None
+
+
+def _init_worker(namespaces) -> None:
+    global _worker_ns
+    _worker_ns = namespaces.get()
+
+
+def _evaluate_task(task: Tuple[Any, str, str]) -> List[dict]:
+    args, AGENT, scenario = task
+    return evaluate_agent(args, AGENT, scenario, _worker_ns)
 
-        # load agent
-        agent = PPO.load(os.path.join(PATHS["model"], "best_model.zip"), env)
 
-        try:
-            evaluate_policy(
-                model=agent,
-                env=env,
-                n_eval_episodes=args.num_eps,
-                deterministic=True,
+def print_summary(results_file: str) -> None:
+    if not os.path.isfile(results_file):
+        return
+    summary = {}
+    with open(results_file, "r", newline="") as file:
+        for row in csv.DictReader(file):
+            stats = summary.setdefault((row["agent"], row["scenario"]), [])
+            stats.append(
+                (float(row["reward"]), row["is_success"] in ("1", "True"))
             )
-        except StopReset:
-            pass
+    for (AGENT, scenario), stats in sorted(summary.items()):
+        rewards, successes = zip(*stats)
+        print(
+            f"{AGENT} | {scenario}: {len(stats)} episodes, "
+            f"mean reward {np.mean(rewards):.2f}, success rate {np.mean(successes):.2f}"
+        )
+
+
+def main():
+    args, _ = parse_run_agent_args()
+
+    agents = [args.load] if args.load else AGENTS
+    assert len(agents) > 0, "No agent name was given for evaluation"
+
+    if args.sims:
+        sims = args.sims
+    else:
+        ros_params = rospy.get_param_names()
+        sims = ["" if "/single_env" in ros_params else "eval_sim"]
+
+    results_file = args.results or os.path.join(
+        rospkg.RosPack().get_path("arena_local_planner_drl"),
+        "evaluation_logs",
+        "results.csv",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(results_file)), exist_ok=True)
+
+    # resume from the partial results of a previous run
+    finished = load_finished_tasks(results_file)
+    tasks = [
+        (args, AGENT, scenario)
+        for AGENT in agents
+        for scenario in args.scenario
+        if (AGENT, scenario) not in finished
+    ]
+    if len(tasks) < len(agents) * len(args.scenario):
+        print(
+            f"Resuming, skipping {len(agents) * len(args.scenario) - len(tasks)} finished task(s)"
+        )
 
-    time = round(time.time() - start)
-    print(f"Time passed:    {time}s")
+    start = time.time()
+    if len(sims) == 1:
+        for _, AGENT, scenario in tasks:
+            rows = evaluate_agent(args, AGENT, scenario, sims[0])
+            append_results(results_file, rows)
+    else:
+        # one simulation per worker, processes are spawned to get clean ROS nodes
+        ctx = multiprocessing.get_context("spawn")
+        namespaces = ctx.Queue()
+        for ns in sims:
+            namespaces.put(ns)
+        with ctx.Pool(len(sims), _init_worker, (namespaces,)) as pool:
+            for rows in pool.imap_unordered(_evaluate_task, tasks):
+                append_results(results_file, rows)
+
+    print_summary(results_file)
+    print(f"Time passed:    {round(time.time() - start)}s")
     print("EVALUATION DONE!")
+
+
+if __name__ == "__main__":
+    main()
     sys.exit()
 
     # env.reset()
@@ -15,10 +15,12 @@ from rl_agent.model.agent_factory import AgentFactory
 from rl_agent.model.base_agent import BaseAgent
 from rl_agent.model.custom_policy import *
 from rl_agent.model.custom_sb3_policy import *
+from rl_agent.utils.debug import TRACER
 from tools.argsparser import parse_training_args
 from tools.custom_mlp_utils import *
 from tools.train_agent_utils import *
 from tools.staged_train_callback import InitiateNewTrainStage
+from tools.trace_callback import TraceLoggerCallback
 
 
 def main():
@@ -35,12 +37,24 @@ def main():
 
     print("________ STARTING TRAINING WITH:  %s ________\n" % AGENT_NAME)
 
+    # timing spans, enabled before the env processes are forked
+    if args.trace:
+        os.environ["ARENA_TRACE"] = "1"
+        TRACER.enable()
+
     # for training with start_arena_flatland.launch
     ros_params = rospy.get_param_names()
     ns_for_nodes = "/single_env" not in ros_params
 
-    # check if simulations are booted
-    wait_for_nodes(with_ns=ns_for_nodes, n_envs=args.n_envs, timeout=5)
+    # check if simulations are booted, the flatland simulations of the multi env
+    # setup also have to provide their step service and the mapped scan
+    wait_for_nodes(
+        with_ns=ns_for_nodes,
+        n_envs=args.n_envs,
+        timeout=5 * args.n_envs,
+        services=("step_world",) if ns_for_nodes else (),
+        topics=("scan_mapped",) if ns_for_nodes else (),
+    )
 
     # initialize hyperparameters (save to/ load from json)
     params = initialize_hyperparameters(
@@ -68,17 +82,6 @@ def main():
             ]
         )
 
-    # threshold settings for training curriculum
-    # type can be either 'succ' or 'rew'
-    trainstage_cb = InitiateNewTrainStage(
-        n_envs=args.n_envs,
-        treshhold_type="succ",
-        upper_threshold=0.85,
-        lower_threshold=0.6,
-        task_mode=params["task_mode"],
-        verbose=1,
-    )
-
     # stop training on reward threshold callback
     stoptraining_cb = StopTrainingOnRewardThreshold(
         treshhold_type="succ", threshold=0.9, verbose=1
@@ -102,6 +105,20 @@ def main():
     else:
         eval_env = env
 
+    # threshold settings for training curriculum, built after the eval env
+    # which initializes the ros node of this process
+    # type can be either 'succ' or 'rew'
+    trainstage_cb = InitiateNewTrainStage(
+        n_envs=args.n_envs,
+        treshhold_type="succ",
+        upper_threshold=0.85,
+        lower_threshold=0.6,
+        task_mode=params["task_mode"],
+        PATHS=PATHS,
+        start_stage=params["curr_stage"],
+        verbose=1,
+    )
+
     # try to load most recent vec_normalize obj (contains statistics like moving avg)
     env, eval_env = load_vec_normalize(params, PATHS, env, eval_env)
 
@@ -201,7 +218,14 @@ def main():
     try:
         model.learn(
             total_timesteps=n_timesteps,
-            callback=eval_cb,
+            callback=[
+                eval_cb,
+                TraceLoggerCallback(
+                    chrome_trace_dir=os.path.join(PATHS["model"], "traces")
+                ),
+            ]
+            if args.trace
+            else eval_cb,
             reset_num_timesteps=True,
         )
     except KeyboardInterrupt:
@@ -8,6 +8,7 @@ rospy.set_param("/MARL", True)
 from rl_agent.training_agent_wrapper import TrainingDRLAgent
 from scripts.deployment.drl_agent_node import DeploymentDRLAgent
 from rl_agent.envs.pettingzoo_env import FlatlandPettingZooEnv
+from rl_agent.envs.marl_runner import MARLRunner
 
 from nav_msgs.srv import GetMap
 
@@ -42,23 +43,27 @@ def instantiate_drl_agents(
     ]
 
 
-def main():
+def main(num_sims: int = 1, num_robots: int = 4):
     rospy.set_param("/MARL", True)
     rospy.init_node(f"USER_NODE", anonymous=True)
 
-    agent_list = instantiate_drl_agents(num_robots=4, ns="sim_1")
-
-    env = FlatlandPettingZooEnv(ns="sim_1", agent_list=agent_list)
-    obs = env.reset()
+    envs = [
+        FlatlandPettingZooEnv(
+            ns=f"sim_{i + 1}",
+            agent_list=instantiate_drl_agents(
+                num_robots=num_robots, ns=f"sim_{i + 1}"
+            ),
+        )
+        for i in range(num_sims)
+    ]
 
     AGENT = DeploymentDRLAgent(
         agent_name="rule_04", ns="sim_1", robot_name="test1"
     )
 
-    agent_names = env.agents
-    for _ in range(100000000):
-        actions = {agent: AGENT.get_action(obs[agent]) for agent in agent_names}
-        obs, rewards, dones, infos = env.step(actions)
+    # one forward pass for all robots of all simulations
+    runner = MARLRunner(envs, AGENT.inference_engine)
+    runner.run(num_steps=100000000)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the tests import the packages of arena_local_planner_drl like its scripts do, e.g. 'rl_agent.envs'
+DRL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DRL_DIR not in sys.path:
+    sys.path.insert(0, DRL_DIR)
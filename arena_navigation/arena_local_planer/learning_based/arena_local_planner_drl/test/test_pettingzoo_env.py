@@ -0,0 +1,91 @@
+"""Action handling of FlatlandPettingZooEnv.step, without simulator or ROS master."""
+import numpy as np
+import pytest
+
+pytest.importorskip("rospy")
+pytest.importorskip("pettingzoo")
+pytest.importorskip("task_generator.marl_tasks")
+
+from rl_agent.envs.pettingzoo_env import FlatlandPettingZooEnv
+from rl_agent.training_agent_wrapper import TrainingDRLAgent
+
+DISCRETE_ACTIONS = (
+    {"name": "forward", "linear": 0.3, "angular": 0.0},
+    {"name": "left", "linear": 0.1, "angular": 0.5},
+)
+
+
+class _Publisher:
+    def __init__(self):
+        self.msgs = []
+
+    def publish(self, msg):
+        self.msgs.append(msg)
+
+
+class _ObservationHub:
+    def __init__(self, num_agents: int):
+        self.num_agents = num_agents
+
+    def collect(self):
+        return np.zeros((self.num_agents, 4), dtype=np.float32), {}
+
+
+class _RewardCalculator:
+    def get_rewards(self, action: np.ndarray, **obs_dict):
+        self.action = action.copy()
+        n = len(action)
+        return np.zeros(n), {
+            "is_done": np.zeros(n, dtype=bool),
+            "done_reason": np.zeros(n, dtype=int),
+            "is_success": np.zeros(n, dtype=int),
+        }
+
+
+def _agent(name: str, discrete: bool) -> TrainingDRLAgent:
+    # the ROS setup of the constructor is skipped, only the action handling is used
+    agent = TrainingDRLAgent.__new__(TrainingDRLAgent)
+    agent._robot_sim_ns = name
+    agent._agent_params = {"discrete_action_space": discrete}
+    agent._discrete_actions = DISCRETE_ACTIONS
+    agent._action_pub = _Publisher()
+    return agent
+
+
+def _env(agents) -> FlatlandPettingZooEnv:
+    env = FlatlandPettingZooEnv.__new__(FlatlandPettingZooEnv)
+    env.possible_agents = [a._robot_sim_ns for a in agents]
+    env.agents = env.possible_agents[:]
+    env.agent_name_mapping = {name: i for i, name in enumerate(env.possible_agents)}
+    env.agent_object_mapping = dict(zip(env.possible_agents, agents))
+    env._observation_hub = _ObservationHub(len(agents))
+    env._reward_calculator = _RewardCalculator()
+    env.call_service_takeSimStep = lambda t=None: None
+    env.num_moves = 0
+    env._max_num_moves = 1000
+    return env
+
+
+def test_discrete_action_is_mapped_once():
+    agents = [_agent("robot_1", discrete=True), _agent("robot_2", discrete=True)]
+    env = _env(agents)
+
+    # action indices as returned by MARLRunner.get_actions, robot_2 without action
+    _, rewards, dones, _ = env.step({"robot_1": np.int64(1)})
+
+    (msg,) = agents[0]._action_pub.msgs
+    assert (msg.linear.x, msg.angular.z) == (0.1, 0.5)
+    assert agents[1]._action_pub.msgs == []
+    np.testing.assert_allclose(env._reward_calculator.action, [[0.1, 0.5], [0.0, 0.0]])
+    assert set(rewards) == set(dones) == {"robot_1", "robot_2"}
+
+
+def test_continuous_action_is_published_unchanged():
+    agent = _agent("robot_1", discrete=False)
+    env = _env([agent])
+
+    env.step({"robot_1": np.array([0.2, -0.4])})
+
+    (msg,) = agent._action_pub.msgs
+    assert (msg.linear.x, msg.angular.z) == (0.2, -0.4)
+    np.testing.assert_allclose(env._reward_calculator.action, [[0.2, -0.4]])
@@ -0,0 +1,102 @@
+"""Raycaster ranges compared with an exact grid traversal."""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+pytest.importorskip("rospkg")
+
+from rl_agent.utils.grid_map import GridMap
+from rl_agent.utils.raycast import Obstacles, Raycaster
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), *[os.pardir] * 5))
+MAPS_DIR = os.path.join(ROOT_DIR, "simulator_setup", "maps")
+MAX_RANGE = 8.0
+
+
+def dda_range(grid_map: GridMap, pose: np.ndarray, max_range: float) -> float:
+    """Exact range of one beam by walking the cells it crosses (Amanatides & Woo),
+    the map is surrounded by an occupied border ring."""
+    occupied = np.pad(grid_map.occupied, 1, constant_values=True)
+    start = (pose[:2] - grid_map.origin) / grid_map.resolution + 1
+    direction = np.array([np.cos(pose[2]), np.sin(pose[2])])
+    cell = np.floor(start).astype(int)
+    if occupied[cell[1], cell[0]]:
+        return 0.0
+
+    step = np.sign(direction).astype(int)
+    with np.errstate(divide="ignore"):
+        t_delta = np.abs(1.0 / direction)
+    t_max = np.where(
+        direction > 0,
+        (cell + 1 - start) * t_delta,
+        np.where(direction < 0, (start - cell) * t_delta, np.inf),
+    )
+    max_dist = max_range / grid_map.resolution
+    while True:
+        axis = int(np.argmin(t_max))
+        t = t_max[axis]
+        if t >= max_dist:
+            return max_range
+        cell[axis] += step[axis]
+        t_max[axis] += t_delta[axis]
+        if occupied[cell[1], cell[0]]:
+            return t * grid_map.resolution
+
+
+def _random_poses(grid_map: GridMap, num: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    free = np.argwhere(~grid_map.occupied)
+    cells = free[rng.integers(len(free), size=num)]
+    # anywhere within the free cells, not only at their centers
+    xy = grid_map.origin + (cells[:, ::-1] + rng.uniform(0.0, 1.0, (num, 2))) * grid_map.resolution
+    return np.hstack((xy, rng.uniform(-np.pi, np.pi, (num, 1))))
+
+
+def _assert_matches_dda(grid_map: GridMap, poses: np.ndarray, angles: np.ndarray):
+    ranges = Raycaster(grid_map, angles, MAX_RANGE).cast(poses)
+    for pose, pose_ranges in zip(poses, ranges):
+        expected = [dda_range(grid_map, np.array([*pose[:2], pose[2] + a]), MAX_RANGE) for a in angles]
+        np.testing.assert_allclose(pose_ranges, expected, atol=1e-3, err_msg=f"pose {pose}")
+
+
+def _open_map() -> GridMap:
+    # free space touching all map edges, a diagonal wall in the middle
+    grid = np.full((40, 60), GridMap.FREE, dtype=np.int8)
+    for i in range(30):
+        grid[5 + i, 10 + i] = GridMap.OCCUPIED
+    return GridMap(grid, 0.1, (-1.0, -2.0))
+
+
+def test_rays_stop_at_the_map_border():
+    grid_map = _open_map()
+    _assert_matches_dda(grid_map, _random_poses(grid_map, 50), np.linspace(-np.pi, np.pi, 72, endpoint=False))
+
+
+def test_rays_parallel_to_the_grid_axes():
+    grid_map = _open_map()
+    poses = _random_poses(grid_map, 20)
+    poses[:, 2] = np.resize([0.0, np.pi / 2, -np.pi / 2, np.pi], 20)
+    # beams at exactly -pi, -pi/2, 0 and pi/2
+    _assert_matches_dda(grid_map, poses, np.linspace(-np.pi, np.pi, 4, endpoint=False))
+
+
+def test_rays_on_a_map_with_free_border_cells():
+    map_yaml = os.path.join(MAPS_DIR, "ignc_lab", "map.yaml")
+    if not os.path.isfile(map_yaml):
+        pytest.skip("map 'ignc_lab' not found")
+    grid_map = GridMap.from_yaml(map_yaml)
+
+    # beam towards the upper map border
+    ranges = Raycaster(grid_map, np.array([0.0]), MAX_RANGE).cast([-11.52, 9.21, np.pi / 2])
+    assert ranges[0, 0] == pytest.approx(dda_range(grid_map, np.array([-11.52, 9.21, np.pi / 2]), MAX_RANGE), abs=1e-3)
+
+    _assert_matches_dda(grid_map, _random_poses(grid_map, 50), np.linspace(-np.pi, np.pi, 72, endpoint=False))
+
+
+def test_obstacles_shorten_the_ranges():
+    grid_map = _open_map()
+    obstacles = Obstacles.from_shapes([[1.0, 0.0, 0.2]], [np.array([[0.0, 1.0], [0.4, 1.0], [0.4, 1.4], [0.0, 1.4]])])
+    ranges = Raycaster(grid_map, np.array([0.0, np.pi / 2]), MAX_RANGE).cast([0.2, 0.0, 0.0], obstacles)
+    np.testing.assert_allclose(ranges[0], [0.6, 1.0], atol=1e-5)
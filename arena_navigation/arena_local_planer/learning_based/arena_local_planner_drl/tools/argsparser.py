@@ -56,6 +56,11 @@ def training_args(parser):
     parser.add_argument(
         "--tb", action="store_true", help="enables tensorboard logging"
     )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="records timing spans of the env steps and the policy, logged to tensorboard",
+    )
 
 
 def marl_training_args(parser):
@@ -79,13 +84,32 @@ def run_agent_args(parser):
         action="store_true",
         help="store log file with episode information",
     )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="record the rollouts for offline analysis",
+    )
     parser.add_argument(
         "-s",
         "--scenario",
         type=str,
+        nargs="+",
         metavar="[scenario name]",
-        default="scenario1",
-        help="name of scenario file for deployment",
+        default=["scenario1"],
+        help="name(s) of scenario file(s) for deployment",
+    )
+    parser.add_argument(
+        "--sims",
+        type=str,
+        nargs="+",
+        metavar="[namespace]",
+        help="namespaces of the simulations to evaluate on in parallel (one worker per simulation)",
+    )
+    parser.add_argument(
+        "--results",
+        type=str,
+        metavar="[csv file]",
+        help="aggregated results table, finished agent/scenario pairs in it are skipped",
     )
     parser.add_argument(
         "--num_eps",
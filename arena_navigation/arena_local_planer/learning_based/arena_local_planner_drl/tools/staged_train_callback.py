@@ -1,12 +1,11 @@
+import os
 import warnings
-import rospy
 import numpy as np
-import time
+import yaml
 
 from typing import List
-from std_msgs.msg import Bool
 from stable_baselines3.common.callbacks import BaseCallback, EvalCallback
-from task_generator.task_generator.tasks import StagedRandomTask
+from task_generator.task_generator.curriculum import CurriculumState
 
 
 class InitiateNewTrainStage(BaseCallback):
@@ -18,6 +17,9 @@ class InitiateNewTrainStage(BaseCallback):
     :param rew_threshold (int): mean reward threshold to trigger new stage
     :param succ_rate_threshold (float): threshold percentage of succesful episodes to trigger new stage
     :param task_mode (str): training task mode, if not 'staged' callback won't be called
+    :param PATHS (dict): program relevant paths, the stages are read from PATHS["curriculum"]
+        and the current stage is persisted to the agent's hyperparameters.json in PATHS["model"]
+    :param start_stage (int): stage the training starts with
     :param verbose:
     """
 
@@ -28,6 +30,8 @@ class InitiateNewTrainStage(BaseCallback):
         upper_threshold: float = 0,
         lower_threshold: float = 0,
         task_mode: str = "staged",
+        PATHS: dict = None,
+        start_stage: int = 1,
         verbose=0,
     ):
 
@@ -66,37 +70,29 @@ class InitiateNewTrainStage(BaseCallback):
         self.activated = bool(task_mode == "staged")
 
         if self.activated:
-            rospy.set_param("/last_stage_reached", False)
-            self._instantiate_publishers()
-
-            self._trigger = Bool()
-            self._trigger.data = True
-
-    def _instantiate_publishers(self):
-        self._publishers_next = []
-        self._publishers_previous = []
-
-        self._publishers_next.append(
-            rospy.Publisher(f"/eval_sim/next_stage", Bool, queue_size=1)
-        )
-        self._publishers_previous.append(
-            rospy.Publisher(f"/eval_sim/previous_stage", Bool, queue_size=1)
-        )
-
-        for env_num in range(self.n_envs):
-            self._publishers_next.append(
-                rospy.Publisher(f"/sim_{env_num+1}/next_stage", Bool, queue_size=1)
-            )
-            self._publishers_previous.append(
-                rospy.Publisher(f"/sim_{env_num+1}/previous_stage", Bool, queue_size=1)
+            # one broadcast reaches the tasks of all train and eval envs
+            with open(PATHS["curriculum"], "r") as file:
+                num_stages = len(yaml.safe_load(file))
+            self.curriculum = CurriculumState(
+                num_stages,
+                start_stage=start_stage,
+                json_file=os.path.join(PATHS["model"], "hyperparameters.json"),
             )
 
+    def _init_callback(self) -> None:
+        if self.activated:
+            self.curriculum.announce()
+
     def _on_step(self, EvalObject: EvalCallback) -> bool:
         assert isinstance(
             EvalObject, EvalCallback
         ), f"InitiateNewTrainStage must be called within EvalCallback"
 
         if self.activated:
+            # the start stage wasn't sent yet if the node wasn't initialized before
+            if self.curriculum.unannounced:
+                self.curriculum.announce()
+
             if EvalObject.n_eval_episodes < 20:
                 warnings.warn(
                     "Only %d evaluation episodes considered for threshold monitoring,"
@@ -111,10 +107,9 @@ class InitiateNewTrainStage(BaseCallback):
                 self.threshhold_type == "succ"
                 and EvalObject.last_success_rate <= self.lower_threshold
             ):
-                for i, pub in enumerate(self._publishers_previous):
-                    pub.publish(self._trigger)
-                    if i == 0:
-                        self.log_curr_stage(EvalObject.logger)
+                if not self.curriculum.previous_stage() and self.verbose > 0:
+                    print("INFO: Tried to trigger previous stage but already reached first one")
+                self.log_curr_stage(EvalObject.logger)
 
             if (
                 self.threshhold_type == "rew"
@@ -123,16 +118,17 @@ class InitiateNewTrainStage(BaseCallback):
                 self.threshhold_type == "succ"
                 and EvalObject.last_success_rate >= self.upper_threshold
             ):
-                if not rospy.get_param("/last_stage_reached"):
+                if not self.curriculum.last_stage_reached:
                     EvalObject.best_mean_reward = -np.inf
                     EvalObject.last_success_rate = -np.inf
 
-                for i, pub in enumerate(self._publishers_next):
-                    pub.publish(self._trigger)
-                    if i == 0:
-                        self.log_curr_stage(EvalObject.logger)
+                if not self.curriculum.next_stage() and self.verbose > 0:
+                    print("INFO: Tried to trigger next stage but already reached last one")
+                self.log_curr_stage(EvalObject.logger)
 
     def log_curr_stage(self, logger):
-        time.sleep(1)
-        curr_stage = rospy.get_param("/curr_stage", -1)
-        logger.record("train_stage/stage_idx", curr_stage)
+        logger.record("train_stage/stage_idx", self.curriculum.stage)
+
+    def _on_training_end(self) -> None:
+        if self.activated:
+            self.curriculum.close()
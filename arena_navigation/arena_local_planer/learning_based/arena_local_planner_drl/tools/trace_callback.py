@@ -0,0 +1,76 @@
+import os
+
+from typing import Optional
+from stable_baselines3.common.callbacks import BaseCallback
+
+from rl_agent.utils.debug import TRACER, merge_span_stats
+
+
+class TraceLoggerCallback(BaseCallback):
+    """
+    Logs the timing spans of the training (see rl_agent.utils.debug.Tracer) to the SB3 logger.
+    The span histograms of all env processes and of the training process are merged and
+    recorded as 'trace/<span>/<statistic>' every 'log_freq' steps, then started anew.
+    Additionally times the forward pass of the policy during the rollouts as 'policy_forward'.
+
+    :param log_freq (int): number of calls between two recordings
+    :param chrome_trace_dir (str): when given, a Chrome trace per process is written to it at the end of training
+    :param verbose:
+    """
+
+    def __init__(
+        self,
+        log_freq: int = 2048,
+        chrome_trace_dir: Optional[str] = None,
+        verbose=0,
+    ):
+        super(TraceLoggerCallback, self).__init__(verbose=verbose)
+        self.log_freq = log_freq
+        self.chrome_trace_dir = chrome_trace_dir
+        self._hooks = []
+        self._forward_start = None
+
+    def _on_training_start(self) -> None:
+        if not TRACER.enabled:
+            return
+        self._hooks = [
+            self.model.policy.register_forward_pre_hook(self._start_forward),
+            self.model.policy.register_forward_hook(self._end_forward),
+        ]
+
+    def _start_forward(self, module, inputs):
+        self._forward_start = TRACER.now()
+
+    def _end_forward(self, module, inputs, outputs):
+        if self._forward_start is not None:
+            TRACER.record("policy_forward", self._forward_start, TRACER.now())
+            self._forward_start = None
+
+    def _on_step(self) -> bool:
+        if TRACER.enabled and self.n_calls % self.log_freq == 0:
+            self._record_stats()
+        return True
+
+    def _record_stats(self) -> None:
+        exports = self.training_env.env_method("get_trace", True)
+        exports.append(TRACER.export(reset=True))
+        for name, stats in merge_span_stats(exports).items():
+            for key, value in stats.items():
+                self.logger.record(f"trace/{name}/{key}", value)
+
+    def _on_training_end(self) -> None:
+        for hook in self._hooks:
+            hook.remove()
+        self._hooks = []
+
+        if not TRACER.enabled or self.chrome_trace_dir is None:
+            return
+        TRACER.dump_chrome_trace(os.path.join(self.chrome_trace_dir, "trainer.json"))
+        for i in range(self.training_env.num_envs):
+            self.training_env.env_method(
+                "dump_trace",
+                os.path.join(self.chrome_trace_dir, f"env_{i}.json"),
+                indices=[i],
+            )
+        if self.verbose > 0:
+            print(f"Wrote chrome traces to {self.chrome_trace_dir}")
@@ -1,11 +1,11 @@
-from typing import Union
+from typing import Dict, List, Tuple, Union
 
 import argparse
 from datetime import datetime as dt
 import gym
 import json
 import os
-import rosnode
+import rosgraph
 import rospkg
 import time
 import warnings
@@ -410,15 +410,29 @@ def make_envs(
 
 
 def wait_for_nodes(
-    with_ns: bool, n_envs: int, timeout: int = 30, nodes_per_ns: int = 3
+    with_ns: bool,
+    n_envs: int,
+    timeout: int = 30,
+    nodes_per_ns: int = 3,
+    services: Tuple[str, ...] = (),
+    topics: Tuple[str, ...] = (),
+    poll_interval: float = 0.5,
 ) -> None:
     """
-    Checks for timeout seconds if all nodes to corresponding namespace are online.
+    Waits until the simulations of all namespaces are ready, at most timeout seconds in total.
+
+    All namespaces are checked at once with a single query of the ROS master per poll.
+    A namespace is ready if it runs at least nodes_per_ns nodes, provides the given
+    services and the given topics have a publisher. Without services and topics only
+    the nodes are counted. Lagging namespaces are reported whenever their state changes.
 
     :param with_ns: (bool) if the system was initialized with namespaces
     :param n_envs: (int) number of virtual environments
-    :param timeout: (int) seconds to wait for each ns
+    :param timeout: (int) seconds to wait for all namespaces
     :param nodes_per_ns: (int) usual number of nodes per ns
+    :param services: (tuple) services every ns has to provide, relative to the ns
+    :param topics: (tuple) topics every ns has to publish, relative to the ns
+    :param poll_interval: (float) seconds between two queries of the master
     """
     if with_ns:
         assert (
@@ -429,23 +443,64 @@ def wait_for_nodes(
             not with_ns and n_envs == 1
         ), f"Simulation setup isn't compatible with the given number of envs"
 
-    for i in range(n_envs):
-        for k in range(timeout):
-            ns = "sim_" + str(i + 1) if with_ns else ""
-            namespaces = rosnode.get_node_names(namespace=ns)
+    namespaces = [f"sim_{i + 1}" for i in range(n_envs)] if with_ns else [""]
+    master = rosgraph.Master("/wait_for_nodes")
+    deadline = time.monotonic() + timeout
+    reported = None
 
-            if len(namespaces) >= nodes_per_ns:
-                break
+    while True:
+        try:
+            lagging = _lagging_namespaces(
+                master.getSystemState(), namespaces, nodes_per_ns, services, topics
+            )
+        except (OSError, rosgraph.MasterException) as e:
+            lagging = {ns: [f"master unreachable ({e})"] for ns in namespaces}
 
+        if not lagging:
+            return
+
+        report = ", ".join(
+            f"'{ns}' ({', '.join(missing)})" for ns, missing in lagging.items()
+        )
+        assert (
+            time.monotonic() < deadline
+        ), f"Timeout while waiting for the simulations of {report}"
+
+        if report != reported:
             warnings.warn(
-                f"Check if all simulation parts of namespace '{ns}' are running properly"
+                f"Waiting for {len(lagging)}/{len(namespaces)} simulations: {report}"
             )
-            warnings.warn(f"Trying to connect again..")
-            assert (
-                k < timeout - 1
-            ), f"Timeout while trying to connect to nodes of '{ns}'"
-
-            time.sleep(1)
+            reported = report
+        time.sleep(poll_interval)
+
+
+def _lagging_namespaces(
+    system_state: list,
+    namespaces: List[str],
+    nodes_per_ns: int,
+    services: Tuple[str, ...],
+    topics: Tuple[str, ...],
+) -> Dict[str, List[str]]:
+    """Returns the missing signals of each namespace which isn't ready yet, see wait_for_nodes."""
+    publishers, subscribers, provided = system_state
+    nodes = {
+        node for _, node_list in publishers + subscribers + provided for node in node_list
+    }
+    published = {topic for topic, node_list in publishers if node_list}
+    provided = {service for service, _ in provided}
+
+    lagging = {}
+    for ns in namespaces:
+        prefix = f"/{ns}/" if ns else "/"
+        missing = []
+        num_nodes = sum(node.startswith(prefix) for node in nodes)
+        if num_nodes < nodes_per_ns:
+            missing.append(f"{num_nodes}/{nodes_per_ns} nodes")
+        missing += [s for s in services if prefix + s not in provided]
+        missing += [t for t in topics if prefix + t not in published]
+        if missing:
+            lagging[ns] = missing
+    return lagging
 
 
 from stable_baselines3.common.vec_env import VecNormalize
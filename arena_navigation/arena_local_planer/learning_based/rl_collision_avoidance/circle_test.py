@@ -6,11 +6,11 @@ import torch.nn as nn
 from mpi4py import MPI
 
 from torch.optim import Adam
-from collections import deque
 
 from model.net import MLPPolicy, CNNPolicy
 from circle_world import StageWorld
-from model.ppo import generate_action_no_sampling, transform_buffer
+from model.ppo import generate_action_no_sampling_batch
+from model.utils import LaserStack, StepExchange
 
 
 
@@ -45,22 +45,26 @@ def enjoy(comm, env, policy, action_bound):
     step = 1
     terminal = False
 
+    obs_stack = LaserStack(LASER_HIST, OBS_SIZE)
+    exchange = StepExchange(comm, NUM_ENV, LASER_HIST, OBS_SIZE, ACT_SIZE)
     obs = env.get_laser_observation()
-    obs_stack = deque([obs, obs, obs])
+    obs_stack.reset(obs)
     goal = np.asarray(env.get_local_goal())
     speed = np.asarray(env.get_self_speed())
-    state = [obs_stack, goal, speed]
 
     while not rospy.is_shutdown():
-        state_list = comm.gather(state, root=0)
+        exchange.gather(obs_stack.frames, goal, speed)
 
         # generate actions at rank==0
-        mean, scaled_action =generate_action_no_sampling(env=env, state_list=state_list,
-                                               policy=policy, action_bound=action_bound)
+        if env.index == 0:
+            mean, scaled_action = generate_action_no_sampling_batch(policy, exchange.obss, exchange.goals,
+                                                                    exchange.speeds, action_bound)
+        else:
+            scaled_action = None
 
 
         # execute actions
-        real_action = comm.scatter(scaled_action, root=0)
+        real_action = exchange.scatter(scaled_action)
         if terminal == True:
             real_action[0] = 0
         env.control_vel(real_action)    
@@ -73,14 +77,9 @@ def enjoy(comm, env, policy, action_bound):
 
         # get next state
         s_next = env.get_laser_observation()
-        left = obs_stack.popleft()
-        obs_stack.append(s_next)
-        goal_next = np.asarray(env.get_local_goal())
-        speed_next = np.asarray(env.get_self_speed())
-        state_next = [obs_stack, goal_next, speed_next]
-
-
-        state = state_next
+        obs_stack.push(s_next)
+        goal = np.asarray(env.get_local_goal())
+        speed = np.asarray(env.get_self_speed())
 
 
 
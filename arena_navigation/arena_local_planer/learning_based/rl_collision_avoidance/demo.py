@@ -24,7 +24,7 @@ from collections import deque
 
 from model.net import MLPPolicy, CNNPolicy
 from circle_world import StageWorld
-from model.ppo import generate_action_no_sampling, transform_buffer
+from model.ppo import generate_action_no_sampling
 
 
 # Set parameters of env
@@ -1,11 +1,9 @@
 import torch
 import logging
 import os
-from torch.autograd import Variable
 from torch.nn import functional as F
 import numpy as np
 import socket
-from torch.utils.data.sampler import BatchSampler, SubsetRandomSampler
 
 hostname = socket.gethostname()
 if not os.path.exists('./log/' + hostname):
@@ -19,60 +17,65 @@ ppo_file_handler.setLevel(logging.INFO)
 logger_ppo.addHandler(ppo_file_handler)
 
 
-def transform_buffer(buff):
-    s_batch, goal_batch, speed_batch, a_batch, r_batch, d_batch, l_batch, \
-    v_batch = [], [], [], [], [], [], [], []
-    s_temp, goal_temp, speed_temp = [], [], []
-
-    for e in buff:
-        for state in e[0]:
-            s_temp.append(state[0])
-            goal_temp.append(state[1])
-            speed_temp.append(state[2])
-        s_batch.append(s_temp)
-        goal_batch.append(goal_temp)
-        speed_batch.append(speed_temp)
-        s_temp = []
-        goal_temp = []
-        speed_temp = []
-
-        a_batch.append(e[1])
-        r_batch.append(e[2])
-        d_batch.append(e[3])
-        l_batch.append(e[4])
-        v_batch.append(e[5])
-
-    s_batch = np.asarray(s_batch)
-    goal_batch = np.asarray(goal_batch)
-    speed_batch = np.asarray(speed_batch)
-    a_batch = np.asarray(a_batch)
-    r_batch = np.asarray(r_batch)
-    d_batch = np.asarray(d_batch)
-    l_batch = np.asarray(l_batch)
-    v_batch = np.asarray(v_batch)
-
-    return s_batch, goal_batch, speed_batch, a_batch, r_batch, d_batch, l_batch, v_batch
+class RolloutBuffer(object):
+    """preallocated (horizon, num_env, ...) storage for one PPO rollout
+
+    transitions are written in place on every step, so the update reads the
+    arrays directly instead of rebuilding them from per-step python lists.
+    """
+    def __init__(self, horizon, num_env, frames, obs_size, act_size):
+        self.horizon = horizon
+        self.num_env = num_env
+        self.obss = np.zeros((horizon, num_env, frames, obs_size), dtype=np.float32)
+        self.goals = np.zeros((horizon, num_env, 2), dtype=np.float32)
+        self.speeds = np.zeros((horizon, num_env, 2), dtype=np.float32)
+        self.actions = np.zeros((horizon, num_env, act_size), dtype=np.float32)
+        self.rewards = np.zeros((horizon, num_env), dtype=np.float32)
+        self.dones = np.zeros((horizon, num_env), dtype=np.float32)
+        self.logprobs = np.zeros((horizon, num_env, 1), dtype=np.float32)
+        self.values = np.zeros((horizon, num_env, 1), dtype=np.float32)
+        self.step = 0
+
+    @property
+    def full(self):
+        return self.step >= self.horizon
+
+    def insert(self, obss, goals, speeds, a, logprob, v):
+        """writes the state and policy output of the current step"""
+        t = self.step
+        self.obss[t] = obss
+        self.goals[t] = goals
+        self.speeds[t] = speeds
+        self.actions[t] = a
+        self.logprobs[t] = logprob
+        self.values[t] = v
+
+    def insert_outcome(self, r_list, terminal_list):
+        """writes reward and terminal of the current step and moves to the next one"""
+        t = self.step
+        self.rewards[t] = r_list
+        self.dones[t] = terminal_list
+        self.step += 1
+
+    def get_memory(self, last_value, gamma, lam):
+        """returns the memory tuple expected by ppo_update_stage1/2"""
+        targets, advs = generate_train_data(rewards=self.rewards, gamma=gamma, values=self.values,
+                                            last_value=last_value, dones=self.dones, lam=lam)
+        return (self.obss, self.goals, self.speeds, self.actions, self.logprobs, targets,
+                self.values, self.rewards, advs)
+
+    def clear(self):
+        self.step = 0
+
+
+def get_policy_device(policy):
+    return next(policy.parameters()).device
 
 
 def generate_action(env, state_list, policy, action_bound):
     if env.index == 0:
-        s_list, goal_list, speed_list = [], [], []
-        for i in state_list:
-            s_list.append(i[0])
-            goal_list.append(i[1])
-            speed_list.append(i[2])
-
-        s_list = np.asarray(s_list)
-        goal_list = np.asarray(goal_list)
-        speed_list = np.asarray(speed_list)
-
-        s_list = Variable(torch.from_numpy(s_list)).float().cuda()
-        goal_list = Variable(torch.from_numpy(goal_list)).float().cuda()
-        speed_list = Variable(torch.from_numpy(speed_list)).float().cuda()
-
-        v, a, logprob, mean = policy(s_list, goal_list, speed_list)
-        v, a, logprob = v.data.cpu().numpy(), a.data.cpu().numpy(), logprob.data.cpu().numpy()
-        scaled_action = np.clip(a, a_min=action_bound[0], a_max=action_bound[1])
+        s_list, goal_list, speed_list = stack_state_list(state_list)
+        v, a, logprob, scaled_action = generate_action_batch(policy, s_list, goal_list, speed_list, action_bound)
     else:
         v = None
         a = None
@@ -83,23 +86,8 @@ def generate_action(env, state_list, policy, action_bound):
 
 def generate_action_no_sampling(env, state_list, policy, action_bound):
     if env.index == 0:
-        s_list, goal_list, speed_list = [], [], []
-        for i in state_list:
-            s_list.append(i[0])
-            goal_list.append(i[1])
-            speed_list.append(i[2])
-
-        s_list = np.asarray(s_list)
-        goal_list = np.asarray(goal_list)
-        speed_list = np.asarray(speed_list)
-
-        s_list = Variable(torch.from_numpy(s_list)).float().cpu()    #changed original .cuda() 
-        goal_list = Variable(torch.from_numpy(goal_list)).float().cpu()
-        speed_list = Variable(torch.from_numpy(speed_list)).float().cpu()
-
-        _, _, _, mean = policy(s_list, goal_list, speed_list)
-        mean = mean.data.cpu().numpy()
-        scaled_action = np.clip(mean, a_min=action_bound[0], a_max=action_bound[1])
+        s_list, goal_list, speed_list = stack_state_list(state_list)
+        mean, scaled_action = generate_action_no_sampling_batch(policy, s_list, goal_list, speed_list, action_bound)
     else:
         mean = None
         scaled_action = None
@@ -107,6 +95,43 @@ def generate_action_no_sampling(env, state_list, policy, action_bound):
     return mean, scaled_action
 
 
+def stack_state_list(state_list):
+    s_list, goal_list, speed_list = [], [], []
+    for i in state_list:
+        s_list.append(i[0])
+        goal_list.append(i[1])
+        speed_list.append(i[2])
+    return np.asarray(s_list), np.asarray(goal_list), np.asarray(speed_list)
+
+
+def generate_action_batch(policy, s_list, goal_list, speed_list, action_bound):
+    """samples actions for already stacked (num_env, ...) observation arrays"""
+    device = get_policy_device(policy)
+    s_list = torch.from_numpy(s_list).float().to(device)
+    goal_list = torch.from_numpy(goal_list).float().to(device)
+    speed_list = torch.from_numpy(speed_list).float().to(device)
+
+    with torch.no_grad():
+        v, a, logprob, mean = policy(s_list, goal_list, speed_list)
+    v, a, logprob = v.cpu().numpy(), a.cpu().numpy(), logprob.cpu().numpy()
+    scaled_action = np.clip(a, a_min=action_bound[0], a_max=action_bound[1])
+    return v, a, logprob, scaled_action
+
+
+def generate_action_no_sampling_batch(policy, s_list, goal_list, speed_list, action_bound):
+    """returns the mean actions for already stacked (num_env, ...) observation arrays"""
+    device = get_policy_device(policy)
+    s_list = torch.from_numpy(s_list).float().to(device)
+    goal_list = torch.from_numpy(goal_list).float().to(device)
+    speed_list = torch.from_numpy(speed_list).float().to(device)
+
+    with torch.no_grad():
+        _, _, _, mean = policy(s_list, goal_list, speed_list)
+    mean = mean.cpu().numpy()
+    scaled_action = np.clip(mean, a_min=action_bound[0], a_max=action_bound[1])
+    return mean, scaled_action
+
+
 
 def calculate_returns(rewards, dones, last_value, values, gamma=0.99):
     num_step = rewards.shape[0]
@@ -122,79 +147,94 @@ def calculate_returns(rewards, dones, last_value, values, gamma=0.99):
 def generate_train_data(rewards, gamma, values, last_value, dones, lam):
     num_step = rewards.shape[0]
     num_env = rewards.shape[1]
-    values = list(values)
-    values.append(last_value)
-    values = np.asarray(values).reshape((num_step+1,num_env))
-
-    targets = np.zeros((num_step, num_env))
-    gae = np.zeros((num_env,))
-
+    values = np.concatenate((np.reshape(values, (num_step, num_env)),
+                             np.reshape(last_value, (1, num_env))), axis=0)
+    not_dones = 1 - dones
+
+    # one-step td errors for the whole rollout at once, then the gae recursion
+    # runs backwards in time over all envs in parallel
+    deltas = rewards + gamma * values[1:] * not_dones - values[:-1]
+    advs = np.zeros((num_step, num_env), dtype=deltas.dtype)
+    gae = np.zeros((num_env,), dtype=deltas.dtype)
     for t in range(num_step - 1, -1, -1):
-        delta = rewards[t, :] + gamma * values[t + 1, :] * (1 - dones[t, :]) - values[t, :]
-        gae = delta + gamma * lam * (1 - dones[t, :]) * gae
-
-        targets[t, :] = gae + values[t, :]
+        gae = deltas[t] + gamma * lam * not_dones[t] * gae
+        advs[t] = gae
 
-    advs = targets - values[:-1, :]
+    targets = advs + values[:-1]
     return targets, advs
 
 
 
-def ppo_update_stage1(policy, optimizer, batch_size, memory, epoch,
-               coeff_entropy=0.02, clip_value=0.2,
-               num_step=2048, num_env=12, frames=1, obs_size=24, act_size=4):
-    obss, goals, speeds, actions, logprobs, targets, values, rewards, advs = memory
+def memory_to_device(arrays, device):
+    """moves the flattened rollout arrays to the training device in one go
 
-    advs = (advs - advs.mean()) / advs.std()
+    on cuda the host arrays are staged through pinned memory so the copies
+    can run asynchronously.
+    """
+    tensors = []
+    for array in arrays:
+        tensor = torch.from_numpy(np.ascontiguousarray(array, dtype=np.float32))
+        if device.type == 'cuda':
+            tensor = tensor.pin_memory().to(device, non_blocking=True)
+        else:
+            tensor = tensor.to(device)
+        tensors.append(tensor)
+    return tensors
 
-    obss = obss.reshape((num_step*num_env, frames, obs_size))
-    goals = goals.reshape((num_step*num_env, 2))
-    speeds = speeds.reshape((num_step*num_env, 2))
-    actions = actions.reshape(num_step*num_env, act_size)
-    logprobs = logprobs.reshape(num_step*num_env, 1)
-    advs = advs.reshape(num_step*num_env, 1)
-    targets = targets.reshape(num_step*num_env, 1)
 
-    for update in range(epoch):
-        sampler = BatchSampler(SubsetRandomSampler(list(range(advs.shape[0]))), batch_size=batch_size,
-                               drop_last=False)
-        for i, index in enumerate(sampler):
-            sampled_obs = Variable(torch.from_numpy(obss[index])).float().cuda()
-            sampled_goals = Variable(torch.from_numpy(goals[index])).float().cuda()
-            sampled_speeds = Variable(torch.from_numpy(speeds[index])).float().cuda()
+def ppo_update(policy, optimizer, batch_size, memory, epoch, coeff_entropy, clip_value, drop_last):
+    """runs the ppo epochs over device resident (obs, goal, speed, action, logprob, target, adv) tensors
 
-            sampled_actions = Variable(torch.from_numpy(actions[index])).float().cuda()
-            sampled_logprobs = Variable(torch.from_numpy(logprobs[index])).float().cuda()
-            sampled_targets = Variable(torch.from_numpy(targets[index])).float().cuda()
-            sampled_advs = Variable(torch.from_numpy(advs[index])).float().cuda()
+    minibatches are sampled on the device and the losses are only synced to
+    the host once per epoch for logging.
+    """
+    obss, goals, speeds, actions, logprobs, targets, advs = memory
+    device = obss.device
+    num_samples = advs.shape[0]
 
+    for update in range(epoch):
+        permutation = torch.randperm(num_samples, device=device)
+        info_p_loss = torch.zeros((), device=device)
+        info_v_loss = torch.zeros((), device=device)
+        info_entropy = torch.zeros((), device=device)
+        num_batches = 0
+        for index in torch.split(permutation, batch_size):
+            if drop_last and index.shape[0] < batch_size:
+                break
+            sampled_obs = obss[index]
+            sampled_goals = goals[index]
+            sampled_speeds = speeds[index]
+            sampled_actions = actions[index]
+            sampled_logprobs = logprobs[index]
+            sampled_targets = targets[index]
+            sampled_advs = advs[index]
 
             new_value, new_logprob, dist_entropy = policy.evaluate_actions(sampled_obs, sampled_goals, sampled_speeds, sampled_actions)
 
-            sampled_logprobs = sampled_logprobs.view(-1, 1)
             ratio = torch.exp(new_logprob - sampled_logprobs)
 
-            sampled_advs = sampled_advs.view(-1, 1)
             surrogate1 = ratio * sampled_advs
             surrogate2 = torch.clamp(ratio, 1 - clip_value, 1 + clip_value) * sampled_advs
             policy_loss = -torch.min(surrogate1, surrogate2).mean()
 
-            sampled_targets = sampled_targets.view(-1, 1)
             value_loss = F.mse_loss(new_value, sampled_targets)
 
             loss = policy_loss + 20 * value_loss - coeff_entropy * dist_entropy
             optimizer.zero_grad()
             loss.backward()
             optimizer.step()
-            info_p_loss, info_v_loss, info_entropy = float(policy_loss.detach().cpu().numpy()), \
-                                                     float(value_loss.detach().cpu().numpy()), float(
-                                                    dist_entropy.detach().cpu().numpy())
-            logger_ppo.info('{}, {}, {}'.format(info_p_loss, info_v_loss, info_entropy))
 
-    print('update')
+            info_p_loss += policy_loss.detach()
+            info_v_loss += value_loss.detach()
+            info_entropy += dist_entropy.detach()
+            num_batches += 1
 
+        if num_batches > 0:
+            info = torch.stack((info_p_loss, info_v_loss, info_entropy)) / num_batches
+            logger_ppo.info('{}, {}, {}'.format(*info.cpu().tolist()))
 
-def ppo_update_stage2(policy, optimizer, batch_size, memory, filter_index, epoch,
+
+def ppo_update_stage1(policy, optimizer, batch_size, memory, epoch,
                coeff_entropy=0.02, clip_value=0.2,
                num_step=2048, num_env=12, frames=1, obs_size=24, act_size=4):
     obss, goals, speeds, actions, logprobs, targets, values, rewards, advs = memory
@@ -209,54 +249,33 @@ def ppo_update_stage2(policy, optimizer, batch_size, memory, filter_index, epoch
     advs = advs.reshape(num_step*num_env, 1)
     targets = targets.reshape(num_step*num_env, 1)
 
-    obss = np.delete(obss, filter_index, 0)
-    goals = np.delete(goals, filter_index, 0)
-    speeds = np.delete(speeds, filter_index, 0)
-    actions = np.delete(actions, filter_index, 0)
-    logprobs  = np.delete(logprobs, filter_index, 0)
-    advs = np.delete(advs, filter_index, 0)
-    targets = np.delete(targets, filter_index, 0)
-
-
-    for update in range(epoch):
-        sampler = BatchSampler(SubsetRandomSampler(list(range(advs.shape[0]))), batch_size=batch_size,
-                               drop_last=True)
-        for i, index in enumerate(sampler):
-            sampled_obs = Variable(torch.from_numpy(obss[index])).float().cuda()
-            sampled_goals = Variable(torch.from_numpy(goals[index])).float().cuda()
-            sampled_speeds = Variable(torch.from_numpy(speeds[index])).float().cuda()
-
-            sampled_actions = Variable(torch.from_numpy(actions[index])).float().cuda()
-            sampled_logprobs = Variable(torch.from_numpy(logprobs[index])).float().cuda()
-            sampled_targets = Variable(torch.from_numpy(targets[index])).float().cuda()
-            sampled_advs = Variable(torch.from_numpy(advs[index])).float().cuda()
+    memory = memory_to_device((obss, goals, speeds, actions, logprobs, targets, advs),
+                              get_policy_device(policy))
+    ppo_update(policy, optimizer, batch_size, memory, epoch, coeff_entropy, clip_value, drop_last=False)
 
+    print('update')
 
-            new_value, new_logprob, dist_entropy = policy.evaluate_actions(sampled_obs, sampled_goals, sampled_speeds, sampled_actions)
 
-            sampled_logprobs = sampled_logprobs.view(-1, 1)
-            ratio = torch.exp(new_logprob - sampled_logprobs)
-
-            sampled_advs = sampled_advs.view(-1, 1)
-            surrogate1 = ratio * sampled_advs
-            surrogate2 = torch.clamp(ratio, 1 - clip_value, 1 + clip_value) * sampled_advs
-            policy_loss = -torch.min(surrogate1, surrogate2).mean()
+def ppo_update_stage2(policy, optimizer, batch_size, memory, filter_index, epoch,
+               coeff_entropy=0.02, clip_value=0.2,
+               num_step=2048, num_env=12, frames=1, obs_size=24, act_size=4):
+    obss, goals, speeds, actions, logprobs, targets, values, rewards, advs = memory
 
-            sampled_targets = sampled_targets.view(-1, 1)
-            value_loss = F.mse_loss(new_value, sampled_targets)
+    advs = (advs - advs.mean()) / advs.std()
 
-            loss = policy_loss + 20 * value_loss - coeff_entropy * dist_entropy
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
-            info_p_loss, info_v_loss, info_entropy = float(policy_loss.detach().cpu().numpy()), \
-                                                     float(value_loss.detach().cpu().numpy()), float(
-                                                    dist_entropy.detach().cpu().numpy())
-            logger_ppo.info('{}, {}, {}'.format(info_p_loss, info_v_loss, info_entropy))
+    obss = obss.reshape((num_step*num_env, frames, obs_size))
+    goals = goals.reshape((num_step*num_env, 2))
+    speeds = speeds.reshape((num_step*num_env, 2))
+    actions = actions.reshape(num_step*num_env, act_size)
+    logprobs = logprobs.reshape(num_step*num_env, 1)
+    advs = advs.reshape(num_step*num_env, 1)
+    targets = targets.reshape(num_step*num_env, 1)
 
+    keep = np.ones(num_step*num_env, dtype=bool)
+    keep[filter_index] = False
 
+    memory = memory_to_device((obss[keep], goals[keep], speeds[keep], actions[keep], logprobs[keep],
+                               targets[keep], advs[keep]), get_policy_device(policy))
+    ppo_update(policy, optimizer, batch_size, memory, epoch, coeff_entropy, clip_value, drop_last=True)
 
     print('filter {} transitions; update'.format(len(filter_index)))
-
-
-
@@ -1,5 +1,6 @@
 import numpy as np
 import bisect
+import functools
 import torch
 from torch.autograd import Variable
 
@@ -82,11 +83,144 @@ def get_group_terminal(terminal_list, index):
     group_terminal = False
     refer = [0, 6, 10, 15, 19, 24, 34, 44]
     r = bisect.bisect(refer, index)
-    if reduce(lambda x, y: x * y, terminal_list[refer[r-1]:refer[r]]) == 1:
+    if functools.reduce(lambda x, y: x * y, terminal_list[refer[r-1]:refer[r]]) == 1:
         group_terminal = True
     return group_terminal
 
 
+@functools.lru_cache(maxsize=None)
+def get_sparse_laser_index(raw_beam_num, sparse_beam_num, angle_offset=0.):
+    """returns the raw beam indices picked for each sparse beam
+
+    the first half walks forward from the first beam, the second half walks
+    backward from the last one. angle_offset (rad) rotates a full-circle scan
+    so that e.g. a scan starting at -pi/2 is read as one starting at -pi.
+    """
+    step = float(raw_beam_num) / sparse_beam_num
+    sparse_index_left = []
+    index = 0.
+    for x in range(int(sparse_beam_num / 2)):
+        sparse_index_left.append(int(index))
+        index += step
+    sparse_index_right = []
+    index = raw_beam_num - 1.
+    for x in range(int(sparse_beam_num / 2)):
+        sparse_index_right.append(int(index))
+        index -= step
+    sparse_index = np.asarray(sparse_index_left + sparse_index_right[::-1], dtype=np.intp)
+
+    shift = int(round(angle_offset / (2 * np.pi) * raw_beam_num))
+    if shift != 0:
+        sparse_index = (sparse_index - shift) % raw_beam_num
+    sparse_index.setflags(write=False)
+    return sparse_index
+
+
+def sparsify_laser_scan(scan, sparse_beam_num, angle_offset=0., max_range=6.0, out=None):
+    """sparsifies, reorders and normalizes a raw scan to [-0.5, 0.5]
+
+    the index map is cached per (raw_beam_num, sparse_beam_num, angle_offset),
+    so this is a single gather. pass out to reuse a preallocated buffer.
+    """
+    scan = np.asarray(scan)
+    index = get_sparse_laser_index(len(scan), sparse_beam_num, angle_offset)
+    if out is None:
+        out = np.empty(len(index), dtype=np.float64)
+    np.take(scan, index, out=out)
+    np.nan_to_num(out, copy=False, nan=max_range, posinf=max_range, neginf=max_range)
+    out *= 1. / max_range
+    out -= 0.5
+    return out
+
+
+class LaserStack(object):
+    """fixed-shape history of the last frames laser scans, oldest first
+
+    every frame is written twice into a (2 * frames, beams) float32 buffer, so
+    the ordered history is always one contiguous slice and push is in place.
+    """
+    def __init__(self, frames, beams):
+        self.num_frames = frames
+        self.num_beams = beams
+        self._buffer = np.zeros((2 * frames, beams), dtype=np.float32)
+        self._head = 0
+
+    def reset(self, scan):
+        """fills the whole history with scan"""
+        self._buffer[:] = scan
+        self._head = 0
+
+    def push(self, scan):
+        """drops the oldest frame and appends scan as the newest one"""
+        self._buffer[self._head] = scan
+        self._buffer[self._head + self.num_frames] = scan
+        self._head = (self._head + 1) % self.num_frames
+
+    @property
+    def frames(self):
+        """contiguous (frames, beams) view, only valid until the next push"""
+        return self._buffer[self._head:self._head + self.num_frames]
+
+
+class StepExchange(object):
+    """buffer based per-step MPI exchange between the env ranks and the policy rank
+
+    each rank packs [laser stack | goal | speed | reward | terminal] into one
+    float32 record, so a single Gather hands the root (num_env, ...) views of
+    the state of this step together with the outcome of the previous one.
+    actions come back through a single Scatter.
+    """
+    def __init__(self, comm, num_env, frames, obs_size, act_size=2, root=0):
+        self.comm = comm
+        self.root = root
+        self.is_root = comm.Get_rank() == root
+        obs_len = frames * obs_size
+        record_size = obs_len + 2 + 2 + 2
+
+        self.send = np.zeros(record_size, dtype=np.float32)
+        self.obs = self.send[:obs_len].reshape(frames, obs_size)
+        self.goal = self.send[obs_len:obs_len + 2]
+        self.speed = self.send[obs_len + 2:obs_len + 4]
+        self.outcome = self.send[obs_len + 4:]
+        self.action = np.zeros(act_size, dtype=np.float32)
+        self.terminal = np.zeros(1, dtype=np.int8)
+        self.all_terminals = np.zeros(num_env, dtype=np.int8)
+
+        if self.is_root:
+            self.recv = np.zeros((num_env, record_size), dtype=np.float32)
+            self.obss = self.recv[:, :obs_len].reshape(num_env, frames, obs_size)
+            self.goals = self.recv[:, obs_len:obs_len + 2]
+            self.speeds = self.recv[:, obs_len + 2:obs_len + 4]
+            self.rewards = self.recv[:, obs_len + 4]
+            self.terminals = self.recv[:, obs_len + 5]
+            self.actions = np.zeros((num_env, act_size), dtype=np.float32)
+        else:
+            self.recv = None
+            self.actions = None
+
+    def gather(self, obs, goal, speed, reward=0., terminal=False):
+        """sends this step's state and the previous step's reward and terminal to the root"""
+        self.obs[:] = obs
+        self.goal[:] = goal
+        self.speed[:] = speed
+        self.outcome[0] = reward
+        self.outcome[1] = terminal
+        self.comm.Gather(self.send, self.recv, root=self.root)
+
+    def scatter(self, actions=None):
+        """distributes the (num_env, act_size) actions of the root, returns this rank's one"""
+        if self.is_root:
+            self.actions[:] = actions
+        self.comm.Scatter(self.actions, self.action, root=self.root)
+        return self.action
+
+    def allgather_terminal(self, terminal):
+        """shares this step's terminal flag with every rank, returns all of them"""
+        self.terminal[0] = terminal
+        self.comm.Allgather(self.terminal, self.all_terminals)
+        return self.all_terminals
+
+
 def log_normal_density(x, mean, log_std, std):
     """returns guassian density given x on log scale"""
 
@@ -9,14 +9,12 @@ import torch.nn as nn
 from mpi4py import MPI
 
 from torch.optim import Adam
-from torch.autograd import Variable
-from collections import deque
 
 from model.net import MLPPolicy, CNNPolicy
 from stage_world2 import StageWorld
-from model.ppo import ppo_update_stage2, generate_train_data
-from model.ppo import generate_action, transform_buffer
-from model.utils import get_group_terminal, get_filter_index
+from model.ppo import ppo_update_stage2, RolloutBuffer
+from model.ppo import generate_action_batch
+from model.utils import get_group_terminal, get_filter_index, LaserStack, StepExchange
 
 
 MAX_EPISODES = 5000
@@ -38,9 +36,15 @@ LEARNING_RATE = 5e-5
 
 def run(comm, env, policy, policy_path, action_bound, optimizer):
     rate = rospy.Rate(40)
-    buff = []
+    exchange = StepExchange(comm, NUM_ENV, LASER_HIST, OBS_SIZE, ACT_SIZE)
+    if env.index == 0:
+        rollout = RolloutBuffer(HORIZON, NUM_ENV, LASER_HIST, OBS_SIZE, ACT_SIZE)
+        pending = False
     global_update = 0
     global_step = 0
+    obs_stack = LaserStack(LASER_HIST, OBS_SIZE)
+    # reward and terminal of a step are sent together with the next state
+    last_r, last_terminal = 0., False
 
     if env.index == 0:
         env.reset_world()
@@ -56,19 +60,40 @@ def run(comm, env, policy, policy_path, action_bound, optimizer):
         step = 1
 
         obs = env.get_laser_observation()
-        obs_stack = deque([obs, obs, obs])
+        obs_stack.reset(obs)
         goal = np.asarray(env.get_local_goal())
         speed = np.asarray(env.get_self_speed())
-        state = [obs_stack, goal, speed]
 
         while not group_terminal and not rospy.is_shutdown():
-            state_list = comm.gather(state, root=0)
+            exchange.gather(obs_stack.frames, goal, speed, last_r, last_terminal)
+
+            # add transitons in rollout, update policy and generate actions at rank==0
+            if env.index == 0:
+                if pending:
+                    rollout.insert_outcome(exchange.rewards, exchange.terminals)
+                if rollout.full:
+                    last_v, _, _, _ = generate_action_batch(policy, exchange.obss, exchange.goals, exchange.speeds,
+                                                            action_bound)
+                    filter_index = get_filter_index(rollout.dones)
+                    # print len(filter_index)
+                    memory = rollout.get_memory(last_value=last_v, gamma=GAMMA, lam=LAMDA)
+                    ppo_update_stage2(policy=policy, optimizer=optimizer, batch_size=BATCH_SIZE, memory=memory, filter_index=filter_index,
+                                            epoch=EPOCH, coeff_entropy=COEFF_ENTROPY, clip_value=CLIP_VALUE, num_step=HORIZON,
+                                            num_env=NUM_ENV, frames=LASER_HIST,
+                                            obs_size=OBS_SIZE, act_size=ACT_SIZE)
+
+                    rollout.clear()
+                    global_update += 1
+
+                v, a, logprob, scaled_action = generate_action_batch(policy, exchange.obss, exchange.goals,
+                                                                     exchange.speeds, action_bound)
+                rollout.insert(exchange.obss, exchange.goals, exchange.speeds, a, logprob, v)
+                pending = True
+            else:
+                scaled_action = None
 
-            # generate actions at rank==0
-            v, a, logprob, scaled_action=generate_action(env=env, state_list=state_list,
-                                                         policy=policy, action_bound=action_bound)
             # execute actions
-            real_action = comm.scatter(scaled_action, root=0)
+            real_action = exchange.scatter(scaled_action)
             if liveflag == True:
                 env.control_vel(real_action)
                 # rate.sleep()
@@ -84,46 +109,16 @@ def run(comm, env, policy, policy_path, action_bound, optimizer):
                 liveflag = False
 
             global_step += 1
+            last_r, last_terminal = r, terminal
 
             # get next state
             s_next = env.get_laser_observation()
-            left = obs_stack.popleft()
-            obs_stack.append(s_next)
-            goal_next = np.asarray(env.get_local_goal())
-            speed_next = np.asarray(env.get_self_speed())
-            state_next = [obs_stack, goal_next, speed_next]
-
-
-            if global_step % HORIZON == 0:
-                state_next_list = comm.gather(state_next, root=0)
-                last_v, _, _, _ = generate_action(env=env, state_list=state_next_list, policy=policy,
-                                                               action_bound=action_bound)
-            # add transitons in buff and update policy
-            r_list = comm.gather(r, root=0)
-            terminal_list = comm.gather(terminal, root=0)
-
-            terminal_list = comm.bcast(terminal_list, root=0)
-            group_terminal = get_group_terminal(terminal_list, env.index)
-            if env.index == 0:
-                buff.append((state_list, a, r_list, terminal_list, logprob, v))
-                if len(buff) > HORIZON - 1:
-                    s_batch, goal_batch, speed_batch, a_batch, r_batch, d_batch, l_batch, v_batch = \
-                        transform_buffer(buff=buff)
-                    filter_index = get_filter_index(d_batch)
-                    # print len(filter_index)
-                    t_batch, advs_batch = generate_train_data(rewards=r_batch, gamma=GAMMA, values=v_batch,
-                                                              last_value=last_v, dones=d_batch, lam=LAMDA)
-                    memory = (s_batch, goal_batch, speed_batch, a_batch, l_batch, t_batch, v_batch, r_batch, advs_batch)
-                    ppo_update_stage2(policy=policy, optimizer=optimizer, batch_size=BATCH_SIZE, memory=memory, filter_index=filter_index,
-                                            epoch=EPOCH, coeff_entropy=COEFF_ENTROPY, clip_value=CLIP_VALUE, num_step=HORIZON,
-                                            num_env=NUM_ENV, frames=LASER_HIST,
-                                            obs_size=OBS_SIZE, act_size=ACT_SIZE)
-
-                    buff = []
-                    global_update += 1
+            obs_stack.push(s_next)
+            goal = np.asarray(env.get_local_goal())
+            speed = np.asarray(env.get_self_speed())
 
-
-            state = state_next
+            terminal_list = exchange.allgather_terminal(terminal)
+            group_terminal = get_group_terminal(terminal_list, env.index)
 
 
 
@@ -184,7 +179,8 @@ if __name__ == '__main__':
         policy_path = 'policy'
         # policy = MLPPolicy(obs_size, act_size)
         policy = CNNPolicy(frames=LASER_HIST, action_space=2)
-        policy.cuda()
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        policy.to(device)
         opt = Adam(policy.parameters(), lr=LEARNING_RATE)
         mse = nn.MSELoss()
 
@@ -196,7 +192,7 @@ if __name__ == '__main__':
             logger.info('####################################')
             logger.info('############Loading Model###########')
             logger.info('####################################')
-            state_dict = torch.load(file)
+            state_dict = torch.load(file, map_location=device)
             policy.load_state_dict(state_dict)
         else:
             logger.info('#####################################')
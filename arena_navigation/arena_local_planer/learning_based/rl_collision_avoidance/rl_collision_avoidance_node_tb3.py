@@ -18,11 +18,11 @@ import torch.nn as nn
 from mpi4py import MPI
 
 from torch.optim import Adam
-from collections import deque
 
 from model.net import MLPPolicy, CNNPolicy
 from circle_world import StageWorld
-from model.ppo import generate_action_no_sampling, transform_buffer
+from model.ppo import generate_action_no_sampling
+from model.utils import sparsify_laser_scan, LaserStack
 
 # for stage world
 from sensor_msgs.msg import LaserScan
@@ -30,10 +30,14 @@ import tf
 import copy
 
 class NN_tb3():
-    def __init__(self, env, policy, action_bound, OBS_SIZE, index, num_env):
+    def __init__(self, env, policy, action_bound, OBS_SIZE, index, num_env, LASER_HIST=3):
         self.beam_mum = OBS_SIZE
         self.laser_cb_num = 0
         self.scan = None
+        self.sparse_scan = np.empty(OBS_SIZE)
+        # laser history kept across control ticks, filled on the first one
+        self.obs_stack = LaserStack(LASER_HIST, OBS_SIZE)
+        self.obs_stack_ready = False
         self.env = env
         self.env.index = 0
   
@@ -159,27 +163,8 @@ class NN_tb3():
         self.laser_cb_num += 1
 
     def get_laser_observation(self):
-        scan = copy.deepcopy(self.scan)
-        sub_array = np.hsplit(scan,4)  #adapt scan info when min and max angel equal to [-1.57,4.69] (rlca is [-3.14,3.14])
-        scan = np.concatenate((sub_array[3],sub_array[0],sub_array[1],sub_array[2]))   #adapt scan info when min and max angel equal to [-1.57,4.69] (rlca is [-3.14,3.14])
-
-        scan[np.isnan(scan)] = 6.0
-        scan[np.isinf(scan)] = 6.0
-        raw_beam_num = len(scan)
-        sparse_beam_num = self.beam_mum
-        step = float(raw_beam_num) / sparse_beam_num
-        sparse_scan_left = []
-        index = 0.
-        for x in range(int(sparse_beam_num / 2)):
-            sparse_scan_left.append(scan[int(index)])
-            index += step
-        sparse_scan_right = []
-        index = raw_beam_num - 1.
-        for x in range(int(sparse_beam_num / 2)):
-            sparse_scan_right.append(scan[int(index)])
-            index -= step
-        scan_sparse = np.concatenate((sparse_scan_left, sparse_scan_right[::-1]), axis=0)
-        return scan_sparse / 6.0 - 0.5
+        # adapt scan info when min and max angle equal to [-1.57,4.69] (rlca is [-3.14,3.14])
+        return sparsify_laser_scan(self.scan, self.beam_mum, angle_offset=np.pi / 2, out=self.sparse_scan)
 
     def control_vel(self, action):
         move_cmd = Twist()
@@ -216,13 +201,17 @@ class NN_tb3():
         while self.scan is None or self.sub_goal.x is None:
             pass
         # ************************************ Inpsut ************************************
-        obs = self.get_laser_observation() 
-        obs_stack = deque([obs, obs, obs])
+        obs = self.get_laser_observation()
+        if self.obs_stack_ready:
+            self.obs_stack.push(obs)
+        else:
+            self.obs_stack.reset(obs)
+            self.obs_stack_ready = True
         self.state = [self.pose.pose.position.x, self.pose.pose.position.y, self.psi]    # x, y, theta
         self.goal = np.asarray(self.get_local_goal()) 
         self.speed = np.asarray([self.vel.x, self.vel_angular],dtype='float64')
         
-        obs_state_list = [[obs_stack, self.goal, self.speed]]
+        obs_state_list = [[self.obs_stack.frames, self.goal, self.speed]]
         # self.control_pose(state)
 
         # ************************************ Output ************************************
@@ -287,7 +276,7 @@ def run():
     rospy.init_node('rl_collision_avoidance_tb3',anonymous=False)
     print('==================================\nrl_collision_avoidance node started')
 
-    nn_tb3 = NN_tb3(env, policy, action_bound, OBS_SIZE, index=0, num_env=NUM_ENV)
+    nn_tb3 = NN_tb3(env, policy, action_bound, OBS_SIZE, index=0, num_env=NUM_ENV, LASER_HIST=LASER_HIST)
     rospy.on_shutdown(nn_tb3.on_shutdown)
 
     rospy.spin()
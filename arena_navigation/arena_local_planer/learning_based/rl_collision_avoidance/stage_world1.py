@@ -11,6 +11,7 @@ from sensor_msgs.msg import LaserScan
 from rosgraph_msgs.msg import Clock
 from std_srvs.srv import Empty
 from std_msgs.msg import Int8
+from model.utils import sparsify_laser_scan
 
 
 class StageWorld():
@@ -120,24 +121,7 @@ class StageWorld():
         return self.speed_GT
 
     def get_laser_observation(self):
-        scan = copy.deepcopy(self.scan)
-        scan[np.isnan(scan)] = 6.0
-        scan[np.isinf(scan)] = 6.0
-        raw_beam_num = len(scan)
-        sparse_beam_num = self.beam_mum
-        step = float(raw_beam_num) / sparse_beam_num
-        sparse_scan_left = []
-        index = 0.
-        for x in range(int(sparse_beam_num / 2)):
-            sparse_scan_left.append(scan[int(index)])
-            index += step
-        sparse_scan_right = []
-        index = raw_beam_num - 1.
-        for x in range(int(sparse_beam_num / 2)):
-            sparse_scan_right.append(scan[int(index)])
-            index -= step
-        scan_sparse = np.concatenate((sparse_scan_left, sparse_scan_right[::-1]), axis=0)
-        return scan_sparse / 6.0 - 0.5
+        return sparsify_laser_scan(self.scan, self.beam_mum)
 
 
     def get_self_speed(self):
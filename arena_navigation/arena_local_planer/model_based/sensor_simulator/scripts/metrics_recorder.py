@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+import csv
+import math
+import os
+import threading
+
+import numpy as np
+import rospy
+from rospy.numpy_msg import numpy_msg
+from sensor_msgs.msg import LaserScan
+from std_msgs.msg import Int16
+from nav_msgs.msg import Path, Odometry
+from geometry_msgs.msg import PoseStamped
+
+FIELDS = [
+    "episode", "collisions", "min_clearance", "mean_clearance", "path_length",
+    "time", "time_to_goal", "goal_reached", "replans",
+]
+
+
+class EpisodeStats():
+    """Metrics of one episode, updated incrementally from the robot's scans, odometry and plans.
+
+    A collision is counted when the closest scan range falls to 'collision_dist' and
+    released once it rises above 'release_dist' again.
+    """
+
+    def __init__(self, episode, collision_dist=0.35, release_dist=0.5, goal_radius=0.3, goal=None):
+        self.episode = episode
+        self.collision_dist = collision_dist
+        self.release_dist = release_dist
+        self.goal_radius = goal_radius
+        self.goal = goal
+
+        self.collisions = 0
+        self.in_collision = False
+        self.min_clearance = math.inf
+        self.clearance_sum = 0.0
+        self.num_scans = 0
+        self.path_length = 0.0
+        self.last_pos = None
+        self.start_time = None
+        self.last_time = None
+        self.time_to_goal = None
+        self.num_plans = 0
+
+    def add_scan(self, ranges):
+        # fmin ignores nan, an all-nan scan yields nan
+        d_min = float(np.fmin.reduce(ranges)) if len(ranges) else math.nan
+        if math.isnan(d_min):
+            return
+        if d_min <= self.collision_dist and not self.in_collision:
+            self.in_collision = True
+            self.collisions += 1
+        elif d_min > self.release_dist:
+            self.in_collision = False
+        self.min_clearance = min(self.min_clearance, d_min)
+        self.clearance_sum += d_min
+        self.num_scans += 1
+
+    def add_odom(self, x, y, stamp):
+        if self.start_time is None:
+            self.start_time = stamp
+        self.last_time = stamp
+        if self.last_pos is not None:
+            self.path_length += math.hypot(x - self.last_pos[0], y - self.last_pos[1])
+        self.last_pos = (x, y)
+
+        if (self.time_to_goal is None and self.goal is not None
+                and math.hypot(x - self.goal[0], y - self.goal[1]) <= self.goal_radius):
+            self.time_to_goal = stamp - self.start_time
+
+    def add_plan(self):
+        self.num_plans += 1
+
+    def row(self):
+        elapsed = self.last_time - self.start_time if self.start_time is not None else 0.0
+        return {
+            "episode": self.episode,
+            "collisions": self.collisions,
+            "min_clearance": round(self.min_clearance, 3) if self.num_scans else "",
+            "mean_clearance": round(self.clearance_sum / self.num_scans, 3) if self.num_scans else "",
+            "path_length": round(self.path_length, 3),
+            "time": round(elapsed, 3),
+            "time_to_goal": round(self.time_to_goal, 3) if self.time_to_goal is not None else "",
+            "goal_reached": int(self.time_to_goal is not None),
+            # the first plan of an episode is no replan
+            "replans": max(self.num_plans - 1, 0),
+        }
+
+
+class BufferedCsvWriter():
+    """Appends rows to a csv file, written in batches of 'flush_every' rows."""
+
+    def __init__(self, path, fields, flush_every=10):
+        self.path = path
+        self.fields = fields
+        self.flush_every = flush_every
+        self.rows = []
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            with open(path, "w") as f:
+                csv.DictWriter(f, fieldnames=fields).writeheader()
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        with open(self.path, "a") as f:
+            csv.DictWriter(f, fieldnames=self.fields).writerows(self.rows)
+        self.rows = []
+
+
+class MetricsRecorder():
+
+    def __init__(self):
+        self.collision_dist = rospy.get_param("~collision_distance", 0.35)
+        self.release_dist = rospy.get_param("~collision_release_distance", 0.5)
+        self.goal_radius = rospy.get_param("~goal_radius", 0.3)
+        output = rospy.get_param("~output", os.path.join(os.path.expanduser("~"), ".ros", "scenario_metrics.csv"))
+
+        self.writer = BufferedCsvWriter(output, FIELDS, rospy.get_param("~flush_every", 10))
+        self.lock = threading.Lock()
+        self.goal = None
+        self.goal_stamp = 0.0
+        self.last_reset = 0.0
+        # nothing is recorded before the first /scenario_reset
+        self.stats = None
+
+        # sub
+        rospy.Subscriber('/scenario_reset', Int16, self.cb_reset)
+        rospy.Subscriber('/scan', numpy_msg(LaserScan), self.cb_scan, queue_size=1)
+        rospy.Subscriber('/odom', Odometry, self.cb_odom, queue_size=10)
+        rospy.Subscriber('/move_base_simple/goal', PoseStamped, self.cb_goal)
+        rospy.Subscriber(rospy.get_param("~plan_topic", "/vis_global_path"), Path, self.cb_plan)
+
+        rospy.on_shutdown(self.shutdown)
+        rospy.loginfo("recording scenario metrics to %s", output)
+
+    def cb_reset(self, msg):
+        with self.lock:
+            self._finish_episode()
+            # the task generator publishes the goal of the new episode right before
+            # /scenario_reset, a goal stamped before the previous reset is stale
+            goal = self.goal if self.goal_stamp >= self.last_reset else None
+            self.stats = EpisodeStats(msg.data, self.collision_dist, self.release_dist, self.goal_radius, goal)
+            self.last_reset = rospy.get_time()
+
+    def cb_scan(self, msg):
+        with self.lock:
+            if self.stats is not None:
+                self.stats.add_scan(msg.ranges)
+
+    def cb_odom(self, msg):
+        with self.lock:
+            if self.stats is not None:
+                pos = msg.pose.pose.position
+                self.stats.add_odom(pos.x, pos.y, msg.header.stamp.to_sec())
+
+    def cb_goal(self, msg):
+        with self.lock:
+            self.goal = (msg.pose.position.x, msg.pose.position.y)
+            # goals without stamp count from their arrival
+            self.goal_stamp = msg.header.stamp.to_sec() or rospy.get_time()
+            if self.stats is not None:
+                self.stats.goal = self.goal
+
+    def cb_plan(self, msg):
+        with self.lock:
+            if self.stats is not None:
+                self.stats.add_plan()
+
+    def _finish_episode(self):
+        if self.stats is not None:
+            self.writer.write(self.stats.row())
+            self.stats = None
+
+    def shutdown(self):
+        with self.lock:
+            self._finish_episode()
+            self.writer.flush()
+
+
+def run():
+    rospy.init_node('metrics_recorder', anonymous=False)
+    MetricsRecorder()
+    rospy.spin()
+
+
+if __name__ == "__main__":
+    run()
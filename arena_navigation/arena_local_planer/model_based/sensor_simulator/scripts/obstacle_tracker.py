@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+import threading
+
+import numpy as np
+
+
+class ObstacleTracker():
+    """Array backed state of the tracked obstacles.
+
+    Every obstacle (identified by a hashable key, e.g. its marker topic) owns a
+    slot in the arrays 'label', 'pos', 'radius', 'vel' and 'stamp'. The velocity
+    of dynamic obstacles is estimated from consecutive positions and their stamps,
+    either by finite differences or by a constant velocity Kalman filter. Static
+    obstacles keep zero velocity. All methods are thread safe.
+    """
+
+    def __init__(self, capacity=64, use_kalman=False, process_noise=1.0, measurement_noise=0.01):
+        """
+        Args:
+            capacity (int): initially allocated number of obstacles, doubles when exceeded
+            use_kalman (bool): estimate position and velocity with a constant velocity Kalman filter
+            process_noise (float): acceleration variance [m^2/s^4] of the Kalman filter
+            measurement_noise (float): position variance [m^2] of the Kalman filter
+        """
+        self.use_kalman = use_kalman
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self._lock = threading.Lock()
+        self._slots = {}
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        def grow(array, shape, dtype):
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            if array is not None:
+                new[: self.size] = array[: self.size]
+            return new
+
+        self.label = grow(getattr(self, "label", None), (), np.int64)
+        self.pos = grow(getattr(self, "pos", None), (2,), np.float64)
+        self.radius = grow(getattr(self, "radius", None), (), np.float64)
+        self.vel = grow(getattr(self, "vel", None), (2,), np.float64)
+        self.stamp = grow(getattr(self, "stamp", None), (), np.float64)
+        self.dynamic = grow(getattr(self, "dynamic", None), (), bool)
+        # covariance of the Kalman state [x, y, vx, vy]
+        self.cov = grow(getattr(self, "cov", None), (4, 4), np.float64)
+        self.capacity = capacity
+
+    def clear(self):
+        """Forgets all obstacles, the arrays are kept."""
+        with self._lock:
+            self._slots.clear()
+            self.size = 0
+
+    def update(self, key, label, x, y, radius, stamp, dynamic=True):
+        """Adds a measured obstacle position.
+
+        Args:
+            key: identifier of the obstacle
+            label (int): label published in the clusters
+            x, y (float): measured position
+            radius (float): radius of the obstacle
+            stamp (float): time of the measurement in seconds
+            dynamic (bool): estimate the velocity, static obstacles have zero velocity
+        """
+        with self._lock:
+            i = self._slots.get(key)
+            if i is None:
+                if self.size == self.capacity:
+                    self._allocate(2 * self.capacity)
+                i = self._slots[key] = self.size
+                self.size += 1
+                self._init_slot(i, x, y, stamp)
+            elif dynamic:
+                dt = stamp - self.stamp[i]
+                # duplicated or reordered measurements carry no velocity information
+                if dt <= 0:
+                    return
+                if self.use_kalman:
+                    self._kalman_update(i, x, y, dt)
+                else:
+                    self.vel[i] = (x - self.pos[i, 0]) / dt, (y - self.pos[i, 1]) / dt
+                    self.pos[i] = x, y
+            else:
+                self.pos[i] = x, y
+            self.label[i] = label
+            self.radius[i] = radius
+            self.stamp[i] = stamp
+            self.dynamic[i] = dynamic
+
+    def _init_slot(self, i, x, y, stamp):
+        self.pos[i] = x, y
+        self.vel[i] = 0.0
+        self.stamp[i] = stamp
+        self.cov[i] = np.diag([self.measurement_noise] * 2 + [1.0] * 2)
+
+    def _kalman_update(self, i, x, y, dt):
+        # predict with constant velocity, white noise acceleration
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        q = self.process_noise
+        Q = np.zeros((4, 4))
+        Q[0, 0] = Q[1, 1] = q * dt ** 4 / 4
+        Q[0, 2] = Q[2, 0] = Q[1, 3] = Q[3, 1] = q * dt ** 3 / 2
+        Q[2, 2] = Q[3, 3] = q * dt ** 2
+        state = F @ np.concatenate((self.pos[i], self.vel[i]))
+        cov = F @ self.cov[i] @ F.T + Q
+
+        # correct with the measured position (H = [I 0])
+        S = cov[:2, :2] + self.measurement_noise * np.eye(2)
+        K = cov[:, :2] @ np.linalg.inv(S)
+        state += K @ (np.array([x, y]) - state[:2])
+        cov -= K @ cov[:2, :]
+
+        self.pos[i] = state[:2]
+        self.vel[i] = state[2:]
+        self.cov[i] = cov
+
+    def fill_clusters(self, cluster, point_factory, vector_factory):
+        """Writes the obstacles into the Clusters message 'cluster'.
+
+        The Point and Vector3 objects of the message are reused, new ones are only
+        created by the factories when the number of obstacles grows.
+        """
+        with self._lock:
+            n = self.size
+            points, vels = cluster.mean_points, cluster.velocities
+            while len(points) < n:
+                points.append(point_factory())
+            while len(vels) < n:
+                vels.append(vector_factory())
+            del points[n:]
+            del vels[n:]
+
+            pos, radius, vel = self.pos[:n].tolist(), self.radius[:n].tolist(), self.vel[:n].tolist()
+            for point, v, (px, py), r, (vx, vy) in zip(points, vels, pos, radius, vel):
+                point.x, point.y, point.z = px, py, r
+                v.x, v.y = vx, vy
+            cluster.labels[:] = self.label[:n].tolist()
@@ -12,7 +12,7 @@ import copy
 
 from std_msgs.msg import Int16
 # col
-from scenario_police import police
+from metrics_recorder import MetricsRecorder
 
 class sensor():
 
@@ -147,7 +147,7 @@ class sensor():
 def run():
     rospy.init_node('tb3_sensor_sim',anonymous=False)
     sensor()
-    police()
+    MetricsRecorder()
     rospy.spin()
 
 
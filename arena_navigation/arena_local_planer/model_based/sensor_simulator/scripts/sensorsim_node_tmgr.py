@@ -8,55 +8,50 @@ from geometry_msgs.msg import  Point, Vector3
 from std_msgs.msg import ColorRGBA
 from ford_msgs.msg import Clusters
 
-import copy
-
 from std_msgs.msg import Int16
 # col
-from scenario_police import police
+from metrics_recorder import MetricsRecorder
+from obstacle_tracker import ObstacleTracker
+
+DYNAMIC_PREFIX = "/flatland_server/debug/model/obstacle_dynamic_with_traj_"
+STATIC_PREFIX = "/flatland_server/debug/model/obstacle_circle_static_"
 
 class sensor():
 
     def __init__(self):
         # tmgr
-        # last updated topic
-        self.update_cluster = True
-
-
-        self.obstacles_dyn = {}
-        self.obstacles_static = {}
+        self.tracker = ObstacleTracker(
+            use_kalman=rospy.get_param("~use_kalman", False),
+            process_noise=rospy.get_param("~process_noise", 1.0),
+            measurement_noise=rospy.get_param("~measurement_noise", 0.01))
 
-        self.cluster = Clusters()
         self.obst_topics_dyn = []
         self.obst_topics_static = []
+        self.subscribers = {}
+
+        # reused for every publication, see ObstacleTracker.fill_clusters
+        self.cluster = Clusters()
         # pub
         self.pub_obst_odom = rospy.Publisher('/obst_odom',Clusters,queue_size=1)
-        self.pub_timer = rospy.Timer(rospy.Duration(0.1),self.pub_odom)
+        self.pub_timer = rospy.Timer(rospy.Duration(1.0 / rospy.get_param("~publish_rate", 10.0)),self.pub_odom)
         # sub
         self.sub_reset = rospy.Subscriber('/scenario_reset',Int16, self.cb_reset)
 
 
-
-
-
-        # static obst
-
-                    
-
     def cb_reset(self,msg):
-        # print(msg)
-        # collect static and dynamic obstacles
+        # collect static and dynamic obstacles of the new scenario
         self.obst_topics_dyn = []
         self.obst_topics_static = []
+        self.tracker.clear()
         self.get_obstacle_topics()
-  
+
 
     def update_obstacle_odom(self):
-        # subscribe 
-        for topic in self.obst_topics_dyn:
-            rospy.Subscriber(topic,MarkerArray,self.cb_marker, topic) 
-        for topic in self.obst_topics_static:
-            rospy.Subscriber(topic,MarkerArray,self.cb_marker, topic) 
-        
+        # subscribe once per topic, the subscribers are kept across resets
+        for topic in self.obst_topics_dyn + self.obst_topics_static:
+            if topic not in self.subscribers:
+                self.subscribers[topic] = rospy.Subscriber(topic,MarkerArray,self.cb_marker, topic)
+
 
     def get_obstacle_topics(self):
         topics = rospy.get_published_topics()
@@ -74,93 +69,43 @@ class sensor():
         print("static obstacles:", len(self.obst_topics_static))
         for topic in self.obst_topics_static:
             print(topic)
-        
-              
+
+
     def pub_odom(self,event):
-        self.update_cluster = False
-        self.fill_cluster()
-        self.pub_obst_odom.publish(self.cluster)  
-        # reset cluster
-        self.cluster = Clusters()  
-        self.update_cluster = True
-
-    def fill_cluster(self):
-        
-        for topic in self.obstacles_dyn:
-            if topic in self.obstacles_dyn:
-                tmp_point = Point()
-                tmp_point.x = self.obstacles_dyn[topic][0].x
-                tmp_point.y = self.obstacles_dyn[topic][0].y
-                tmp_point.z = self.obstacles_dyn[topic][1]
-
-                tmp_vel = self.obstacles_dyn[topic][2]
-                
-                self.cluster.mean_points.append(tmp_point)
-                self.cluster.velocities.append(tmp_vel)
-                self.cluster.labels.append(self.obstacles_dyn[topic][4])
-
-        # static
-        
-        for topic in self.obst_topics_static:
-            if topic in self.obstacles_static:
-                tmp_point = Point()
-                tmp_point.x = self.obstacles_static[topic][0].x
-                tmp_point.y = self.obstacles_static[topic][0].y
-                tmp_point.z = self.obstacles_static[topic][1]
-
-                tmp_vel = self.obstacles_static[topic][2]
-                
-                self.cluster.mean_points.append(tmp_point)
-                self.cluster.velocities.append(tmp_vel)
-                self.cluster.labels.append(self.obstacles_static[topic][3])
-        
-        # print(self.cluster)
-    
-    def cb_marker(self, msg, topic):
+        self.cluster.header.stamp = rospy.Time.now()
+        self.tracker.fill_clusters(self.cluster, Point, Vector3)
+        self.pub_obst_odom.publish(self.cluster)
 
-        if self.update_cluster:
-            # print(topic)
-            v = Vector3()
-            m = msg.markers[0]
-            pos = m.pose.position
-            r = m.scale.x/2
-            label = 0
-            
-
-            if "dynamic" in topic: 
-                if topic in self.obstacles_dyn:
-                    old_pos = self.obstacles_dyn[topic][0]
-                    old_time = self.obstacles_dyn[topic][3].nsecs
-                    curr_time = m.header.stamp.nsecs
-                    dt = (curr_time-old_time)*10**-9
-                    if dt>0:
-                        v.x = round((pos.x-old_pos.x)/dt,3)
-                        v.y = round((pos.y-old_pos.y)/dt,3)
-                    # update dyn obst
-                    label = topic.replace("/flatland_server/debug/model/obstacle_dynamic_with_traj_", "")
-                    label = int(label) + len(self.obst_topics_static) + 1
-                self.obstacles_dyn[topic] = [pos, r, v, m.header.stamp,label]
-            
-            else:
-                if topic in self.obstacles_static:
-                    # label = list(self.obstacles_static).index(topic)
-                    label = topic.replace("/flatland_server/debug/model/obstacle_circle_static_", "")
-                    label = int(label) 
-                self.obstacles_static[topic] = [pos, r, v, label]
+
+    def cb_marker(self, msg, topic):
+        if not msg.markers:
+            return
+        m = msg.markers[0]
+        pos = m.pose.position
+        r = m.scale.x/2
+        stamp = m.header.stamp.to_sec()
+        if stamp == 0:
+            stamp = rospy.get_time()
+
+        if "dynamic" in topic:
+            if topic not in self.obst_topics_dyn:
+                return
+            label = int(topic.replace(DYNAMIC_PREFIX, "")) + len(self.obst_topics_static) + 1
+            self.tracker.update(topic, label, pos.x, pos.y, r, stamp, dynamic=True)
+        else:
+            if topic not in self.obst_topics_static:
+                return
+            label = int(topic.replace(STATIC_PREFIX, ""))
+            self.tracker.update(topic, label, pos.x, pos.y, r, stamp, dynamic=False)
 
 
 
 def run():
     rospy.init_node('tb3_sensor_sim',anonymous=False)
     sensor()
-    police()
+    MetricsRecorder()
     rospy.spin()
 
 
 if __name__ == '__main__':
     run()
-
-
-
-
-
@@ -1,33 +1,81 @@
 #! /usr/bin/env python
 
+import numpy as np
 import rospy
+from rospy.numpy_msg import numpy_msg
 from sensor_msgs.msg import LaserScan
 
 class ScanMapper():
     """
     A class that switches the laserscan representations from the /scan topic for different navigation algorithms, see more in the mep_scan.launch
 
-    Parameters: angle_min, angle_max, increment from roslaunch 
+    Parameters: angle_min, angle_max, increment from roslaunch
+                angle_offset (optional): rotation of the laser mounting in rad, the ranges are rolled by the corresponding number of beams
+                reverse_ranges (optional): reverse the order of the ranges (clockwise laser)
     Subscribed topics: /scan
     Published topics: /scan_mapped
 
+    The parameters are read once and refreshed when they change on the parameter server, scans are republished without
+    any call to the master. The ranges are deserialized into numpy arrays and reordered into preallocated buffers.
+
     """
 
-    def __init__(self):
+    def __init__(self, param_refresh_rate=1.0):
+
+        self._params = None
+        # (params, number of beams, reorder index, ranges buffer, intensities buffer), only used by the scan callback
+        self._mapping = None
+        self._update_params()
+
+        # the master pushes parameter updates to the cache, polling it is a local lookup
+        self._param_timer = rospy.Timer(rospy.Duration(1.0 / param_refresh_rate), self._update_params)
 
         # Subscribers (callback functions are triggered on incoming data and written to 'data' as defined by ROS)
-        self._robot_state_sub = rospy.Subscriber('/scan', LaserScan, self.callback_change_laserscan)
+        self._robot_state_sub = rospy.Subscriber('/scan', numpy_msg(LaserScan), self.callback_change_laserscan, tcp_nodelay=True)
 
         # Publishers
-        self._new_scan_pub = rospy.Publisher('/scan_mapped', LaserScan, queue_size=1)
+        self._new_scan_pub = rospy.Publisher('/scan_mapped', numpy_msg(LaserScan), queue_size=1)
 
+    def _update_params(self, event=None):
+        params = (
+            rospy.get_param_cached('angle_min'),
+            rospy.get_param_cached('angle_max'),
+            rospy.get_param_cached('increment'),
+            rospy.get_param_cached('angle_offset', 0.0),
+            rospy.get_param_cached('reverse_ranges', False),
+        )
+        if params != self._params:
+            # replaced in one step, the reorder index is rebuilt by the scan callback
+            self._params = params
+            rospy.loginfo("scan mapping: angle_min=%s, angle_max=%s, increment=%s, angle_offset=%s, reverse_ranges=%s" % params)
 
+    @staticmethod
+    def _build_index(params, num_beams, angle_increment):
+        _, _, _, angle_offset, reverse = params
+        shift = int(round(angle_offset / angle_increment)) if angle_increment else 0
+        if shift % num_beams == 0 and not reverse:
+            # ranges are passed through untouched
+            return np.empty(0, dtype=np.intp)
+        index = np.roll(np.arange(num_beams), shift)
+        return index[::-1].copy() if reverse else index
 
     def callback_change_laserscan(self, data):
-        print("test")
-        data.angle_min = rospy.get_param('angle_min')
-        data.angle_max = rospy.get_param('angle_max')
-        data.angle_increment = rospy.get_param('increment')
+        # the parameter timer runs in another thread, read its state once
+        params = self._params
+        num_beams = len(data.ranges)
+        mapping = self._mapping
+        if mapping is None or mapping[0] is not params or mapping[1] != num_beams:
+            index = self._build_index(params, num_beams, data.angle_increment)
+            mapping = (params, num_beams, index, np.empty(num_beams, dtype=np.float32), np.empty(num_beams, dtype=np.float32))
+            self._mapping = mapping
+        _, _, index, ranges, intensities = mapping
+
+        if len(index) > 0:
+            data.ranges = np.take(data.ranges, index, out=ranges)
+            if len(data.intensities) == num_beams:
+                data.intensities = np.take(data.intensities, index, out=intensities)
+
+        data.angle_min, data.angle_max, data.angle_increment = params[:3]
         self._new_scan_pub.publish(data)
 
 
@@ -37,4 +85,4 @@ if __name__ == '__main__':
     rospy.init_node('add_offset', anonymous=True, disable_signals=False)
 
     scanMapper = ScanMapper()
-    rospy.spin()
\ No newline at end of file
+    rospy.spin()
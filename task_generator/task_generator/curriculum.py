@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+
+import rospy
+from std_msgs.msg import Int16
+
+# latched topic broadcasting the current stage to the tasks of all envs
+STAGE_TOPIC = "/curriculum/stage"
+
+
+class CurriculumState(object):
+    """Owner of the current stage of the training curriculum.
+
+    The stage is kept in memory, so reading it never blocks. Every change is
+    published once on the latched STAGE_TOPIC, which all 'StagedRandomTask's
+    (train and eval envs) subscribe to, and mirrored to the parameters
+    '/curr_stage' and '/last_stage_reached'. Persisting 'curr_stage' to the
+    agent's 'hyperparameters.json' happens behind in a background thread, which
+    replaces the file atomically; consecutive changes are coalesced into one write.
+
+    Publishing needs an initialized node, until then the broadcast is deferred and
+    done by the next call of 'announce' or of a stage change.
+    """
+
+    def __init__(self, num_stages, start_stage=1, json_file=None, topic=STAGE_TOPIC):
+        # type: (int, int, str, str) -> None
+        if start_stage < 1 or start_stage > num_stages:
+            raise IndexError(
+                "Start stage given for training curriculum out of bounds! Has to be between {1 to %d}!"
+                % num_stages
+            )
+        self.num_stages = num_stages
+        self.json_file = json_file
+        self._stage = start_stage
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._writing = False
+        self._closed = False
+        if json_file is not None:
+            self._writer = threading.Thread(target=self._write_behind, name="curriculum_writer")
+            self._writer.daemon = True
+            self._writer.start()
+            atexit.register(self.close)
+
+        self.topic = topic
+        self._pub = None
+        self._unannounced = True
+
+    @property
+    def stage(self):
+        # type: () -> int
+        return self._stage
+
+    @property
+    def last_stage_reached(self):
+        # type: () -> bool
+        return self._stage == self.num_stages
+
+    def next_stage(self):
+        # type: () -> bool
+        """Advances to the next stage, returns False if already in the last one."""
+        return self.set_stage(self._stage + 1)
+
+    def previous_stage(self):
+        # type: () -> bool
+        """Goes back to the previous stage, returns False if already in the first one."""
+        return self.set_stage(self._stage - 1)
+
+    def set_stage(self, stage):
+        # type: (int) -> bool
+        """Sets the stage if it is valid and differs from the current one, returns
+        whether it changed."""
+        if stage < 1 or stage > self.num_stages or stage == self._stage:
+            return False
+        self._stage = stage
+        self._announce()
+        return True
+
+    def announce(self):
+        # type: () -> bool
+        """Broadcasts the current stage if the node is initialized, returns whether it was sent."""
+        if not rospy.core.is_initialized():
+            self._unannounced = True
+            return False
+        if self._pub is None:
+            self._pub = rospy.Publisher(self.topic, Int16, queue_size=1, latch=True)
+        self._pub.publish(Int16(self._stage))
+        rospy.set_param("/curr_stage", self._stage)
+        rospy.set_param("/last_stage_reached", self.last_stage_reached)
+        self._unannounced = False
+        return True
+
+    @property
+    def unannounced(self):
+        # type: () -> bool
+        return self._unannounced
+
+    def _announce(self):
+        self.announce()
+        if self.json_file is not None:
+            with self._cond:
+                self._pending = self._stage
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        # type: (float) -> bool
+        """Waits until the current stage is persisted, returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._pending is None and not self._writing, timeout
+            )
+
+    def close(self):
+        """Persists a pending change and stops the writer thread."""
+        if self.json_file is None or self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+
+    def _write_behind(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                stage, self._pending = self._pending, None
+                self._writing = True
+            try:
+                self._update_curr_stage_json(stage)
+            except Exception as e:
+                rospy.logwarn("Couldn't persist curriculum stage %d: %s", stage, e)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _update_curr_stage_json(self, stage):
+        with open(self.json_file, "r") as file:
+            hyperparams = json.load(file)
+        if "curr_stage" not in hyperparams:
+            rospy.logwarn("Parameter 'curr_stage' not found in '%s'!", self.json_file)
+        hyperparams["curr_stage"] = stage
+
+        # write a temporary file next to it and swap it in, readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.json_file)), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as target:
+                json.dump(hyperparams, target, ensure_ascii=False, indent=4)
+            os.replace(tmp_path, self.json_file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
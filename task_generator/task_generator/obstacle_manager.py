@@ -8,6 +8,7 @@ from gazebo_msgs.srv import DeleteModel, SpawnModel
 from geometry_msgs.msg import Pose, Point, Quaternion
 from tf.transformations import quaternion_from_euler
 from .ped_manager.ArenaScenario import *
+from .ped_manager.PedArrays import PedArrays
 from .pedsim_manager import PedsimManager
 
 
@@ -116,15 +117,13 @@ class ObstaclesManager:
                 "can not generate a path with the given start position and the goal position of the robot")
         # load the peds in pedsim format
         print(s_pos,g_pos)
-        self.scenario = ArenaScenario()
-        self.scenario.createSimplePed(ids, s_pos, g_pos)
+        peds = PedArrays.simple(ids, s_pos, g_pos)
         # setup pedsim agents
         self.pedsim_manager = None
 
-        if len(self.scenario.pedsimAgents) > 0:
+        if len(peds) > 0:
             self.pedsim_manager = PedsimManager()
-            peds = [agent.getPedMsg() for agent in self.scenario.pedsimAgents]
-            self.pedsim_manager.spawnPeds(peds)
+            self.pedsim_manager.spawnPeds(peds.toPedMsgs())
         return forbidden_zones
 
 
@@ -1,11 +1,24 @@
+import numbers
 import numpy as np
-import os, rospkg
+import os
 import yaml
 import json
 from .PedsimAgent import *
+from .PedArrays import PED_PARAMS, PedArrays
 from .FlatlandModel import *
 from .HelperFunctions import *
 
+# scenario without agents and obstacles, base of the generated scenarios
+EMPTY_SCENARIO = {
+    "pedsim_agents": [],
+    "static_obstacles": [],
+    "robot_position": [1, 2],
+    "robot_goal": [3, 3],
+    "map_path": "",
+    "format": "arena-tools"
+}
+
+
 class ArenaScenario():
     def __init__(self):
         self.pedsimAgents = []  # list of PedsimAgent objects
@@ -37,8 +50,49 @@ class ArenaScenario():
         scenario.loadFromDict(d)
         return scenario
 
-    def loadFromDict(self, d):
-        # type: (dict) -> None
+    @staticmethod
+    def validateDict(d, path = ""):
+        # type: (dict, str) -> None
+        """
+        Checks that the scenario data follows the arena-tools format, raises a ValueError otherwise.
+        - path: file the data was read from, used in the error message
+        """
+        def check(condition, message, *args):
+            if not condition:
+                raise ValueError("invalid scenario %s: %s" % (path, message % args))
+
+        def is_point(value):
+            return (isinstance(value, (list, tuple)) and len(value) >= 2
+                    and all(isinstance(v, numbers.Real) for v in value[:2]))
+
+        check(isinstance(d, dict), "expected a mapping, got %s", type(d).__name__)
+        for key in ["pedsim_agents", "static_obstacles", "robot_position", "robot_goal", "map_path"]:
+            check(key in d, "missing key '%s'", key)
+        check(is_point(d["robot_position"]), "'robot_position' is no 2D point")
+        check(is_point(d["robot_goal"]), "'robot_goal' is no 2D point")
+
+        check(isinstance(d["pedsim_agents"], list), "'pedsim_agents' is no list")
+        for i, agent in enumerate(d["pedsim_agents"]):
+            check(isinstance(agent, dict), "pedsim agent %d is no mapping", i)
+            missing = [key for key in ["name", "id", "pos", "waypoints"] + [p[0] for p in PED_PARAMS] if key not in agent]
+            check(not missing, "pedsim agent %d misses %s", i, ", ".join(missing))
+            check(is_point(agent["pos"]), "'pos' of pedsim agent %d is no 2D point", i)
+            check(isinstance(agent["waypoints"], list) and all(is_point(wp) for wp in agent["waypoints"]),
+                  "'waypoints' of pedsim agent %d are no list of 2D points", i)
+            for name, param_type, _ in PED_PARAMS:
+                expected = str if param_type is str else numbers.Real
+                check(isinstance(agent[name], expected), "'%s' of pedsim agent %d is no %s", name, i, param_type.__name__)
+
+        check(isinstance(d["static_obstacles"], list), "'static_obstacles' is no list")
+        for i, obstacle in enumerate(d["static_obstacles"]):
+            check(isinstance(obstacle, dict), "static obstacle %d is no mapping", i)
+            missing = [key for key in ["name", "model_path", "pos", "angle"] if key not in obstacle]
+            check(not missing, "static obstacle %d misses %s", i, ", ".join(missing))
+            check(is_point(obstacle["pos"]), "'pos' of static obstacle %d is no 2D point", i)
+
+    def loadFromDict(self, d, path = ""):
+        # type: (dict, str) -> None
+        ArenaScenario.validateDict(d, path)
         self.pedsimAgents = [PedsimAgent.fromDict(a) for a in d["pedsim_agents"]]
         self.staticObstacles = [FlatlandObject.fromDict(o) for o in d["static_obstacles"]]
         # self.interactiveObstacles = ...TODO
@@ -84,7 +138,7 @@ class ArenaScenario():
                 else:
                     raise Exception("wrong format. file needs to have 'json' or 'yaml' file ending.")
 
-                self.loadFromDict(data)
+                self.loadFromDict(data, path_in)
                 self.path = path_in
 
         else:
@@ -92,24 +146,10 @@ class ArenaScenario():
 
     def createSimplePed(self, ids, s_pos, w_pos):
         # type: (list, list, list) -> None
-
-        # creates pedsim-agents
-        peds = []
-        for id, spos, wpos in zip(ids, s_pos, w_pos):
-            peds.append({"name": "Pedestrian", "id": id, "pos": [*spos], "type": "adult", "yaml_file": "/home/daniel/catkin_ws/src/arena-rosnav-3D/simulator_setup/dynamic_obstacles/person_two_legged.model.yaml",
-            "number_of_peds": 1, "vmax": 0.3, "start_up_mode": "default", "wait_time": 0.0, "trigger_zone_radius": 0.0, "chatting_probability": 0.01, "tell_story_probability": 0, "group_talking_probability": 0.01, "talking_and_walking_probability": 0.01,
-            "requesting_service_probability": 0.01, "requesting_guide_probability": 0.01, "requesting_follower_probability": 0.01, "max_talking_distance": 5, "max_servicing_radius": 5, "talking_base_time": 10,
-            "tell_story_base_time": 0, "group_talking_base_time": 10, "talking_and_walking_base_time": 6, "receiving_service_base_time": 20, "requesting_service_base_time": 30, "force_factor_desired": 1,
-            "force_factor_obstacle": 1, "force_factor_social": 5, "force_factor_robot": 0,
-            "waypoints": [ [*spos], [*wpos] ], "waypoint_mode": 0})
-
-        # loading the an empty pedsim-scenario file and inserting peds
-        path = rospkg.RosPack().get_path('simulator_setup') + '/scenarios/utils/empty_ped_scenario.json'
-        
-        if os.path.exists(path):
-            _, file_extension = os.path.splitext(path)
-            with open(path, "r") as f:
-                data = json.load(f)
-
-        data["pedsim_agents"] = peds
+        """
+        Replaces the scenario by an empty one with simple pedestrians walking from s_pos to w_pos.
+        Spawning the pedestrians doesn't need the scenario, see PedArrays.simple.
+        """
+        data = dict(EMPTY_SCENARIO)
+        data["pedsim_agents"] = PedArrays.simple(ids, s_pos, w_pos).toDicts()
         self.loadFromDict(data)
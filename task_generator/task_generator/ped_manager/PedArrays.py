@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+import os
+
+import numpy as np
+
+from .HelperFunctions import get_ros_package_path
+
+# parameters of pedsim_msgs/Ped besides id, pos and waypoints as (name, type, value of a simple pedestrian)
+PED_PARAMS = (
+    ("type", str, "adult"),
+    ("yaml_file", str, None),  # person_two_legged model of simulator_setup
+    ("number_of_peds", int, 1),
+    ("vmax", float, 0.3),
+    ("start_up_mode", str, "default"),
+    ("wait_time", float, 0.0),
+    ("trigger_zone_radius", float, 0.0),
+    ("chatting_probability", float, 0.01),
+    ("tell_story_probability", float, 0.0),
+    ("group_talking_probability", float, 0.01),
+    ("talking_and_walking_probability", float, 0.01),
+    ("requesting_service_probability", float, 0.01),
+    ("requesting_guide_probability", float, 0.01),
+    ("requesting_follower_probability", float, 0.01),
+    ("max_talking_distance", float, 5.0),
+    ("max_servicing_radius", float, 5.0),
+    ("talking_base_time", float, 10.0),
+    ("tell_story_base_time", float, 0.0),
+    ("group_talking_base_time", float, 10.0),
+    ("talking_and_walking_base_time", float, 6.0),
+    ("receiving_service_base_time", float, 20.0),
+    ("requesting_service_base_time", float, 30.0),
+    ("force_factor_desired", float, 1.0),
+    ("force_factor_obstacle", float, 1.0),
+    ("force_factor_social", float, 5.0),
+    ("force_factor_robot", float, 0.0),
+    ("waypoint_mode", int, 0),
+)
+NUMERIC_PARAMS = [(name, param_type) for name, param_type, _ in PED_PARAMS if param_type is not str]
+STRING_PARAMS = [name for name, param_type, _ in PED_PARAMS if param_type is str]
+
+_simple_ped_yaml = None
+
+
+def get_simple_ped_yaml():
+    # type: () -> str
+    global _simple_ped_yaml
+    if _simple_ped_yaml is None:
+        _simple_ped_yaml = os.path.join(
+            get_ros_package_path("simulator_setup"), "dynamic_obstacles", "person_two_legged.model.yaml"
+        )
+    return _simple_ped_yaml
+
+
+class PedArrays():
+    """
+    Pedsim agents stored column wise in arrays, ready to be turned into pedsim_msgs/Ped messages.
+    - ids: (N,) agent ids
+    - pos: (N, 2) start positions
+    - waypoints: (N, K, 2) waypoints, only the first num_waypoints[i] of agent i are valid
+    - num_waypoints: (N,) number of waypoints per agent
+    - values: (N, len(NUMERIC_PARAMS)) numeric parameters
+    - strings: dict of the string parameters, each a list of N values
+    """
+
+    def __init__(self, ids, pos, waypoints, num_waypoints, values, strings):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.pos = np.asarray(pos, dtype=np.float64)
+        self.waypoints = np.asarray(waypoints, dtype=np.float64)
+        self.num_waypoints = np.asarray(num_waypoints, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def simple(ids, s_pos, w_pos, **params):
+        # type: (list, list, list, Any) -> PedArrays
+        """
+        Creates pedestrians walking from s_pos to w_pos and back, the parameters default
+        to the ones of a simple pedestrian (see PED_PARAMS) and can be overwritten by keyword.
+        """
+        s_pos = np.asarray(s_pos, dtype=np.float64).reshape(-1, 2)
+        w_pos = np.asarray(w_pos, dtype=np.float64).reshape(-1, 2)
+        n = len(s_pos)
+        defaults = dict((name, default) for name, _, default in PED_PARAMS)
+        defaults["yaml_file"] = get_simple_ped_yaml()
+        defaults.update(params)
+
+        values = np.tile([defaults[name] for name, _ in NUMERIC_PARAMS], (n, 1))
+        strings = dict((name, [defaults[name]] * n) for name in STRING_PARAMS)
+        return PedArrays(ids, s_pos, np.stack((s_pos, w_pos), axis=1), np.full(n, 2), values, strings)
+
+    @staticmethod
+    def fromAgents(agents):
+        # type: (list) -> PedArrays
+        """Creates the arrays from a list of PedsimAgent objects."""
+        n = len(agents)
+        num_waypoints = [len(agent.waypoints) for agent in agents]
+        waypoints = np.zeros((n, max(num_waypoints + [1]), 2))
+        for i, agent in enumerate(agents):
+            if len(agent.waypoints) > 0:
+                waypoints[i, :len(agent.waypoints)] = agent.waypoints
+        values = np.array(
+            [[getattr(agent, name) for name, _ in NUMERIC_PARAMS] for agent in agents], dtype=np.float64
+        ).reshape(n, len(NUMERIC_PARAMS))
+        strings = dict((name, [getattr(agent, name) for agent in agents]) for name in STRING_PARAMS)
+        return PedArrays(
+            [agent.id for agent in agents],
+            np.array([agent.pos[:2] for agent in agents], dtype=np.float64).reshape(n, 2),
+            waypoints,
+            num_waypoints,
+            values,
+            strings,
+        )
+
+    def toPedMsgs(self):
+        # type: () -> list
+        """Returns the agents as list of pedsim_msgs/Ped messages."""
+        from pedsim_msgs.msg import Ped
+        from geometry_msgs.msg import Point
+
+        # native python values, the messages are filled without any array indexing
+        ids = self.ids.tolist()
+        pos = self.pos.tolist()
+        waypoints = self.waypoints.tolist()
+        num_waypoints = self.num_waypoints.tolist()
+        values = self.values.tolist()
+        strings = [(name, self.strings[name]) for name in STRING_PARAMS]
+
+        msgs = []
+        for i in range(len(ids)):
+            msg = Ped()
+            msg.id = ids[i]
+            msg.pos = Point(pos[i][0], pos[i][1], 0)
+            for (name, param_type), value in zip(NUMERIC_PARAMS, values[i]):
+                setattr(msg, name, param_type(value))
+            for name, column in strings:
+                setattr(msg, name, column[i])
+            msg.waypoints = [Point(x, y, 0) for x, y in waypoints[i][:num_waypoints[i]]]
+            msgs.append(msg)
+        return msgs
+
+    def toDicts(self, name="Pedestrian"):
+        # type: (str) -> list
+        """Returns the agents in the format of the 'pedsim_agents' of a scenario file."""
+        dicts = []
+        for i, values in enumerate(self.values.tolist()):
+            d = {"name": name, "id": int(self.ids[i]), "pos": self.pos[i].tolist()}
+            for (param, param_type), value in zip(NUMERIC_PARAMS, values):
+                d[param] = param_type(value)
+            for param in STRING_PARAMS:
+                d[param] = self.strings[param][i]
+            d["waypoints"] = self.waypoints[i, :self.num_waypoints[i]].tolist()
+            dicts.append(d)
+        return dicts
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import os
+import threading
+
+from .ArenaScenario import ArenaScenario
+from .PedArrays import PedArrays
+
+
+class ScenarioRepository():
+    """
+    Cache of loaded and validated scenario files.
+    Every file is parsed once and kept until its modification time or size changes.
+    The returned ArenaScenario objects are shared and must not be modified.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # absolute path -> ((mtime, size), ArenaScenario, PedArrays)
+
+    def _getEntry(self, path):
+        # type: (str) -> tuple
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise IOError("scenario file '%s' does not exist" % path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] != key:
+                scenario = ArenaScenario()
+                scenario.loadFromFile(path)
+                entry = (key, scenario, PedArrays.fromAgents(scenario.pedsimAgents))
+                self._entries[path] = entry
+        return entry
+
+    def getScenario(self, path):
+        # type: (str) -> ArenaScenario
+        return self._getEntry(path)[1]
+
+    def getPeds(self, path):
+        # type: (str) -> PedArrays
+        """Returns the pedsim agents of the scenario, see PedArrays.toPedMsgs."""
+        return self._getEntry(path)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# repository shared by all tasks of the process
+SCENARIO_REPOSITORY = ScenarioRepository()
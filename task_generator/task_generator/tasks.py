@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 
-import json
 import six
 import abc
 import rospy
@@ -15,10 +14,11 @@ from .robot_manager import RobotManager
 from .obstacle_manager import ObstaclesManager
 from .pedsim_manager import PedsimManager
 from .ped_manager.ArenaScenario import *
-from std_msgs.msg import Bool
+from .ped_manager.ScenarioRepository import SCENARIO_REPOSITORY
+from std_msgs.msg import Bool, Int16
 from geometry_msgs.msg import *
 from threading import Condition, Lock
-from filelock import FileLock
+from .curriculum import STAGE_TOPIC
 
 STANDART_ORIENTATION = quaternion_from_euler(0.0, 0.0, 0.0)
 ROBOT_RADIUS = 0.17
@@ -205,63 +205,29 @@ class StagedRandomTask(RandomTask):
             )
         rospy.set_param("/curr_stage", self._curr_stage)
 
-        # hyperparamters.json location
-        self.json_file = os.path.join(
-            self._PATHS.get("model"), "hyperparameters.json"
-        )
-        assert os.path.isfile(self.json_file), (
-            "Found no 'hyperparameters.json' at %s" % self.json_file
-        )
-        self._lock_json = FileLock(self.json_file + ".lock")
-
-        # subs for triggers
-        self._sub_next = rospy.Subscriber(
-            self.ns_prefix, "next_stage", Bool, self.next_stage
-        )
-        self._sub_previous = rospy.Subscriber(
-            self.ns_prefix, "previous_stage", Bool, self.previous_stage
-        )
+        # stage changes are broadcast to all envs by the CurriculumState of the trainer
+        self._sub_stage = rospy.Subscriber(STAGE_TOPIC, Int16, self._cb_stage)
 
         self._initiate_stage()
 
-    def next_stage(self, msg):
-        # type (Bool) -> Any
-        if self._curr_stage < len(self._stages):
-            self._curr_stage = self._curr_stage + 1
-            self._initiate_stage()
-
-            if self.ns == "eval_sim":
-                rospy.set_param("/curr_stage", self._curr_stage)
-                with self._lock_json:
-                    self._update_curr_stage_json()
-
-                if self._curr_stage == len(self._stages):
-                    rospy.set_param("/last_stage_reached", True)
-        else:
-            print(
-                "(",
-                self.ns,
-                ") INFO: Tried to trigger next stage but already reached last one",
-            )
-
-    def previous_stage(self, msg):
-        # type (Bool) -> Any
-        if self._curr_stage > 1:
-            rospy.set_param("/last_stage_reached", False)
+    def _cb_stage(self, msg):
+        # type (Int16) -> Any
+        self.set_stage(msg.data)
 
-            self._curr_stage = self._curr_stage - 1
-            self._initiate_stage()
-
-            if self.ns == "eval_sim":
-                rospy.set_param("/curr_stage", self._curr_stage)
-                with self._lock_json:
-                    self._update_curr_stage_json()
-        else:
+    def set_stage(self, stage):
+        # type: (int) -> None
+        if stage == self._curr_stage:
+            return
+        if stage < 1 or stage > len(self._stages):
             print(
                 "(",
                 self.ns,
-                ") INFO: Tried to trigger previous stage but already reached first one",
+                ") INFO: Ignored stage %d, the curriculum has stages {1 to %d}"
+                % (stage, len(self._stages)),
             )
+            return
+        self._curr_stage = stage
+        self._initiate_stage()
 
     def _initiate_stage(self):
         self._remove_obstacles()
@@ -296,24 +262,9 @@ class StagedRandomTask(RandomTask):
                 % self._PATHS.get("curriculum")
             )
 
-    def _update_curr_stage_json(self):
-        with open(self.json_file, "r") as file:
-            hyperparams = json.load(file)
-        try:
-            hyperparams["curr_stage"] = self._curr_stage
-        except Exception as e:
-            raise Warning(
-                " ",
-                e,
-                " \n Parameter 'curr_stage' not found in 'hyperparameters.json'!",
-            )
-        else:
-            with open(self.json_file, "w", encoding="utf-8") as target:
-                json.dump(hyperparams, target, ensure_ascii=False, indent=4)
-
     def _remove_obstacles(self):
         # idea rosservice call /pedsim_simulator/remove_all_peds true (to remove all obstacles)
-        self.obstacles_manager.remove_obstacles()
+        self.obstacle_manager.remove_obstacles()
 
 
 class ScenarioTask(ABSTask):
@@ -325,16 +276,15 @@ class ScenarioTask(ABSTask):
             pedsim_manager, obstacle_manager, robot_manager
         )
 
-        # load scenario from file
-        self.scenario = ArenaScenario()
-        self.scenario.loadFromFile(scenario_path)
+        # load scenario from file, parsed only once per process
+        self.scenario = SCENARIO_REPOSITORY.getScenario(scenario_path)
 
         # setup pedsim agents
         self.pedsim_manager = None
-        if len(self.scenario.pedsimAgents) > 0:
+        peds = SCENARIO_REPOSITORY.getPeds(scenario_path)
+        if len(peds) > 0:
             self.pedsim_manager = pedsim_manager
-            peds = [agent.getPedMsg() for agent in self.scenario.pedsimAgents]
-            self.pedsim_manager.spawnPeds(peds)
+            self.pedsim_manager.spawnPeds(peds.toPedMsgs())
         self.reset_count = 0
 
     def reset(self):
@@ -395,7 +345,9 @@ def get_predefined_task(ns, mode="random", start_stage=1, PATHS=None):
         print("random tasks requested")
     if mode == "staged":
         rospy.set_param("/task_mode", "staged")
-        task = StagedRandomTask(ns, start_stage, PATHS)
+        task = StagedRandomTask(
+            ns, pedsim_manager, obstacle_manager, robot_manager, start_stage, PATHS
+        )
     if mode == "scenario":
         rospy.set_param("/task_mode", "scenario")
         forbidden_zones = obstacle_manager.register_random_static_obstacles(